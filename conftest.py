@@ -0,0 +1,12 @@
+import pytest
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_call(item):
+    """
+    Дожидается фоновых задач до удаления временного MEDIA_ROOT
+    в teardown фикстур теста.
+    """
+    yield
+    from posts import background
+    background.drain()
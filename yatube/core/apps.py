@@ -6,3 +6,8 @@ from django.apps import AppConfig
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from . import metrics, sqlite  # noqa: F401
+
+        metrics.install()
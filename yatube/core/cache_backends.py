@@ -0,0 +1,326 @@
+"""
+Двухуровневый кеш: небольшой LRU в памяти процесса
+перед общим для всех процессов хранилищем, и само общее
+хранилище — таблица в отдельном файле SQLite.
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+_MISSING = object()
+
+
+class TwoLevelCache(BaseCache):
+    """
+    Кеш с локальным LRU-уровнем перед общим кешем.
+
+    LOCATION — алиас общего кеша из settings.CACHES. Локальный уровень
+    хранит не больше MAX_ENTRIES записей не дольше LOCAL_TIMEOUT секунд,
+    поэтому изменения из других процессов видны с этой задержкой.
+    Ключи с префиксами из SHARED_ONLY_PREFIXES (счётчики версий,
+    блокировки) читаются только из общего кеша.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._shared_alias = location
+        self._local_timeout = options.get('LOCAL_TIMEOUT', 5)
+        self._shared_only = tuple(options.get('SHARED_ONLY_PREFIXES', ()))
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def shared(self):
+        return caches[self._shared_alias]
+
+    def _is_local(self, key):
+        return not key.startswith(self._shared_only)
+
+    def _local_get(self, key, version):
+        local_key = self.make_key(key, version=version)
+        with self._lock:
+            item = self._local.get(local_key)
+            if item is None or item[0] <= time.time():
+                self._local.pop(local_key, None)
+                self.misses += 1
+                return _MISSING
+            self._local.move_to_end(local_key)
+            self.hits += 1
+        return pickle.loads(item[1])
+
+    def _local_set(self, key, value, timeout, version):
+        if not self._is_local(key):
+            return
+        ttl = self._local_timeout
+        if timeout is not DEFAULT_TIMEOUT and timeout is not None:
+            ttl = min(ttl, timeout)
+        if ttl <= 0:
+            self._local_delete(key, version)
+            return
+        local_key = self.make_key(key, version=version)
+        pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._local[local_key] = (time.time() + ttl, pickled)
+            self._local.move_to_end(local_key)
+            while len(self._local) > self._max_entries:
+                self._local.popitem(last=False)
+                self.evictions += 1
+
+    def _local_delete(self, key, version):
+        local_key = self.make_key(key, version=version)
+        with self._lock:
+            self._local.pop(local_key, None)
+
+    def get(self, key, default=None, version=None):
+        if self._is_local(key):
+            value = self._local_get(key, version)
+            if value is not _MISSING:
+                return value
+        value = self.shared.get(key, _MISSING, version=version)
+        if value is _MISSING:
+            return default
+        self._local_set(key, value, DEFAULT_TIMEOUT, version)
+        return value
+
+    def get_many(self, keys, version=None):
+        """
+        Ключи, которых нет в локальном уровне, читаются из общего
+        кеша одним запросом.
+        """
+        found = {}
+        missing = []
+        for key in keys:
+            value = _MISSING
+            if self._is_local(key):
+                value = self._local_get(key, version)
+            if value is _MISSING:
+                missing.append(key)
+            else:
+                found[key] = value
+        if missing:
+            shared = self.shared.get_many(missing, version=version)
+            for key, value in shared.items():
+                self._local_set(key, value, DEFAULT_TIMEOUT, version)
+            found.update(shared)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.shared.set(key, value, timeout, version=version)
+        self._local_set(key, value, timeout, version)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.shared.add(key, value, timeout, version=version)
+        if added:
+            self._local_set(key, value, timeout, version)
+        else:
+            self._local_delete(key, version)
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.shared.touch(key, timeout, version=version)
+
+    def delete(self, key, version=None):
+        self._local_delete(key, version)
+        self.shared.delete(key, version=version)
+
+    def has_key(self, key, version=None):
+        return self.get(key, _MISSING, version=version) is not _MISSING
+
+    def incr(self, key, delta=1, version=None):
+        self._local_delete(key, version)
+        return self.shared.incr(key, delta, version=version)
+
+    def decr(self, key, delta=1, version=None):
+        self._local_delete(key, version)
+        return self.shared.decr(key, delta, version=version)
+
+    def clear(self):
+        with self._lock:
+            self._local.clear()
+        self.shared.clear()
+
+    def stats(self):
+        """
+        Статистика локального уровня: попадания, промахи и вытеснения.
+        """
+        with self._lock:
+            size = len(self._local)
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'size': size,
+            'max_entries': self._max_entries,
+        }
+
+
+class SQLiteCache(BaseCache):
+    """
+    Общий для процессов кеш в таблице SQLite; LOCATION — путь к файлу.
+
+    В отличие от FileBasedCache add и incr атомарны между процессами:
+    add — INSERT OR IGNORE, incr — UPDATE ... SET value = value + ?
+    в одной транзакции BEGIN IMMEDIATE. Целые числа хранятся как
+    INTEGER, остальные значения — pickle. При переполнении удаляются
+    истёкшие записи, затем 1/CULL_FREQUENCY записей с ближайшим сроком.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._path = location
+        self._state = threading.local()
+
+    def _connection(self):
+        state = self._state
+        if getattr(state, 'pid', None) != os.getpid():
+            os.makedirs(os.path.dirname(self._path) or '.', exist_ok=True)
+            connection = sqlite3.connect(
+                self._path, timeout=5, isolation_level=None)
+            connection.execute('PRAGMA journal_mode = wal')
+            connection.execute('PRAGMA synchronous = normal')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS cache_entries ('
+                'key TEXT PRIMARY KEY, value, expires REAL)')
+            connection.execute(
+                'CREATE INDEX IF NOT EXISTS cache_entries_expires '
+                'ON cache_entries (expires)')
+            state.connection, state.pid = connection, os.getpid()
+        return state.connection
+
+    @contextmanager
+    def _transaction(self):
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield connection
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    @staticmethod
+    def _encode(value):
+        if type(value) is int and -2 ** 63 <= value < 2 ** 63:
+            return value
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def _decode(value):
+        if isinstance(value, bytes):
+            return pickle.loads(value)
+        return value
+
+    def _cull(self, connection, now):
+        if not self._max_entries:
+            return
+        connection.execute(
+            'DELETE FROM cache_entries WHERE expires <= ?', (now,))
+        [count] = connection.execute(
+            'SELECT COUNT(*) FROM cache_entries').fetchone()
+        if count > self._max_entries:
+            connection.execute(
+                'DELETE FROM cache_entries WHERE key IN ('
+                'SELECT key FROM cache_entries '
+                'ORDER BY expires IS NULL, expires LIMIT ?)',
+                (max(1, count // self._cull_frequency),))
+
+    def get(self, key, default=None, version=None):
+        row = self._connection().execute(
+            'SELECT value FROM cache_entries WHERE key = ? '
+            'AND (expires IS NULL OR expires > ?)',
+            (self._key(key, version), time.time())).fetchone()
+        return default if row is None else self._decode(row[0])
+
+    def get_many(self, keys, version=None):
+        names = {self._key(key, version): key for key in keys}
+        found = {}
+        items = list(names)
+        for start in range(0, len(items), 500):
+            chunk = items[start:start + 500]
+            placeholders = ', '.join(['?'] * len(chunk))
+            rows = self._connection().execute(
+                f'SELECT key, value FROM cache_entries '
+                f'WHERE key IN ({placeholders}) '
+                f'AND (expires IS NULL OR expires > ?)',
+                (*chunk, time.time()))
+            for name, value in rows:
+                found[names[name]] = self._decode(value)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expires = self.get_backend_timeout(timeout)
+        now = time.time()
+        with self._transaction() as connection:
+            connection.executemany(
+                'INSERT OR REPLACE INTO cache_entries VALUES (?, ?, ?)',
+                [(self._key(key, version), self._encode(value), expires)
+                 for key, value in data.items()])
+            self._cull(connection, now)
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        with self._transaction() as connection:
+            connection.execute(
+                'DELETE FROM cache_entries WHERE key = ? AND expires <= ?',
+                (key, now))
+            added = connection.execute(
+                'INSERT OR IGNORE INTO cache_entries VALUES (?, ?, ?)',
+                (key, self._encode(value),
+                 self.get_backend_timeout(timeout))).rowcount == 1
+            if added:
+                self._cull(connection, now)
+        return added
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        with self._transaction() as connection:
+            updated = connection.execute(
+                'UPDATE cache_entries SET value = value + ? '
+                'WHERE key = ? AND typeof(value) = \'integer\' '
+                'AND (expires IS NULL OR expires > ?)',
+                (delta, key, time.time())).rowcount
+            if not updated:
+                raise ValueError(f"Key '{key}' not found")
+            [value] = connection.execute(
+                'SELECT value FROM cache_entries WHERE key = ?',
+                (key,)).fetchone()
+        return value
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._connection().execute(
+            'UPDATE cache_entries SET expires = ? WHERE key = ? '
+            'AND (expires IS NULL OR expires > ?)',
+            (self.get_backend_timeout(timeout), self._key(key, version),
+             time.time())).rowcount == 1
+
+    def delete(self, key, version=None):
+        self._connection().execute(
+            'DELETE FROM cache_entries WHERE key = ?',
+            (self._key(key, version),))
+
+    def has_key(self, key, version=None):
+        return self.get(key, _MISSING, version=version) is not _MISSING
+
+    def clear(self):
+        self._connection().execute('DELETE FROM cache_entries')
@@ -0,0 +1,147 @@
+"""
+Нагрузочная проверка записи в SQLite несколькими потоками.
+"""
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.sqlite import apply_pragmas
+
+# Настройки SQLite по умолчанию: журнал отката и synchronous=FULL.
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'delete',
+    'synchronous': 'full',
+}
+SCHEMA = (
+    'CREATE TABLE post (id INTEGER PRIMARY KEY, author_id INTEGER, '
+    'text TEXT, pub_date REAL)',
+    'CREATE INDEX post_author ON post (author_id, pub_date)',
+    'CREATE TABLE stats (author_id INTEGER PRIMARY KEY, posts INTEGER)',
+)
+AUTHORS = 100
+
+
+def _connect(path, pragmas):
+    connection = sqlite3.connect(
+        path, timeout=5, isolation_level=None, check_same_thread=False)
+    apply_pragmas(connection.cursor(), pragmas)
+    return connection
+
+
+def _prepare(path, pragmas):
+    connection = _connect(path, pragmas)
+    for statement in SCHEMA:
+        connection.execute(statement)
+    connection.executemany(
+        'INSERT INTO stats VALUES (?, 0)', ((pk,) for pk in range(AUTHORS)))
+    connection.close()
+
+
+def _write(connection, number):
+    """
+    Транзакция как при публикации поста: запись и счётчик автора.
+    """
+    author_id = number % AUTHORS
+    connection.execute('BEGIN IMMEDIATE')
+    try:
+        connection.execute(
+            'INSERT INTO post (author_id, text, pub_date) VALUES (?, ?, ?)',
+            (author_id, 'Текст поста ' * 20, time.time()))
+        connection.execute(
+            'UPDATE stats SET posts = posts + 1 WHERE author_id = ?',
+            (author_id,))
+    except sqlite3.Error:
+        connection.execute('ROLLBACK')
+        raise
+    connection.execute('COMMIT')
+
+
+def _read(connection, number):
+    connection.execute(
+        'SELECT id, text FROM post WHERE author_id = ? '
+        'ORDER BY pub_date DESC LIMIT 10', (number % AUTHORS,)).fetchall()
+
+
+def _worker(path, pragmas, operation, deadline, totals, lock):
+    connection = _connect(path, pragmas)
+    done = errors = 0
+    try:
+        while time.monotonic() < deadline:
+            try:
+                operation(connection, done)
+                done += 1
+            except sqlite3.OperationalError:
+                errors += 1
+    finally:
+        connection.close()
+    with lock:
+        totals[operation.__name__] += done
+        totals['errors'] += errors
+
+
+def run(pragmas, writers, readers, seconds):
+    """
+    Запускает writers пишущих и readers читающих потоков на новой
+    базе и возвращает число операций в секунду и число ошибок.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'bench.sqlite3')
+        _prepare(path, pragmas)
+        totals = {'_write': 0, '_read': 0, 'errors': 0}
+        lock = threading.Lock()
+        deadline = time.monotonic() + seconds
+        operations = [_write] * writers + [_read] * readers
+        threads = [
+            threading.Thread(
+                target=_worker,
+                args=(path, pragmas, operation, deadline, totals, lock))
+            for operation in operations
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    return {
+        'writes': totals['_write'] / seconds,
+        'reads': totals['_read'] / seconds,
+        'errors': totals['errors'],
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность записи в SQLite с настройками '
+        'по умолчанию и с SQLITE_PRAGMAS при разном числе потоков.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threads', type=int, nargs='+', default=[1, 2, 4, 8],
+            help='Число пишущих потоков в прогонах.')
+        parser.add_argument(
+            '--readers', type=int, default=2,
+            help='Число читающих потоков в каждом прогоне.')
+        parser.add_argument(
+            '--seconds', type=float, default=3,
+            help='Длительность одного прогона.')
+
+    def handle(self, *args, **options):
+        profiles = (
+            ('default', DEFAULT_PRAGMAS),
+            ('tuned', settings.SQLITE_PRAGMAS),
+        )
+        self.stdout.write(
+            f'{"профиль":<10}{"потоки":>8}{"записи/с":>12}'
+            f'{"чтения/с":>12}{"ошибки":>8}')
+        for name, pragmas in profiles:
+            for writers in options['threads']:
+                result = run(
+                    pragmas, writers, options['readers'], options['seconds'])
+                self.stdout.write(
+                    f'{name:<10}{writers:>8}{result["writes"]:>12.0f}'
+                    f'{result["reads"]:>12.0f}{result["errors"]:>8}')
@@ -0,0 +1,55 @@
+"""
+Выгрузка профилей медленных запросов.
+"""
+import marshal
+import os
+from datetime import datetime
+
+from django.core.management.base import BaseCommand
+
+from core.profiling import clear_profiles, load_profiles
+
+
+def _write_collapsed(path, stacks):
+    with open(path, 'w') as output:
+        for stack, count in stacks.most_common():
+            output.write(f'{stack} {count}\n')
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает сохранённые профили медленных запросов: .pstats для '
+        'модуля pstats и .collapsed для flamegraph.pl или speedscope.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output', default='profiles',
+            help='Каталог для файлов профилей.')
+        parser.add_argument(
+            '--view', help='Имя view, например posts:post_detail.')
+        parser.add_argument(
+            '--clear', action='store_true',
+            help='Удалить профили после выгрузки.')
+
+    def handle(self, *args, **options):
+        os.makedirs(options['output'], exist_ok=True)
+        written = 0
+        for name, profiles in load_profiles(options['view']).items():
+            for number, profile in enumerate(profiles, 1):
+                base = os.path.join(
+                    options['output'],
+                    f'{name.replace(":", "-")}-{number}')
+                _write_collapsed(f'{base}.collapsed', profile['stacks'])
+                if profile['stats'] is not None:
+                    with open(f'{base}.pstats', 'wb') as output:
+                        marshal.dump(profile['stats'], output)
+                started = datetime.fromtimestamp(profile['started'])
+                self.stdout.write(
+                    f'{base}: {profile["method"]} {profile["path"]} '
+                    f'{profile["status"]} {profile["duration"]:.0f} мс '
+                    f'{started:%Y-%m-%d %H:%M:%S}')
+                written += 1
+        if options['clear']:
+            clear_profiles()
+        self.stdout.write(f'Выгружено профилей: {written}.')
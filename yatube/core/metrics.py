@@ -0,0 +1,252 @@
+"""
+Замеры запросов: число SQL-запросов, время в базе, время отрисовки
+шаблонов и попадания в кеш для каждого view.
+
+MetricsMiddleware отдаёт замеры запроса в заголовке Server-Timing
+и накапливает гистограммы по имени view (posts:index, ...),
+которые показывает служебная страница core.views.metrics_stats.
+Гистограммы хранятся в памяти процесса.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack
+from functools import wraps
+
+from django.core.cache import caches
+from django.db import connections
+from django.template.backends.django import Template
+
+TIME_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+UNRESOLVED_VIEW = '<unresolved>'
+
+_state = threading.local()
+_MISSING = object()
+
+
+class RequestMetrics:
+    """
+    Замеры одного запроса; время в миллисекундах.
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+
+def current_metrics():
+    return getattr(_state, 'metrics', None)
+
+
+class Histogram:
+    """
+    Гистограмма с фиксированными верхними границами корзин;
+    последняя корзина — значения больше всех границ.
+    """
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+
+    def as_dict(self):
+        labels = [f'<={bound}' for bound in self.buckets]
+        labels.append(f'>{self.buckets[-1]}')
+        return {
+            'count': self.count,
+            'sum': round(self.total, 3),
+            'buckets': dict(zip(labels, self.counts)),
+        }
+
+
+class ViewStats:
+
+    def __init__(self):
+        self.total_time = Histogram(TIME_BUCKETS)
+        self.db_time = Histogram(TIME_BUCKETS)
+        self.template_time = Histogram(TIME_BUCKETS)
+        self.queries = Histogram(COUNT_BUCKETS)
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def observe(self, metrics, total_time):
+        self.total_time.observe(total_time)
+        self.db_time.observe(metrics.db_time)
+        self.template_time.observe(metrics.template_time)
+        self.queries.observe(metrics.queries)
+        self.cache_hits += metrics.cache_hits
+        self.cache_misses += metrics.cache_misses
+
+    def as_dict(self):
+        return {
+            'requests': self.total_time.count,
+            'total_ms': self.total_time.as_dict(),
+            'db_ms': self.db_time.as_dict(),
+            'template_ms': self.template_time.as_dict(),
+            'queries': self.queries.as_dict(),
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+        }
+
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match else UNRESOLVED_VIEW
+
+
+def record(name, metrics, total_time):
+    with _stats_lock:
+        stats = _stats.get(name)
+        if stats is None:
+            stats = _stats[name] = ViewStats()
+        stats.observe(metrics, total_time)
+
+
+def snapshot():
+    """
+    Накопленные гистограммы по view в виде словаря для JSON.
+    """
+    with _stats_lock:
+        return {name: stats.as_dict() for name, stats in _stats.items()}
+
+
+def reset():
+    with _stats_lock:
+        _stats.clear()
+
+
+def _count_query(execute, sql, params, many, context):
+    metrics = current_metrics()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries += 1
+        metrics.db_time += (time.perf_counter() - started) * 1000
+
+
+def _count_cache_get(get):
+    @wraps(get)
+    def wrapper(key, default=None, version=None):
+        value = get(key, _MISSING, version=version)
+        metrics = None
+        if not getattr(_state, 'in_get_many', False):
+            metrics = current_metrics()
+        if value is _MISSING:
+            if metrics is not None:
+                metrics.cache_misses += 1
+            return default
+        if metrics is not None:
+            metrics.cache_hits += 1
+        return value
+    return wrapper
+
+
+def _count_cache_get_many(get_many):
+    @wraps(get_many)
+    def wrapper(keys, version=None):
+        keys = list(keys)
+        _state.in_get_many = True
+        try:
+            found = get_many(keys, version=version)
+        finally:
+            _state.in_get_many = False
+        metrics = current_metrics()
+        if metrics is not None:
+            metrics.cache_hits += len(found)
+            metrics.cache_misses += len(keys) - len(found)
+        return found
+    return wrapper
+
+
+def _instrument_cache():
+    """
+    Подменяет get и get_many у экземпляра кеша default текущего
+    потока; экземпляры кешей у каждого потока свои.
+
+    get_many базового класса вызывает уже подменённый get, поэтому
+    внутри get_many ключи считаются только один раз, в самом get_many.
+    """
+    cache = caches['default']
+    if getattr(cache, '_metrics_instrumented', False):
+        return
+    cache.get = _count_cache_get(cache.get)
+    cache.get_many = _count_cache_get_many(cache.get_many)
+    cache._metrics_instrumented = True
+
+
+def _timed_render(render):
+    @wraps(render)
+    def wrapper(self, *args, **kwargs):
+        metrics = current_metrics()
+        if metrics is None or getattr(_state, 'rendering', False):
+            return render(self, *args, **kwargs)
+        _state.rendering = True
+        started = time.perf_counter()
+        try:
+            return render(self, *args, **kwargs)
+        finally:
+            _state.rendering = False
+            metrics.template_time += (time.perf_counter() - started) * 1000
+    return wrapper
+
+
+def install():
+    """
+    Включает замер отрисовки шаблонов; вызывается из CoreConfig.ready.
+    """
+    if not getattr(Template.render, '_metrics_instrumented', False):
+        Template.render = _timed_render(Template.render)
+        Template.render._metrics_instrumented = True
+
+
+def server_timing(metrics, total_time):
+    return ', '.join((
+        f'db;dur={metrics.db_time:.1f};desc="{metrics.queries} queries"',
+        f'tpl;dur={metrics.template_time:.1f}',
+        f'cache;desc="{metrics.cache_hits} hit {metrics.cache_misses} miss"',
+        f'total;dur={total_time:.1f}',
+    ))
+
+
+class MetricsMiddleware:
+    """
+    Собирает замеры запроса, добавляет заголовок Server-Timing
+    и учитывает замеры в гистограммах view.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        _instrument_cache()
+        metrics = _state.metrics = RequestMetrics()
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(_count_query))
+                response = self.get_response(request)
+        finally:
+            _state.metrics = None
+        total_time = (time.perf_counter() - started) * 1000
+        record(view_name(request), metrics, total_time)
+        response['Server-Timing'] = server_timing(metrics, total_time)
+        return response
@@ -0,0 +1,193 @@
+"""
+Профилирование медленных запросов в рабочем режиме.
+
+Доля запросов PROFILE_SAMPLE_RATE выполняется под cProfile. У остальных
+запросов, которые длятся дольше PROFILE_STACK_DELAY_MS, фоновый поток
+раз в PROFILE_SAMPLE_INTERVAL секунд снимает стеки: быстрые запросы
+сэмплер не трогает вовсе. Запросы под cProfile и запросы дольше
+PROFILE_SLOW_MS сохраняются в общий кеш под блокировкой: по каждому
+view не больше PROFILE_KEEP самых медленных. Блокировку не ждут:
+если она занята, профиль отбрасывается. Команда dump_profiles
+выгружает их в форматах pstats и collapsed для flamegraph.
+"""
+import cProfile
+import pstats
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .metrics import view_name
+
+PROFILE_KEY = 'profiles:{}'
+PROFILE_VIEWS_KEY = 'profiles:views'
+PROFILE_LOCK_KEY = 'profiles:lock'
+PROFILE_TIMEOUT = 24 * 60 * 60
+LOCK_TIMEOUT = 10
+
+
+def collapse(frame):
+    """
+    Стек кадра от корня в виде строки module.function;... для flamegraph.
+    """
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        module = frame.f_globals.get('__name__', '?')
+        names.append(f'{module}.{code.co_name}')
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class StackSampler:
+    """
+    Фоновый поток, снимающий стеки зарегистрированных потоков.
+    Работает только пока есть хотя бы один зарегистрированный поток;
+    стеки потока снимаются, когда с его регистрации прошло delay секунд.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._stacks = {}
+        self._lock = threading.Lock()
+        self._active = threading.Event()
+        self._thread = None
+
+    def start(self, thread_id, delay=0):
+        with self._lock:
+            self._stacks[thread_id] = (time.monotonic() + delay, Counter())
+            self._active.set()
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name='stack-sampler', daemon=True)
+                self._thread.start()
+
+    def stop(self, thread_id):
+        with self._lock:
+            _, stacks = self._stacks.pop(thread_id, (None, Counter()))
+            if not self._stacks:
+                self._active.clear()
+        return stacks
+
+    def sample(self):
+        now = time.monotonic()
+        with self._lock:
+            if all(due > now for due, _ in self._stacks.values()):
+                return
+        frames = sys._current_frames()
+        with self._lock:
+            for thread_id, (due, stacks) in self._stacks.items():
+                frame = frames.get(thread_id)
+                if due <= now and frame is not None:
+                    stacks[collapse(frame)] += 1
+
+    def _run(self):
+        while True:
+            self._active.wait()
+            time.sleep(self.interval)
+            self.sample()
+
+
+_sampler = None
+_sampler_lock = threading.Lock()
+
+
+def get_sampler():
+    global _sampler
+    with _sampler_lock:
+        if _sampler is None:
+            _sampler = StackSampler(settings.PROFILE_SAMPLE_INTERVAL)
+        return _sampler
+
+
+@contextmanager
+def _profiles_lock():
+    """
+    Блокировка списков профилей в общем кеше без ожидания: отдаёт
+    False, если её держит другой запрос. Ждать нельзя, профиль
+    сохраняется прямо в медленном запросе и задержал бы его ответ.
+    """
+    locked = cache.add(PROFILE_LOCK_KEY, 1, LOCK_TIMEOUT)
+    try:
+        yield locked
+    finally:
+        if locked:
+            cache.delete(PROFILE_LOCK_KEY)
+
+
+def save_profile(name, profile):
+    """
+    Добавляет профиль в список самых медленных профилей view.
+    Если блокировка занята, профиль отбрасывается: сэмпл
+    не стоит задержки ответа.
+    """
+    key = PROFILE_KEY.format(name)
+    with _profiles_lock() as locked:
+        if not locked:
+            return
+        profiles = cache.get(key) or []
+        profiles.append(profile)
+        profiles.sort(key=lambda item: item['duration'], reverse=True)
+        cache.set(key, profiles[:settings.PROFILE_KEEP], PROFILE_TIMEOUT)
+        names = cache.get(PROFILE_VIEWS_KEY) or set()
+        if name not in names:
+            cache.set(PROFILE_VIEWS_KEY, names | {name}, PROFILE_TIMEOUT)
+
+
+def load_profiles(name=None):
+    """
+    Сохранённые профили: {view: [профиль, ...]}.
+    """
+    names = [name] if name else sorted(cache.get(PROFILE_VIEWS_KEY) or ())
+    return {
+        name: cache.get(PROFILE_KEY.format(name)) or [] for name in names
+    }
+
+
+def clear_profiles():
+    names = cache.get(PROFILE_VIEWS_KEY) or ()
+    cache.delete_many([PROFILE_KEY.format(name) for name in names])
+    cache.delete(PROFILE_VIEWS_KEY)
+
+
+class ProfilingMiddleware:
+    """
+    Профилирует часть запросов целиком и сохраняет стеки
+    всех запросов дольше PROFILE_SLOW_MS.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        profiler = None
+        if random.random() < settings.PROFILE_SAMPLE_RATE:
+            profiler = cProfile.Profile()
+        sampler = get_sampler()
+        thread_id = threading.get_ident()
+        sampler.start(thread_id, settings.PROFILE_STACK_DELAY_MS / 1000)
+        started = time.perf_counter()
+        try:
+            if profiler is None:
+                response = self.get_response(request)
+            else:
+                response = profiler.runcall(self.get_response, request)
+        finally:
+            duration = (time.perf_counter() - started) * 1000
+            stacks = sampler.stop(thread_id)
+        if profiler is not None or duration >= settings.PROFILE_SLOW_MS:
+            save_profile(view_name(request), {
+                'path': request.get_full_path(),
+                'method': request.method,
+                'status': response.status_code,
+                'duration': duration,
+                'started': time.time() - duration / 1000,
+                'stats': pstats.Stats(profiler).stats if profiler else None,
+                'stacks': stacks,
+            })
+        return response
@@ -0,0 +1,127 @@
+"""
+Чтение из реплик базы данных для страниц без записи.
+
+View, обёрнутые в read_from_replica, читают из случайной реплики
+из DATABASE_REPLICAS, остальные запросы идут в основную базу.
+После записи (небезопасный запрос или любой запрос, который писал
+в базу через роутер, например подписка по GET) ReplicaPinMiddleware
+ставит cookie, и REPLICA_PIN_SECONDS секунд сессия читает из основной
+базы, чтобы видеть свои изменения (read-your-writes).
+
+Ответ, собранный по реплике, помечается атрибутом replica: реплика
+может отставать от версий данных в кеше, поэтому такой ответ нельзя
+кешировать под текущей версией или снабжать валидаторами. Код,
+которому нужна согласованность с кешем, читает внутри primary_reads.
+"""
+import random
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+
+PIN_COOKIE = 'db_pin'
+PRIMARY_ONLY_APPS = ('sessions',)
+
+_state = threading.local()
+
+
+def current_read_alias():
+    return getattr(_state, 'alias', None)
+
+
+def _is_pinned(request):
+    try:
+        return float(request.COOKIES.get(PIN_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+@contextmanager
+def primary_reads():
+    """
+    Чтения внутри блока идут в основную базу, даже во view,
+    обёрнутых в read_from_replica.
+    """
+    previous = getattr(_state, 'primary', False), current_read_alias()
+    _state.primary, _state.alias = True, None
+    try:
+        yield
+    finally:
+        _state.primary, _state.alias = previous
+
+
+def rendered_from_replica(response):
+    return getattr(response, 'replica', None) is not None
+
+
+def read_from_replica(view_func):
+    """
+    Направляет чтения внутри view в реплику, если сессия
+    не закреплена за основной базой недавней записью.
+    """
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        replicas = settings.DATABASE_REPLICAS
+        if not replicas or request.method not in ('GET', 'HEAD') or (
+                getattr(_state, 'primary', False) or _is_pinned(request)):
+            return view_func(request, *args, **kwargs)
+        previous = current_read_alias()
+        _state.alias = random.choice(replicas)
+        try:
+            response = view_func(request, *args, **kwargs)
+            if hasattr(response, 'render') and callable(response.render):
+                response.render()
+            response.replica = _state.alias
+            return response
+        finally:
+            _state.alias = previous
+    return wrapper
+
+
+class ReplicaRouter:
+    """
+    Чтение — из реплики, выбранной read_from_replica, или из основной
+    базы; запись и миграции — только в основную базу.
+    """
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label in PRIMARY_ONLY_APPS:
+            return 'default'
+        return current_read_alias()
+
+    def db_for_write(self, model, **hints):
+        if model._meta.app_label not in PRIMARY_ONLY_APPS:
+            _state.wrote = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
+
+
+class ReplicaPinMiddleware:
+    """
+    Закрепляет сессию за основной базой после запроса с записью.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        _state.wrote = False
+        response = self.get_response(request)
+        if _state.wrote or request.method not in (
+                'GET', 'HEAD', 'OPTIONS', 'TRACE'):
+            seconds = settings.REPLICA_PIN_SECONDS
+            response.set_cookie(
+                PIN_COOKIE,
+                str(time.time() + seconds),
+                max_age=seconds,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
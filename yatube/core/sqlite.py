@@ -0,0 +1,60 @@
+"""
+Настройка соединений SQLite для работы под нагрузкой.
+
+Каждое новое соединение получает PRAGMA из SQLITE_PRAGMAS: журнал
+WAL (чтения не ждут запись), synchronous=NORMAL, ожидание снятия
+блокировки вместо ошибки «database is locked», отображение файла
+в память и увеличенный кеш страниц.
+
+Соединения живут CONN_MAX_AGE секунд и переиспользуются между
+запросами; перед запросом открытые соединения проверяются, и
+неработающие закрываются, чтобы запрос открыл новое.
+"""
+from django.conf import settings
+from django.core.signals import request_started
+from django.db import DatabaseError, connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+def apply_pragmas(cursor, pragmas):
+    """
+    Выполняет PRAGMA из словаря {имя: значение} на курсоре DB-API.
+    """
+    for name, value in pragmas.items():
+        cursor.execute(f'PRAGMA {name} = {value}')
+
+
+@receiver(connection_created)
+def configure_connection(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        apply_pragmas(cursor, settings.SQLITE_PRAGMAS)
+
+
+def is_alive(connection):
+    """
+    Проверяет открытое соединение простым запросом.
+    """
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+    except DatabaseError:
+        return False
+    return True
+
+
+@receiver(request_started)
+def check_connections(**kwargs):
+    """
+    Закрывает переиспользуемые соединения, которые перестали
+    отвечать, вместо ошибки в первом запросе view.
+    """
+    for connection in connections.all():
+        if connection.connection is None or connection.in_atomic_block:
+            continue
+        if not connection.settings_dict['CONN_MAX_AGE']:
+            continue
+        if not is_alive(connection):
+            connection.close()
@@ -0,0 +1,149 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from django.core.cache import caches
+from django.test import SimpleTestCase, override_settings
+
+from ..cache_backends import SQLiteCache, TwoLevelCache
+
+LOCMEM = 'django.core.cache.backends.locmem.LocMemCache'
+
+
+@override_settings(CACHES={
+    'default': {'BACKEND': LOCMEM},
+    'shared': {'BACKEND': LOCMEM, 'LOCATION': 'two-level-tests'},
+})
+class TwoLevelCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        self.cache = TwoLevelCache('shared', {
+            'OPTIONS': {
+                'MAX_ENTRIES': 2,
+                'LOCAL_TIMEOUT': 60,
+                'SHARED_ONLY_PREFIXES': ('lock:',),
+            },
+        })
+        self.shared = caches['shared']
+        self.shared.clear()
+
+    def test_reads_are_served_from_local_level(self):
+        self.cache.set('key', 'value')
+        self.shared.delete('key')
+        self.assertEqual(self.cache.get('key'), 'value')
+        self.assertEqual(self.cache.stats()['hits'], 1)
+
+    def test_local_misses_fall_back_to_shared_cache(self):
+        self.shared.set('key', 'value')
+        self.assertEqual(self.cache.get('key'), 'value')
+        self.assertEqual(self.cache.get('key'), 'value')
+        stats = self.cache.stats()
+        self.assertEqual((stats['misses'], stats['hits']), (1, 1))
+
+    def test_least_recently_used_entries_are_evicted(self):
+        self.cache.set('first', 1)
+        self.cache.set('second', 2)
+        self.cache.get('first')
+        self.cache.set('third', 3)
+        stats = self.cache.stats()
+        self.assertEqual((stats['size'], stats['evictions']), (2, 1))
+        self.shared.delete('second')
+        self.assertIsNone(self.cache.get('second'))
+        self.assertEqual(self.cache.get('first'), 1)
+
+    def test_get_many_reads_missing_keys_from_shared_cache(self):
+        self.cache.set('local', 1)
+        self.shared.set('shared', 2)
+        self.shared.set('lock:page', 3)
+        self.assertEqual(
+            self.cache.get_many(['local', 'shared', 'lock:page', 'missing']),
+            {'local': 1, 'shared': 2, 'lock:page': 3},
+        )
+        self.shared.delete('shared')
+        self.assertEqual(self.cache.get_many(['shared']), {'shared': 2})
+
+    def test_shared_only_keys_skip_local_level(self):
+        self.assertTrue(self.cache.add('lock:page', 1))
+        self.assertFalse(self.cache.add('lock:page', 1))
+        self.shared.delete('lock:page')
+        self.assertIsNone(self.cache.get('lock:page'))
+
+    def test_incr_drops_local_copy(self):
+        self.cache.set('counter', 1)
+        self.assertEqual(self.cache.incr('counter'), 2)
+        self.assertEqual(self.cache.get('counter'), 2)
+
+
+class SQLiteCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, True)
+        self.path = os.path.join(directory, 'cache.sqlite3')
+        self.cache = self.make_cache()
+
+    def make_cache(self, **options):
+        return SQLiteCache(self.path, {'OPTIONS': options})
+
+    def run_threads(self, target, count=4):
+        threads = [threading.Thread(target=target) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def test_values_round_trip(self):
+        self.cache.set('number', 5)
+        self.cache.set('data', {'list': [1, 2]})
+        self.assertEqual(self.cache.get('number'), 5)
+        self.assertEqual(self.cache.get('data'), {'list': [1, 2]})
+        self.assertEqual(
+            self.cache.get_many(['number', 'data', 'missing']),
+            {'number': 5, 'data': {'list': [1, 2]}})
+
+    def test_expired_entries_are_missing(self):
+        self.cache.set('key', 'value', 0.01)
+        time.sleep(0.02)
+        self.assertIsNone(self.cache.get('key'))
+        self.assertTrue(self.cache.add('key', 'new'))
+        self.assertEqual(self.cache.get('key'), 'new')
+
+    def test_add_keeps_existing_value(self):
+        self.assertTrue(self.cache.add('key', 1))
+        self.assertFalse(self.cache.add('key', 2))
+        self.assertEqual(self.cache.get('key'), 1)
+
+    def test_incr_missing_key_raises(self):
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_concurrent_incr_loses_no_updates(self):
+        self.cache.set('counter', 0)
+
+        def bump():
+            cache = self.make_cache()
+            for _ in range(50):
+                cache.incr('counter')
+
+        self.run_threads(bump)
+        self.assertEqual(self.cache.get('counter'), 200)
+
+    def test_concurrent_add_succeeds_once(self):
+        added = []
+
+        def lock():
+            added.append(self.make_cache().add('lock', 1))
+
+        self.run_threads(lock, count=8)
+        self.assertEqual(added.count(True), 1)
+
+    def test_overflow_culls_soonest_expiring_entries(self):
+        cache = self.make_cache(MAX_ENTRIES=4, CULL_FREQUENCY=2)
+        cache.set('version', 1, None)
+        for number in range(4):
+            cache.set(f'key{number}', number, 60 + number)
+        self.assertEqual(cache.get('version'), 1)
+        self.assertIsNone(cache.get('key0'))
+        self.assertEqual(cache.get('key3'), 3)
@@ -0,0 +1,72 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, SimpleTestCase, TestCase
+from django.urls import reverse
+
+from posts.models import Post
+
+from .. import metrics
+
+User = get_user_model()
+
+
+class HistogramTests(SimpleTestCase):
+
+    def test_values_fall_into_upper_bound_buckets(self):
+        histogram = metrics.Histogram((1, 10))
+        for value in (0.5, 1, 5, 50):
+            histogram.observe(value)
+        self.assertEqual(histogram.as_dict(), {
+            'count': 4,
+            'sum': 56.5,
+            'buckets': {'<=1': 2, '<=10': 1, '>10': 1},
+        })
+
+
+class MetricsMiddlewareTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+        self.user = User.objects.create(username='author')
+        Post.objects.create(text='Тестовый пост', author=self.user)
+        self.staff = User.objects.create(username='staff', is_staff=True)
+        self.staff_client = Client()
+        self.staff_client.force_login(self.staff)
+
+    def test_response_has_server_timing(self):
+        response = self.client.get(
+            reverse('posts:profile', args=[self.user.username]))
+        timing = response['Server-Timing']
+        self.assertIn('db;dur=', timing)
+        self.assertIn('tpl;dur=', timing)
+        self.assertIn('total;dur=', timing)
+        self.assertNotIn('"0 queries"', timing)
+
+    def test_requests_are_aggregated_per_view(self):
+        url = reverse('posts:index')
+        self.client.get(url)
+        self.client.get(url)
+        stats = metrics.snapshot()['posts:index']
+        self.assertEqual(stats['requests'], 2)
+        self.assertGreater(stats['queries']['sum'], 0)
+        self.assertGreater(stats['cache_hits'], 0)
+        self.assertGreater(stats['cache_misses'], 0)
+
+    def test_get_many_counts_each_key_once(self):
+        metrics._instrument_cache()
+        cache.set('present', 1)
+        metrics._state.metrics = request = metrics.RequestMetrics()
+        try:
+            cache.get_many(['present', 'first', 'second'])
+        finally:
+            metrics._state.metrics = None
+        self.assertEqual((request.cache_hits, request.cache_misses), (1, 2))
+
+    def test_stats_endpoint_is_for_staff_only(self):
+        self.client.get(reverse('posts:index'))
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 302)
+        response = self.staff_client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('posts:index', response.json())
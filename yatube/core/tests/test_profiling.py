@@ -0,0 +1,105 @@
+import os
+import pstats
+import shutil
+import tempfile
+import time
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.urls import ResolverMatch
+
+from .. import profiling
+
+LOCMEM = 'django.core.cache.backends.locmem.LocMemCache'
+
+
+def slow_view(request):
+    time.sleep(0.05)
+    return HttpResponse()
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': LOCMEM, 'LOCATION': 'profiling-tests'}},
+    PROFILE_SAMPLE_RATE=0,
+    PROFILE_STACK_DELAY_MS=0,
+    PROFILE_SLOW_MS=10,
+    PROFILE_KEEP=2,
+)
+class ProfilingMiddlewareTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.output = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.output, ignore_errors=True)
+
+    def request(self, view=slow_view):
+        def get_response(request):
+            request.resolver_match = ResolverMatch(
+                view, (), {}, url_name='slow', namespaces=['posts'])
+            return view(request)
+
+        middleware = profiling.ProfilingMiddleware(get_response)
+        return middleware(self.factory.get('/slow/'))
+
+    def test_slow_request_keeps_sampled_stacks(self):
+        self.request()
+        [profile] = profiling.load_profiles()['posts:slow']
+        self.assertGreaterEqual(profile['duration'], 50)
+        self.assertIsNone(profile['stats'])
+        self.assertTrue(any(
+            'test_profiling.slow_view' in stack
+            for stack in profile['stacks']))
+
+    @override_settings(PROFILE_STACK_DELAY_MS=10000)
+    def test_stacks_are_taken_only_after_delay(self):
+        with mock.patch.object(profiling.sys, '_current_frames') as frames:
+            self.request()
+        frames.assert_not_called()
+        [profile] = profiling.load_profiles()['posts:slow']
+        self.assertFalse(profile['stacks'])
+
+    @override_settings(PROFILE_SLOW_MS=10000)
+    def test_fast_request_is_not_kept(self):
+        self.request()
+        self.assertEqual(profiling.load_profiles(), {})
+
+    @override_settings(PROFILE_SAMPLE_RATE=1, PROFILE_SLOW_MS=10000)
+    def test_sampled_request_is_profiled(self):
+        self.request()
+        [profile] = profiling.load_profiles()['posts:slow']
+        functions = {name for _, _, name in profile['stats']}
+        self.assertIn('slow_view', functions)
+
+    def test_only_slowest_profiles_are_kept(self):
+        for duration in (30, 10, 20):
+            profiling.save_profile('posts:slow', {'duration': duration})
+        profiles = profiling.load_profiles()['posts:slow']
+        self.assertEqual([item['duration'] for item in profiles], [30, 20])
+
+    def test_save_under_held_lock_is_dropped_without_waiting(self):
+        cache.add(profiling.PROFILE_LOCK_KEY, 1, profiling.LOCK_TIMEOUT)
+        started = time.monotonic()
+        profiling.save_profile('posts:slow', {'duration': 10})
+        self.assertLess(time.monotonic() - started, 0.1)
+        self.assertEqual(profiling.load_profiles('posts:slow'),
+                         {'posts:slow': []})
+        cache.delete(profiling.PROFILE_LOCK_KEY)
+        profiling.save_profile('posts:slow', {'duration': 20})
+        self.assertEqual(len(profiling.load_profiles()['posts:slow']), 1)
+
+    @override_settings(PROFILE_SAMPLE_RATE=1)
+    def test_dump_profiles_writes_pstats_and_collapsed(self):
+        self.request()
+        call_command(
+            'dump_profiles', output=self.output, clear=True, stdout=StringIO())
+        base = os.path.join(self.output, 'posts-slow-1')
+        stats = pstats.Stats(f'{base}.pstats')
+        self.assertTrue(stats.total_calls)
+        with open(f'{base}.collapsed') as collapsed:
+            self.assertIn('slow_view', collapsed.read())
+        self.assertEqual(profiling.load_profiles(), {})
@@ -0,0 +1,130 @@
+import time
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post
+
+from .. import replicas
+
+User = get_user_model()
+
+
+@override_settings(DATABASE_REPLICAS=['replica1', 'replica2'])
+class ReplicaRouterTests(TestCase):
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.router = replicas.ReplicaRouter()
+        self.seen = {}
+
+        @replicas.read_from_replica
+        def view(request):
+            self.seen['post'] = self.router.db_for_read(Post)
+            self.seen['session'] = self.router.db_for_read(Session)
+            return HttpResponse()
+
+        self.view = view
+
+    def test_reads_go_to_replica_inside_read_views(self):
+        self.view(self.factory.get('/'))
+        self.assertIn(self.seen['post'], ('replica1', 'replica2'))
+        self.assertEqual(self.seen['session'], 'default')
+        self.assertIsNone(self.router.db_for_read(Post))
+
+    def test_writes_and_migrations_go_to_primary(self):
+        self.assertEqual(self.router.db_for_write(Post), 'default')
+        self.assertFalse(self.router.allow_migrate('replica1', 'posts'))
+
+    def test_pinned_session_reads_primary(self):
+        request = self.factory.get('/')
+        request.COOKIES[replicas.PIN_COOKIE] = str(time.time() + 5)
+        self.view(request)
+        self.assertIsNone(self.seen['post'])
+
+    def test_expired_pin_is_ignored(self):
+        request = self.factory.get('/')
+        request.COOKIES[replicas.PIN_COOKIE] = str(time.time() - 1)
+        self.view(request)
+        self.assertIsNotNone(self.seen['post'])
+
+    def test_primary_reads_override_replica_views(self):
+        with replicas.primary_reads():
+            response = self.view(self.factory.get('/'))
+        self.assertIsNone(self.seen['post'])
+        self.assertFalse(replicas.rendered_from_replica(response))
+
+    def test_replica_response_is_marked(self):
+        response = self.view(self.factory.get('/'))
+        self.assertTrue(replicas.rendered_from_replica(response))
+
+
+@override_settings(DATABASE_REPLICAS=['default'])
+class ReadYourWritesTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='auth')
+        self.post = Post.objects.create(author=self.user, text='Пост')
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_write_pins_following_reads_to_primary(self):
+        url = reverse('posts:post_detail', args=[self.post.pk])
+        with mock.patch.object(
+                replicas.random, 'choice', return_value='default') as pick:
+            self.client.get(url)
+            self.assertEqual(pick.call_count, 1)
+            response = self.client.post(
+                reverse('posts:add_comment', args=[self.post.pk]),
+                {'text': 'Комментарий'},
+            )
+            self.assertIn(replicas.PIN_COOKIE, response.cookies)
+            self.client.get(url)
+            self.assertEqual(pick.call_count, 1)
+
+    def test_write_through_get_pins_reads(self):
+        author = User.objects.create_user(username='author')
+        response = self.client.get(
+            reverse('posts:profile_follow', args=[author.username]))
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(replicas.PIN_COOKIE, response.cookies)
+
+    def test_read_does_not_pin(self):
+        response = self.client.get(
+            reverse('posts:profile', args=[self.user.username]))
+        self.assertNotIn(replicas.PIN_COOKIE, response.cookies)
+
+    def test_read_views_use_replica(self):
+        urls = (
+            reverse('posts:group_list', args=['missing']),
+            reverse('posts:profile', args=[self.user.username]),
+            reverse('posts:follow_index'),
+            reverse('posts:search'),
+        )
+        for url in urls:
+            with self.subTest(url=url), mock.patch.object(
+                    replicas.random, 'choice',
+                    return_value='default') as pick:
+                self.client.get(url)
+                pick.assert_called_once()
+
+    def test_replica_page_has_no_validators(self):
+        url = reverse('posts:profile', args=[self.user.username])
+        with mock.patch.object(
+                replicas.random, 'choice', return_value='default'):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('ETag'))
+
+    def test_cached_feed_page_is_rendered_from_primary(self):
+        with mock.patch.object(
+                replicas.random, 'choice', return_value='default') as pick:
+            response = Client().get(reverse('posts:index'))
+            pick.assert_not_called()
+        self.assertTrue(response.has_header('ETag'))
@@ -0,0 +1,64 @@
+from unittest import mock
+
+from django.conf import settings
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+
+from .. import sqlite
+from ..management.commands import bench_writers
+
+
+class SqlitePragmaTests(TestCase):
+
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_new_connections_are_tuned(self):
+        self.assertEqual(
+            self.pragma('busy_timeout'),
+            settings.SQLITE_PRAGMAS['busy_timeout'])
+        self.assertEqual(
+            self.pragma('cache_size'), settings.SQLITE_PRAGMAS['cache_size'])
+        self.assertEqual(self.pragma('synchronous'), 1)
+
+
+class ConnectionHealthCheckTests(SimpleTestCase):
+
+    def setUp(self):
+        self.connection = mock.Mock(
+            connection=object(),
+            in_atomic_block=False,
+            settings_dict={'CONN_MAX_AGE': 60},
+        )
+        patcher = mock.patch.object(
+            sqlite.connections, 'all', return_value=[self.connection])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_broken_connection_is_closed(self):
+        with mock.patch.object(sqlite, 'is_alive', return_value=False):
+            sqlite.check_connections()
+        self.connection.close.assert_called_once_with()
+
+    def test_alive_connection_is_reused(self):
+        with mock.patch.object(sqlite, 'is_alive', return_value=True):
+            sqlite.check_connections()
+        self.connection.close.assert_not_called()
+
+    def test_connection_in_transaction_is_not_checked(self):
+        self.connection.in_atomic_block = True
+        with mock.patch.object(sqlite, 'is_alive') as is_alive:
+            sqlite.check_connections()
+        is_alive.assert_not_called()
+
+
+class BenchWritersTests(SimpleTestCase):
+
+    def test_concurrent_writers_do_not_fail(self):
+        result = bench_writers.run(
+            settings.SQLITE_PRAGMAS, writers=3, readers=1, seconds=0.2)
+        self.assertGreater(result['writes'], 0)
+        self.assertGreater(result['reads'], 0)
+        self.assertEqual(result['errors'], 0)
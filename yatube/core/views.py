@@ -1,9 +1,13 @@
 """
 View-функции для страниц с ошибками
-404, 403, 403csrf, 500.
+404, 403, 403csrf, 500 и служебная страница замеров.
 """
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
 from django.shortcuts import render
 
+from . import metrics
+
 
 def page_not_found(request, exception):
     return render(request, 'core/404.html', {'path': request.path}, status=404)
@@ -19,3 +23,12 @@ def permission_denied(request, exception):
 
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html')
+
+
+@staff_member_required
+def metrics_stats(request):
+    """
+    Гистограммы замеров запросов по view для персонала.
+    """
+    return JsonResponse(
+        metrics.snapshot(), json_dumps_params={'ensure_ascii': False})
@@ -1,9 +1,43 @@
 """
 Создание зоны администратора.
 """
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
+from django.urls import reverse
+from django.utils.html import format_html
 
-from .models import Comment, Follow, Group, Post
+from . import moderation
+from .caching import group_choices
+from .models import Comment, Follow, Group, ModerationJob, Post
+from .paginators import EstimatedCountPaginator
+from .search import search_posts
+
+
+class ModerationActionForm(ActionForm):
+    """
+    Форма действий списка постов с выбором сообщества для переноса.
+    """
+    group = forms.TypedChoiceField(
+        label='Сообщество',
+        choices=lambda: [('', '---------'), *group_choices()],
+        coerce=int,
+        required=False,
+    )
+
+
+def _queue(modeladmin, request, kind, **params):
+    job = moderation.start_job(kind, request.user, **params)
+    url = reverse('admin:posts_moderationjob_change', args=[job.pk])
+    modeladmin.message_user(request, format_html(
+        'Задание <a href="{}">{}</a> поставлено в очередь: {} записей.',
+        url, job, job.total,
+    ))
+
+
+def _author_ids(queryset):
+    return list(queryset.order_by().values_list(
+        'author_id', flat=True).distinct())
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -19,12 +53,97 @@ class PostAdmin(admin.ModelAdmin):
         'group',
     )
     list_editable = ('group',)
+    list_select_related = ('author', 'group')
     search_fields = ('text',)
     list_filter = ('pub_date',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     empty_value_display = '-пусто-'
+    action_form = ModerationActionForm
+    actions = ('delete_authors_posts', 'reassign_group', 'purge_authors')
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        """
+        Список сообществ берётся из кеша, а не запросом в каждой
+        строке списка с редактируемым полем group.
+        """
+        field = super().formfield_for_foreignkey(db_field, request, **kwargs)
+        if db_field.name == 'group':
+            field.choices = [('', field.empty_label), *group_choices()]
+        return field
+
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Ищет по полнотекстовому индексу вместо LIKE по всей таблице.
+        """
+        if not search_term.strip():
+            return queryset, False
+        return search_posts(search_term, queryset), False
+
+    def delete_authors_posts(self, request, queryset):
+        _queue(self, request, ModerationJob.DELETE_POSTS,
+               author_ids=_author_ids(queryset))
+    delete_authors_posts.short_description = (
+        'Удалить все посты авторов выбранных постов')
+
+    def reassign_group(self, request, queryset):
+        group_id = request.POST.get('group')
+        if not group_id:
+            self.message_user(
+                request, 'Выберите сообщество.', messages.WARNING)
+            return
+        _queue(self, request, ModerationJob.REASSIGN_GROUP,
+               post_ids=list(queryset.values_list('pk', flat=True)),
+               group_id=int(group_id))
+    reassign_group.short_description = (
+        'Перенести выбранные посты в сообщество')
+
+    def purge_authors(self, request, queryset):
+        _queue(self, request, ModerationJob.PURGE_USERS,
+               user_ids=_author_ids(queryset))
+    purge_authors.short_description = (
+        'Удалить все материалы авторов и заблокировать их')
+
+
+class CommentAdmin(admin.ModelAdmin):
+    """
+    Настройка вида администратора для модели комментариев.
+    """
+    list_display = ('pk', 'text', 'created', 'author', 'post')
+    list_select_related = ('author', 'post')
+    actions = ('delete_authors_comments',)
+
+    def delete_authors_comments(self, request, queryset):
+        _queue(self, request, ModerationJob.DELETE_COMMENTS,
+               author_ids=_author_ids(queryset))
+    delete_authors_comments.short_description = (
+        'Удалить все комментарии авторов выбранных комментариев')
+
+
+class ModerationJobAdmin(admin.ModelAdmin):
+    """
+    Ход выполнения заданий модерации.
+    """
+    list_display = (
+        '__str__', 'status', 'progress', 'processed', 'total',
+        'created_by', 'created', 'updated',
+    )
+    list_filter = ('status', 'kind')
+    readonly_fields = [field.name for field in ModerationJob._meta.fields]
+
+    def progress(self, job):
+        return f'{job.progress}%'
+    progress.short_description = 'Выполнено'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
 
 
 admin.site.register(Post, PostAdmin)
 admin.site.register(Group)
 admin.site.register(Follow)
-admin.site.register(Comment)
+admin.site.register(Comment, CommentAdmin)
+admin.site.register(ModerationJob, ModerationJobAdmin)
@@ -7,3 +7,6 @@ from django.apps import AppConfig
 class PostsConfig(AppConfig):
     name = 'posts'
     verbose_name = 'Управление запросами'
+
+    def ready(self):
+        from . import signals  # noqa: F401
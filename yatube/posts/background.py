@@ -0,0 +1,74 @@
+"""
+Пулы потоков для фоновых задач: обработки изображений,
+раскладки постов по лентам и заданий модерации.
+
+Задача ставится в пул после фиксации транзакции, чтобы не читать
+ещё не сохранённые данные. При нулевом числе потоков пула задачи
+выполняются в том же потоке.
+
+Задания модерации выполняются в отдельном пуле на
+MODERATION_WORKERS потоков: долгая очистка с паузами между
+пачками не задерживает обработку изображений. Раскладка постов
+по лентам идёт в своём пуле на FEED_WORKERS потоков.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+
+DEFAULT_POOL = 'background'
+MODERATION_POOL = 'moderation'
+FEED_POOL = 'feeds'
+POOL_WORKERS = {
+    DEFAULT_POOL: 'BACKGROUND_WORKERS',
+    MODERATION_POOL: 'MODERATION_WORKERS',
+    FEED_POOL: 'FEED_WORKERS',
+}
+
+_executors = {}
+_executor_lock = threading.Lock()
+
+
+def _workers(pool):
+    return getattr(settings, POOL_WORKERS[pool])
+
+
+def _get_executor(pool):
+    with _executor_lock:
+        if pool not in _executors:
+            _executors[pool] = ThreadPoolExecutor(
+                max_workers=_workers(pool),
+                thread_name_prefix=pool,
+            )
+        return _executors[pool]
+
+
+def drain():
+    """
+    Дожидается завершения поставленных в пулы задач. Нужна там,
+    где результат должен быть готов сразу: в командах и тестах.
+    """
+    with _executor_lock:
+        executors = list(_executors.values())
+        _executors.clear()
+    for executor in executors:
+        executor.shutdown(wait=True)
+
+
+def _in_worker(func, *args):
+    try:
+        func(*args)
+    finally:
+        connections.close_all()
+
+
+def run_after_commit(func, *args, pool=DEFAULT_POOL):
+    """
+    Выполняет func в пуле потоков pool после фиксации транзакции.
+    """
+    if _workers(pool):
+        transaction.on_commit(
+            lambda: _get_executor(pool).submit(_in_worker, func, *args))
+    else:
+        transaction.on_commit(lambda: func(*args))
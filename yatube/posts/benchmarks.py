@@ -0,0 +1,160 @@
+"""
+Замеры задержек и числа SQL-запросов страниц постов.
+
+Сценарий — запрос к одной странице от имени анонима или
+пользователя с подписками. Для каждого сценария считаются
+перцентили задержки и наибольшее число запросов к базе; сравнение
+с сохранённым эталоном находит рост числа запросов и задержки.
+"""
+import itertools
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .models import Follow, Group, Post
+
+User = get_user_model()
+
+# Рост p95 меньше этой доли или этого числа миллисекунд
+# считается шумом измерения.
+LATENCY_TOLERANCE = 0.5
+LATENCY_NOISE_MS = 5
+
+
+class Scenario:
+
+    def __init__(self, name, url, method='get', data=None, login=False):
+        self.name = name
+        self.url = url
+        self.method = method
+        self.data = data
+        self.login = login
+
+    def request(self, client, number):
+        data = self.data(number) if self.data else None
+        return getattr(client, self.method)(self.url(number), data)
+
+
+def build_scenarios():
+    """
+    Сценарии для текущих данных: самые популярные автор,
+    сообщество и пост, пользователь с наибольшим числом подписок.
+    """
+    author = User.objects.annotate(
+        total=Count('posts')).order_by('-total').first()
+    group = Group.objects.annotate(
+        total=Count('posts')).order_by('-total').first()
+    post = Post.objects.order_by('-comment_count', '-pk').first()
+    reader = User.objects.annotate(
+        total=Count('follower')).order_by('-total').first()
+    followed = set(Follow.objects.filter(user=reader).values_list(
+        'author__username', flat=True))
+    unfollowed = itertools.cycle(User.objects.exclude(
+        username__in=followed | {reader.username}).values_list(
+        'username', flat=True)[:200])
+    return reader, [
+        Scenario('index', lambda n: reverse('posts:index')),
+        Scenario('group_posts', lambda n: reverse(
+            'posts:group_list', args=[group.slug])),
+        Scenario('profile', lambda n: reverse(
+            'posts:profile', args=[author.username])),
+        Scenario('post_detail', lambda n: reverse(
+            'posts:post_detail', args=[post.pk])),
+        Scenario('follow_index', lambda n: reverse(
+            'posts:follow_index'), login=True),
+        Scenario(
+            'post_create', lambda n: reverse('posts:post_create'),
+            method='post', data=lambda n: {'text': f'Новый пост {n}'},
+            login=True),
+        Scenario(
+            'add_comment',
+            lambda n: reverse('posts:add_comment', args=[post.pk]),
+            method='post', data=lambda n: {'text': f'Комментарий {n}'},
+            login=True),
+        Scenario(
+            'profile_follow',
+            lambda n: reverse(
+                'posts:profile_follow', args=[next(unfollowed)]),
+            login=True),
+    ]
+
+
+def percentile(values, share):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, round(share * (len(ordered) - 1)))
+    return ordered[index]
+
+
+def measure(client, scenario, requests):
+    """
+    Задержки запросов сценария в миллисекундах и наибольшее
+    число SQL-запросов. Первый запрос прогревает кеш и не учитывается.
+    """
+    cache.clear()
+    scenario.request(client, 0)
+    latencies = []
+    queries = 0
+    for number in range(1, requests + 1):
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            response = scenario.request(client, number)
+            latencies.append((time.perf_counter() - started) * 1000)
+        if response.status_code >= 400:
+            raise AssertionError(
+                f'{scenario.name}: ответ {response.status_code}')
+        queries = max(queries, len(captured))
+    return {
+        'p50': round(percentile(latencies, 0.5), 2),
+        'p95': round(percentile(latencies, 0.95), 2),
+        'p99': round(percentile(latencies, 0.99), 2),
+        'mean': round(statistics.mean(latencies), 2),
+        'queries': queries,
+    }
+
+
+def run_scenarios(requests):
+    reader, scenarios = build_scenarios()
+    anonymous = Client()
+    authorized = Client()
+    authorized.force_login(reader)
+    return {
+        scenario.name: measure(
+            authorized if scenario.login else anonymous,
+            scenario,
+            requests,
+        )
+        for scenario in scenarios
+    }
+
+
+def compare(results, baseline, tolerance=LATENCY_TOLERANCE):
+    """
+    Регрессии относительно эталона: больше SQL-запросов
+    или p95 выше эталона больше чем на tolerance.
+    """
+    regressions = []
+    for size, scenarios in results.items():
+        for name, current in scenarios.items():
+            expected = baseline.get(size, {}).get(name)
+            if expected is None:
+                continue
+            if current['queries'] > expected['queries']:
+                regressions.append(
+                    f'{size}/{name}: запросов {current["queries"]} '
+                    f'вместо {expected["queries"]}')
+            limit = max(
+                expected['p95'] * (1 + tolerance),
+                expected['p95'] + LATENCY_NOISE_MS,
+            )
+            if current['p95'] > limit:
+                regressions.append(
+                    f'{size}/{name}: p95 {current["p95"]} мс '
+                    f'при эталоне {expected["p95"]} мс')
+    return regressions
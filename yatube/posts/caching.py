@@ -0,0 +1,242 @@
+"""
+Кеширование страниц лент с точной инвалидацией по версии ленты.
+
+Версия хранится в кеше и увеличивается сигналами при изменении
+постов, сообществ и пользователей; ключ кеша страницы включает
+версию, поэтому срок жизни записи может быть долгим. Так же
+ведутся версии подписок пользователя и комментариев поста;
+вместе с версией хранится время последнего изменения.
+
+Пересчёт страницы выполняет один запрос под блокировкой в кеше,
+остальные в это время получают прежнюю версию страницы
+(stale-while-revalidate). Срок жизни истекает вероятностно
+и заранее, чтобы записи не устаревали у всех процессов разом.
+
+Страница, которая попадёт в кеш, собирается по основной базе:
+реплика может отставать от версии, прочитанной из кеша, и старая
+страница закрепилась бы под новой версией. Ответы, собранные
+по реплике, не кешируются.
+"""
+import hashlib
+import math
+import random
+import time
+from contextlib import nullcontext
+from functools import wraps
+
+from django.core.cache import cache
+from django.utils.cache import (get_cache_key, has_vary_header,
+                                learn_cache_key, patch_cache_control)
+
+from core.replicas import primary_reads, rendered_from_replica
+
+from .models import Group
+
+FEED_VERSION_KEY = 'feed:version'
+FOLLOW_VERSION_KEY = 'feed:follow_version:{}'
+COMMENTS_VERSION_KEY = 'feed:comments_version:{}'
+MODIFIED_SUFFIX = ':modified'
+GROUP_CHOICES_KEY = 'admin:group_choices'
+GROUP_CHOICES_TIMEOUT = 60 * 60
+LOCK_TIMEOUT = 30
+COLD_WAIT = 0.5
+COLD_POLL = 0.05
+
+
+def _initial(name, now):
+    return now if name.endswith(MODIFIED_SUFFIX) else int(now * 1000)
+
+
+def get_version(key):
+    """
+    Текущая версия данных. При потере ключа версия начинается
+    с текущего времени, чтобы не совпасть с прежними значениями.
+    """
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _initial(key, time.time()), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(key):
+    """
+    Увеличивает версию данных и запоминает время изменения.
+    """
+    cache.set(key + MODIFIED_SUFFIX, time.time(), None)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        return get_version(key)
+
+
+def get_versions(*keys):
+    """
+    Пары (версия, время изменения) для ключей одним обращением
+    к кешу. Потерянное время изменения считается текущим.
+    """
+    names = [name for key in keys for name in (key, key + MODIFIED_SUFFIX)]
+    values = cache.get_many(names)
+    now = time.time()
+    for name in names:
+        if name not in values:
+            cache.add(name, _initial(name, now), None)
+            values[name] = cache.get(name, _initial(name, now))
+    return [(values[key], values[key + MODIFIED_SUFFIX]) for key in keys]
+
+
+def get_feed_version():
+    return get_version(FEED_VERSION_KEY)
+
+
+def bump_feed_version():
+    """
+    Помечает все закешированные страницы лент устаревшими.
+    """
+    return bump_version(FEED_VERSION_KEY)
+
+
+def group_choices():
+    """
+    Варианты выбора сообщества (pk, название) для списков админки.
+    Сбрасываются сигналами при изменении сообществ.
+    """
+    choices = cache.get(GROUP_CHOICES_KEY)
+    if choices is None:
+        choices = list(
+            Group.objects.order_by('title').values_list('pk', 'title'))
+        cache.set(GROUP_CHOICES_KEY, choices, GROUP_CHOICES_TIMEOUT)
+    return choices
+
+
+def forget_group_choices():
+    cache.delete(GROUP_CHOICES_KEY)
+
+
+def _lock_key(request, key_prefix):
+    url = hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+    return f'single_flight.{key_prefix}.{url}'
+
+
+def _is_fresh(entry, version, beta):
+    """
+    Запись свежая, если версия совпадает и срок не истёк. Срок
+    сокращается на случайную долю времени пересчёта (XFetch):
+    чем дороже страница, тем раньше её начнут пересчитывать.
+    """
+    if entry['version'] != version:
+        return False
+    early = -entry['delta'] * beta * math.log(1 - random.random())
+    return time.time() + early < entry['stale_at']
+
+
+def _is_cacheable(request, response):
+    if response.streaming or response.status_code != 200:
+        return False
+    if rendered_from_replica(response):
+        return False
+    if 'private' in response.get('Cache-Control', ()):
+        return False
+    return not (
+        not request.COOKIES
+        and response.cookies
+        and has_vary_header(response, 'Cookie')
+    )
+
+
+def _store(request, response, timeout, key_prefix, version, delta):
+    if not _is_cacheable(request, response):
+        return
+    hard_timeout = timeout * 2
+    entry = {
+        'response': response,
+        'version': version,
+        'stale_at': time.time() + timeout,
+        'delta': delta,
+    }
+    cache_key = learn_cache_key(
+        request, response, hard_timeout, key_prefix, cache=cache)
+    if hasattr(response, 'render') and callable(response.render):
+        response.add_post_render_callback(
+            lambda rendered: cache.set(cache_key, entry, hard_timeout))
+    else:
+        cache.set(cache_key, entry, hard_timeout)
+
+
+def _cached_entry(request, key_prefix):
+    cache_key = get_cache_key(request, key_prefix, 'GET', cache=cache)
+    if cache_key is None:
+        return None
+    return cache.get(cache_key)
+
+
+def _served(entry, version):
+    """
+    Ответ из записи кеша. Устаревшую страницу, отданную на время
+    пересчёта, клиент не сохраняет и не переспрашивает по валидаторам.
+    """
+    response = entry['response']
+    if entry['version'] != version:
+        patch_cache_control(response, no_store=True)
+    return response
+
+
+def _wait_for_entry(request, key_prefix):
+    """
+    Ожидает, пока страницу без прежней версии посчитает
+    запрос, захвативший блокировку.
+    """
+    deadline = time.monotonic() + COLD_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(COLD_POLL)
+        entry = _cached_entry(request, key_prefix)
+        if entry is not None:
+            return entry
+    return None
+
+
+def cache_page_single_flight(timeout, key_prefix='', version=None,
+                             beta=1.0):
+    """
+    Замена cache_page с пересчётом страницы одним запросом.
+
+    version — функция, возвращающая текущую версию данных: запись
+    с другой версией считается устаревшей, но отдаётся, пока
+    новая страница считается в другом запросе.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view_func(request, *args, **kwargs)
+            current = version() if version is not None else None
+            entry = _cached_entry(request, key_prefix)
+            if entry is not None and _is_fresh(entry, current, beta):
+                return entry['response']
+            lock_key = _lock_key(request, key_prefix)
+            locked = cache.add(lock_key, 1, LOCK_TIMEOUT)
+            if not locked:
+                if entry is None:
+                    entry = _wait_for_entry(request, key_prefix)
+                if entry is not None:
+                    return _served(entry, current)
+            try:
+                started = time.monotonic()
+                with primary_reads() if locked else nullcontext():
+                    response = view_func(request, *args, **kwargs)
+                delta = time.monotonic() - started
+                _store(request, response, timeout, key_prefix, current, delta)
+            finally:
+                if locked:
+                    cache.delete(lock_key)
+            return response
+        return wrapper
+    return decorator
+
+
+def cache_feed_page(timeout, key_prefix):
+    """
+    Кеширует страницу ленты до изменения версии ленты.
+    """
+    return cache_page_single_flight(
+        timeout, key_prefix=key_prefix, version=get_feed_version)
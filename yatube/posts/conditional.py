@@ -0,0 +1,137 @@
+"""
+Условные GET-запросы (ETag и Last-Modified) к страницам лент и постов.
+
+Валидаторы страницы считаются по версиям данных из кеша и дате
+самого нового поста, которую отдаёт один запрос по индексу. Если
+клиент прислал совпадающий If-None-Match или If-Modified-Since,
+он получает 304 до выборки постов и рендера шаблона.
+
+Страницы авторизованного пользователя зависят от него самого,
+поэтому ETag включает ключ пользователя и cookie CSRF, а
+Last-Modified отдаётся только анонимным посетителям.
+
+Валидаторы считаются по основной базе и кешу, поэтому странице,
+собранной по отстающей реплике, они не ставятся: иначе ETag новой
+версии закрепил бы у клиента старое содержимое.
+"""
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import OuterRef, Subquery
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from core.replicas import rendered_from_replica
+
+from .caching import (COMMENTS_VERSION_KEY, FEED_VERSION_KEY,
+                      FOLLOW_VERSION_KEY, get_versions)
+from .models import FeedEntry, Post
+
+User = get_user_model()
+
+
+def _newest(queryset):
+    """
+    Самая поздняя pub_date выборки; запрос идёт по индексу с pub_date.
+    """
+    return queryset.order_by('-pub_date').values_list(
+        'pub_date', flat=True).first()
+
+
+def _state(versions, newest=None):
+    parts = [version for version, _ in versions]
+    dates = [modified for _, modified in versions]
+    if newest is not None:
+        parts.append(newest.isoformat())
+        dates.append(newest.timestamp())
+    return parts, max(dates)
+
+
+def index_state(request):
+    versions = get_versions(FEED_VERSION_KEY)
+    return _state(versions, _newest(Post.objects.all()))
+
+
+def group_state(request, slug):
+    versions = get_versions(FEED_VERSION_KEY)
+    return _state(versions, _newest(Post.objects.filter(group__slug=slug)))
+
+
+def profile_state(request, username):
+    """
+    Кроме постов автора, страница показывает его подписчиков
+    и подписку посетителя: они меняют версию подписок автора.
+    """
+    newest = Post.objects.filter(author=OuterRef('pk')).order_by(
+        '-pub_date').values('pub_date')[:1]
+    author_id, newest = User.objects.filter(username=username).values_list(
+        'pk', Subquery(newest)).first() or (None, None)
+    versions = get_versions(
+        FEED_VERSION_KEY, FOLLOW_VERSION_KEY.format(author_id))
+    return _state(versions, newest)
+
+
+def post_state(request, post_id):
+    versions = get_versions(
+        FEED_VERSION_KEY, COMMENTS_VERSION_KEY.format(post_id))
+    return _state(versions)
+
+
+def follow_state(request):
+    user_id = request.user.pk
+    versions = get_versions(
+        FEED_VERSION_KEY, FOLLOW_VERSION_KEY.format(user_id))
+    entries = FeedEntry.objects.filter(user_id=user_id)
+    return _state(versions, _newest(entries))
+
+
+def _etag(request, name, parts):
+    user = request.user
+    parts = [
+        name,
+        user.pk if user.is_authenticated else 0,
+        request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''),
+        *parts,
+    ]
+    digest = hashlib.md5(':'.join(map(str, parts)).encode()).hexdigest()
+    return quote_etag(digest)
+
+
+def _is_stale(response):
+    return 'no-store' in response.get('Cache-Control', ())
+
+
+def conditional_page(state):
+    """
+    Отвечает 304 на условный GET, если валидаторы страницы совпали.
+
+    state(request, *args, **kwargs) возвращает части ETag и время
+    последнего изменения страницы (timestamp). Устаревшей странице,
+    отданной кешем на время пересчёта, и странице, собранной по
+    реплике, валидаторы не ставятся.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view_func(request, *args, **kwargs)
+            parts, modified = state(request, *args, **kwargs)
+            etag = _etag(request, view_func.__name__, parts)
+            last_modified = None
+            if not request.user.is_authenticated:
+                last_modified = int(modified)
+            response = get_conditional_response(
+                request, etag=etag, last_modified=last_modified)
+            if response is None:
+                response = view_func(request, *args, **kwargs)
+            if response.status_code in (200, 304) and not (
+                    _is_stale(response) or rendered_from_replica(response)):
+                response.setdefault('ETag', etag)
+                if last_modified is not None:
+                    response.setdefault(
+                        'Last-Modified', http_date(last_modified))
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,237 @@
+"""
+Лента подписок: раскладка постов по лентам подписчиков
+при записи (fan-out on write) и чтение ленты.
+
+Посты авторов с числом подписчиков больше FEED_FANOUT_LIMIT
+не раскладываются, а подтягиваются при чтении (гибридная схема).
+Такой автор помечается в кеше; когда после отписок подписчиков
+становится не больше лимита, его последние посты раскладываются
+по лентам в фоне.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Count, F
+
+from .background import FEED_POOL, run_after_commit
+from .models import FeedEntry, Follow, Post
+
+PULL_AUTHOR_KEY = 'feed:pull_author:{}'
+PULLED_POSTS_KEY = 'feed:pulled_posts:{}'
+PULL_AUTHOR_TIMEOUT = 60
+FEED_ENTRY_ORDERING = ('-feed_date', '-feed_post')
+
+
+def _has_many_followers(author_id):
+    limit = settings.FEED_FANOUT_LIMIT
+    followers = Follow.objects.filter(author_id=author_id).order_by()
+    return followers.values('pk')[limit:limit + 1].exists()
+
+
+def pull_authors(author_ids):
+    """
+    Отбирает авторов, у которых больше FEED_FANOUT_LIMIT подписчиков.
+    Подсчёт ограничен лимитом и кешируется, поэтому не зависит
+    от числа подписчиков.
+    """
+    keys = {PULL_AUTHOR_KEY.format(pk): pk for pk in author_ids}
+    cached = cache.get_many(keys)
+    missing = {
+        key: _has_many_followers(pk)
+        for key, pk in keys.items() if key not in cached
+    }
+    cache.set_many(missing, PULL_AUTHOR_TIMEOUT)
+    cached.update(missing)
+    return {keys[key] for key, pull in cached.items() if pull}
+
+
+def _entries(post_values, user_ids):
+    for user_id in user_ids:
+        for post_id, author_id, pub_date in post_values:
+            yield FeedEntry(
+                user_id=user_id,
+                post_id=post_id,
+                author_id=author_id,
+                pub_date=pub_date,
+            )
+
+
+def fan_out_post(post_id):
+    """
+    Добавляет новый пост в ленты подписчиков автора; выполняется
+    в фоне после фиксации транзакции, создавшей пост.
+    """
+    author_id = Post.objects.filter(pk=post_id).values_list(
+        'author_id', flat=True).first()
+    if author_id is None:
+        return
+    if pull_authors([author_id]):
+        cache.set(PULLED_POSTS_KEY.format(author_id), True, None)
+        return
+    _fan_out(author_id, 1, post_id)
+
+
+def backfill_follow(follow):
+    """
+    Заполняет ленту нового подписчика последними постами автора.
+    """
+    cache.delete(PULL_AUTHOR_KEY.format(follow.author_id))
+    if pull_authors([follow.author_id]):
+        return
+    posts = Post.objects.filter(author_id=follow.author_id).order_by(
+        '-pub_date', '-pk').values_list('pk', 'author_id', 'pub_date')
+    post_values = posts[:settings.FEED_BACKFILL_LIMIT]
+    with transaction.atomic():
+        FeedEntry.objects.bulk_create(
+            _entries(post_values, [follow.user_id]),
+            batch_size=settings.FEED_FANOUT_BATCH,
+            ignore_conflicts=True,
+        )
+
+
+def _backfill_sql(pulled):
+    """
+    Записи лент для подписок из диапазона ключей: последние
+    FEED_BACKFILL_LIMIT постов автора, кроме авторов из pulled.
+    """
+    ops = connection.ops
+    feed = ops.quote_name(FeedEntry._meta.db_table)
+    follow = ops.quote_name(Follow._meta.db_table)
+    post = ops.quote_name(Post._meta.db_table)
+    excluded = ''
+    if pulled:
+        placeholders = ', '.join(['%s'] * len(pulled))
+        excluded = f'AND f.author_id NOT IN ({placeholders})'
+    return f"""
+        {ops.insert_statement(ignore_conflicts=True)} {feed}
+            (user_id, post_id, author_id, pub_date)
+        SELECT f.user_id, p.id, p.author_id, p.pub_date
+        FROM {follow} f
+        JOIN (
+            SELECT id, author_id, pub_date, ROW_NUMBER() OVER (
+                PARTITION BY author_id ORDER BY pub_date DESC, id DESC
+            ) AS position
+            FROM {post}
+            WHERE author_id IN (
+                SELECT author_id FROM {follow} WHERE id >= %s AND id < %s)
+        ) p ON p.author_id = f.author_id AND p.position <= %s
+        WHERE f.id >= %s AND f.id < %s {excluded}
+        {ops.ignore_conflicts_suffix_sql(ignore_conflicts=True)}
+    """
+
+
+def backfill_follows(first_pk=0, batch_size=2000):
+    """
+    Заполняет ленты по всем подпискам с ключом от first_pk так же,
+    как backfill_follow, одним запросом на пачку подписок. Нужна
+    после загрузки данных в обход сигналов. Возвращает число
+    добавленных записей.
+    """
+    pulled = list(Follow.objects.order_by().values('author').annotate(
+        total=Count('pk')).filter(
+        total__gt=settings.FEED_FANOUT_LIMIT).values_list('author', flat=True))
+    sql = _backfill_sql(pulled)
+    last = Follow.objects.order_by('-pk').values_list('pk', flat=True).first()
+    added = 0
+    for start in range(first_pk, (last or 0) + 1, batch_size):
+        end = start + batch_size
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(sql, [
+                start, end, settings.FEED_BACKFILL_LIMIT, start, end, *pulled,
+            ])
+            added += cursor.rowcount
+    return added
+
+
+def _author_sql(single_post=False):
+    """
+    Записи лент подписчиков автора из диапазона ключей подписок:
+    последние посты автора, не больше заданного числа, или один
+    заданный пост.
+    """
+    ops = connection.ops
+    feed = ops.quote_name(FeedEntry._meta.db_table)
+    follow = ops.quote_name(Follow._meta.db_table)
+    post = ops.quote_name(Post._meta.db_table)
+    single = 'AND id = %s' if single_post else ''
+    return f"""
+        {ops.insert_statement(ignore_conflicts=True)} {feed}
+            (user_id, post_id, author_id, pub_date)
+        SELECT f.user_id, p.id, p.author_id, p.pub_date
+        FROM {follow} f
+        JOIN (
+            SELECT id, author_id, pub_date FROM {post}
+            WHERE author_id = %s {single}
+            ORDER BY pub_date DESC, id DESC
+            LIMIT %s
+        ) p ON p.author_id = f.author_id
+        WHERE f.author_id = %s AND f.id >= %s AND f.id <= %s
+        {ops.ignore_conflicts_suffix_sql(ignore_conflicts=True)}
+    """
+
+
+def _fan_out(author_id, limit, post_id=None):
+    """
+    Раскладывает по лентам подписчиков автора его последние limit
+    постов или пост post_id. Каждая пачка — отдельная короткая
+    транзакция не больше чем на FEED_FANOUT_BATCH записей.
+    """
+    follows = list(Follow.objects.filter(author_id=author_id).order_by(
+        'pk').values_list('pk', flat=True))
+    step = max(settings.FEED_FANOUT_BATCH // limit, 1)
+    sql = _author_sql(single_post=post_id is not None)
+    posts = [author_id] if post_id is None else [author_id, post_id]
+    for start in range(0, len(follows), step):
+        chunk = follows[start:start + step]
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                sql, [*posts, limit, author_id, chunk[0], chunk[-1]])
+
+
+def backfill_author(author_id):
+    """
+    Раскладывает последние посты автора по лентам всех его
+    подписчиков. Нужна, когда автор перестаёт подтягиваться при
+    чтении: посты, написанные до этого, в лентах отсутствуют.
+    """
+    _fan_out(author_id, settings.FEED_BACKFILL_LIMIT)
+
+
+def drop_follow(follow):
+    """
+    Убирает посты автора из ленты отписавшегося пользователя. Если
+    у автора, чьи посты подтягивались при чтении, подписчиков стало
+    не больше FEED_FANOUT_LIMIT, ленты остальных после фиксации
+    дополняются в фоне постами, написанными за это время.
+    """
+    cache.delete(PULL_AUTHOR_KEY.format(follow.author_id))
+    FeedEntry.objects.filter(
+        user_id=follow.user_id, author_id=follow.author_id).delete()
+    pulled = PULLED_POSTS_KEY.format(follow.author_id)
+    if cache.get(pulled) and not pull_authors([follow.author_id]):
+        cache.delete(pulled)
+        run_after_commit(backfill_author, follow.author_id, pool=FEED_POOL)
+
+
+def follow_feed(user):
+    """
+    Источники ленты подписок для CursorPaginator: материализованная
+    лента и, при необходимости, посты популярных авторов.
+    """
+    sources = [
+        Post.objects.for_feed().filter(feed_entries__user=user).annotate(
+            feed_date=F('feed_entries__pub_date'),
+            feed_post=F('feed_entries__post'),
+        )
+    ]
+    followed = Follow.objects.filter(user=user).values_list(
+        'author_id', flat=True)
+    pulled = pull_authors(followed)
+    if pulled:
+        sources.append(
+            Post.objects.for_feed().filter(author_id__in=pulled).annotate(
+                feed_date=F('pub_date'),
+                feed_post=F('pk'),
+            )
+        )
+    return sources
@@ -0,0 +1,20 @@
+"""
+Поле полнотекстового индекса SQLite FTS5.
+"""
+from django.db import models
+
+
+class FullTextField(models.TextField):
+    """
+    Столбец таблицы FTS5 с поиском field__match='запрос'.
+    """
+
+
+@FullTextField.register_lookup
+class Match(models.Lookup):
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', lhs_params + rhs_params
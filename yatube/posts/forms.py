@@ -3,8 +3,10 @@
 """
 
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
 
 from .models import Comment, Post
+from .uploads import downsample
 
 
 class PostForm(forms.ModelForm):
@@ -25,6 +27,28 @@ class PostForm(forms.ModelForm):
             'image': ('Изображение к данному посту'),
         }
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.upload_error = None
+        upload = self.files.get('image')
+        if getattr(upload, 'upload_error', None):
+            self.upload_error = upload.upload_error
+            self.files = self.files.copy()
+            del self.files['image']
+
+    def clean_image(self):
+        """
+        Выводит отказ обработчика загрузки и уменьшает
+        слишком большие изображения.
+        """
+        if self.upload_error:
+            raise forms.ValidationError(
+                self.upload_error, code='upload_limit')
+        image = self.cleaned_data['image']
+        if isinstance(image, UploadedFile):
+            return downsample(image)
+        return image
+
 
 class CommentForm(forms.ModelForm):
     """
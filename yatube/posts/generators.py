@@ -0,0 +1,120 @@
+"""
+Генерация строк для posts.seeding.
+
+Модуль не обращается к Django и базе, поэтому порции строк можно
+готовить в отдельных процессах. У каждой порции свой генератор
+случайных чисел из seed, вида строк и номера порции, так что
+данные не зависят от числа процессов.
+"""
+import random
+
+WORDS = (
+    'сегодня', 'вчера', 'утром', 'вечером', 'город', 'река', 'лес',
+    'дорога', 'книга', 'кошку', 'собака', 'друзья', 'работа', 'музыка',
+    'погода', 'солнце', 'дождь', 'снег', 'море', 'горы', 'поезд',
+    'фотография', 'прогулка', 'история', 'новости', 'проект', 'код',
+    'ошибка', 'решение', 'вопрос', 'ответ', 'идея', 'план', 'встреча',
+    'концерт', 'фильм', 'вкусный', 'новый', 'старый', 'красивый',
+    'долгий', 'короткий', 'интересный', 'смешной', 'грустный', 'тихий',
+    'видел', 'читал', 'писал', 'думал', 'гулял', 'слушал', 'смотрел',
+    'очень', 'снова', 'наконец', 'почти', 'совсем', 'всегда', 'никогда',
+)
+CHUNK_SIZE = 10000
+
+
+def chunks(kind, seed, start, count, **common):
+    """
+    Задания на порции по CHUNK_SIZE строк начиная с ключа start.
+    """
+    return [
+        dict(common, kind=kind, seed=seed, number=number,
+             start=first, count=min(CHUNK_SIZE, start + count - first))
+        for number, first in enumerate(
+            range(start, start + count, CHUNK_SIZE))
+    ]
+
+
+def chunk_random(task):
+    return random.Random(f'{task["seed"]}:{task["kind"]}:{task["number"]}')
+
+
+def skewed(rng, start, count, skew):
+    """
+    Ключ из [start, start + count) со степенным распределением:
+    чем ближе к началу диапазона, тем чаще он выбирается.
+    """
+    return start + int(count * rng.random() ** skew)
+
+
+def text(rng, low, high):
+    return ' '.join(rng.choices(WORDS, k=rng.randint(low, high)))
+
+
+def post_date(task, pk):
+    return task['first_date'] + task['step'] * (pk - task['posts'][0])
+
+
+def post_rows(task):
+    """
+    Посты: (pk, text, pub_date, author_id, group_id, image, variants).
+    Даты возрастают вместе с ключом.
+    """
+    rng = chunk_random(task)
+    users, groups = task['users'], task['groups']
+    rows = []
+    for pk in range(task['start'], task['start'] + task['count']):
+        author_id = skewed(rng, *users, 2)
+        group_id = None
+        if groups[1] and rng.random() < 0.7:
+            group_id = skewed(rng, *groups, 1.5)
+        image, variants = '', ''
+        if task['images'] and rng.random() < task['image_share']:
+            image, variants = rng.choice(task['images'])
+        rows.append((
+            pk, text(rng, 8, 60), post_date(task, pk), author_id, group_id,
+            image, variants,
+        ))
+    return rows
+
+
+def comment_rows(task):
+    """
+    Комментарии: (post_id, author_id, text, created). Новые
+    посты комментируют чаще старых.
+    """
+    rng = chunk_random(task)
+    posts_start, posts_count = task['posts']
+    last_post = posts_start + posts_count - 1
+    rows = []
+    for _ in range(task['count']):
+        post_id = last_post - int(posts_count * rng.random() ** 3)
+        created = post_date(task, post_id) + task['pause'] * rng.random()
+        rows.append((
+            post_id, skewed(rng, *task['users'], 1.5), text(rng, 2, 20),
+            created,
+        ))
+    return rows
+
+
+def follow_rows(task):
+    """
+    Подписки: (user_id, author_id). Число подписок пользователя
+    и популярность авторов распределены по Парето; популярность
+    не связана с числом постов автора.
+    """
+    rng = chunk_random(task)
+    popular = task['popular']
+    per_user = task['follows_per_user']
+    rows = []
+    for user_id in range(task['start'], task['start'] + task['count']):
+        wanted = int(rng.paretovariate(1.5) * per_user / 3)
+        wanted = min(wanted, per_user * 10, len(popular) - 1)
+        authors = set()
+        for _ in range(wanted * 2):
+            if len(authors) >= wanted:
+                break
+            author_id = popular[int(len(popular) * rng.random() ** 3)]
+            if author_id != user_id:
+                authors.add(author_id)
+        rows.extend((user_id, author_id) for author_id in sorted(authors))
+    return rows
@@ -0,0 +1,132 @@
+"""
+Адаптивные варианты изображений постов.
+
+После сохранения поста из исходного изображения в фоне готовятся
+кадры ширин POST_IMAGE_WIDTHS в форматах WebP и JPEG. Их описание
+сохраняется в Post.image_variants, и шаблоны выводят srcset вместо
+единственной миниатюры.
+"""
+import json
+import logging
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from .background import run_after_commit
+from .caching import bump_feed_version
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+# Порядок важен: браузер берёт первый поддерживаемый формат,
+# последний служит запасным для <img>.
+VARIANT_FORMATS = (
+    ('webp', 'WEBP', 'image/webp', {'method': 4}),
+    ('jpg', 'JPEG', 'image/jpeg', {'optimize': True, 'progressive': True}),
+)
+
+
+def variant_name(image_name, width, extension):
+    stem = os.path.splitext(os.path.basename(image_name))[0]
+    return f'posts/variants/{stem}-{width}.{extension}'
+
+
+def _encode(frame, image_format, options):
+    buffer = BytesIO()
+    frame.save(
+        buffer,
+        image_format,
+        quality=settings.POST_IMAGE_QUALITY,
+        **options,
+    )
+    return ContentFile(buffer.getvalue())
+
+
+def _widths(source_width):
+    """
+    Ширины вариантов без увеличения исходника: кадр шире
+    исходного изображения только добавил бы байтов.
+    """
+    widths = sorted(settings.POST_IMAGE_WIDTHS)
+    fitting = [width for width in widths if width <= source_width]
+    return fitting or widths[:1]
+
+
+def _render_variants(image_name, storage):
+    """
+    Кадры сохраняются под именами из имени исходника, которое
+    задаётся хешем содержимого, поэтому готовые кадры не пересоздаются.
+    """
+    with storage.open(image_name) as source:
+        image = Image.open(source)
+        image = ImageOps.exif_transpose(image).convert('RGB')
+    aspect_width, aspect_height = settings.POST_IMAGE_ASPECT
+    variants = []
+    for width in _widths(image.width):
+        height = round(width * aspect_height / aspect_width)
+        frame = None
+        for extension, image_format, mime, options in VARIANT_FORMATS:
+            name = variant_name(image_name, width, extension)
+            if not default_storage.exists(name):
+                if frame is None:
+                    frame = ImageOps.fit(
+                        image, (width, height), Image.LANCZOS)
+                name = default_storage.save(
+                    name, _encode(frame, image_format, options))
+            variants.append({
+                'name': name,
+                'width': width,
+                'height': height,
+                'type': mime,
+            })
+    return variants
+
+
+def _shared_variants(image_name):
+    """
+    Описание вариантов того же файла у другого поста.
+    """
+    described = Post.objects.filter(image=image_name).exclude(
+        image_variants='').values_list('image_variants', flat=True)
+    for data in described[:5]:
+        if json.loads(data).get('source') == image_name:
+            return data
+    return None
+
+
+def build_variants(post_id):
+    """
+    Готовит варианты изображения поста и записывает их описание.
+    Если изображение успели заменить, запись не изменяется.
+    """
+    post = Post.objects.filter(pk=post_id).only(
+        'image', 'image_variants').first()
+    if post is None or not post.image or post.image_sources:
+        return
+    image_name = post.image.name
+    data = _shared_variants(image_name)
+    if data is None:
+        try:
+            variants = _render_variants(image_name, post.image.storage)
+        except OSError:
+            logger.exception(
+                'Не удалось подготовить варианты %s', image_name)
+            return
+        data = json.dumps({'source': image_name, 'variants': variants})
+    updated = Post.objects.filter(pk=post_id, image=image_name).update(
+        image_variants=data, updated=timezone.now())
+    if updated:
+        bump_feed_version()
+
+
+def schedule(post):
+    """
+    Ставит подготовку вариантов изображения поста в очередь.
+    """
+    if post.image:
+        run_after_commit(build_variants, post.pk)
@@ -0,0 +1,109 @@
+"""
+Нагрузочные замеры страниц постов на данных разного объёма.
+"""
+import copy
+import json
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import (override_settings, setup_databases,
+                               setup_test_environment, teardown_databases,
+                               teardown_test_environment)
+
+from posts import benchmarks, seeding
+
+DEFAULT_BASELINE = os.path.join(settings.BASE_DIR, 'benchmarks.json')
+SQLITE_CACHE = 'core.cache_backends.SQLiteCache'
+
+
+def isolated_caches(directory):
+    """
+    Настройки кешей, в которых общий кеш лежит во временном каталоге:
+    замеры очищают кеш и не должны трогать рабочий.
+    """
+    caches = copy.deepcopy(settings.CACHES)
+    for config in caches.values():
+        if config['BACKEND'] == SQLITE_CACHE:
+            config['LOCATION'] = os.path.join(directory, 'cache.sqlite3')
+    return caches
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет временную базу данными заданных объёмов и замеряет '
+        'задержки и число SQL-запросов страниц постов. Сравнивает '
+        'результат с эталоном и завершается ошибкой при регрессии.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', type=int, nargs='+', default=[1000, 10000],
+            help='Числа постов, например 1000 100000 1000000.')
+        parser.add_argument(
+            '--requests', type=int, default=30,
+            help='Число замеряемых запросов каждого сценария.')
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='Начальное значение генератора данных.')
+        parser.add_argument(
+            '--baseline', default=DEFAULT_BASELINE,
+            help='Файл эталона в формате JSON.')
+        parser.add_argument(
+            '--write-baseline', action='store_true',
+            help='Записать результаты как новый эталон.')
+        parser.add_argument(
+            '--tolerance', type=float, default=benchmarks.LATENCY_TOLERANCE,
+            help='Допустимый рост p95 относительно эталона (доля).')
+
+    def measure_size(self, size, options):
+        """
+        Отдельная временная база на каждый объём данных.
+        """
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            seeding.seed(size, seed=options['seed'])
+            return benchmarks.run_scenarios(options['requests'])
+        finally:
+            teardown_databases(old_config, verbosity=0)
+
+    def report(self, size, results):
+        self.stdout.write(f'Постов: {size}')
+        self.stdout.write(
+            f'  {"сценарий":<16}{"p50":>9}{"p95":>9}{"p99":>9}'
+            f'{"запросов":>10}')
+        for name, result in results.items():
+            self.stdout.write(
+                f'  {name:<16}{result["p50"]:>9.2f}{result["p95"]:>9.2f}'
+                f'{result["p99"]:>9.2f}{result["queries"]:>10}')
+
+    def handle(self, *args, **options):
+        results = {}
+        setup_test_environment()
+        try:
+            with tempfile.TemporaryDirectory() as media_root, \
+                    override_settings(
+                        MEDIA_ROOT=media_root, BACKGROUND_WORKERS=0,
+                        CACHES=isolated_caches(media_root)):
+                for size in sorted(options['sizes']):
+                    results[str(size)] = self.measure_size(size, options)
+                    self.report(size, results[str(size)])
+        finally:
+            teardown_test_environment()
+        if options['write_baseline']:
+            with open(options['baseline'], 'w') as output:
+                json.dump(results, output, indent=2, sort_keys=True)
+            self.stdout.write(f'Эталон записан в {options["baseline"]}.')
+            return
+        if not os.path.exists(options['baseline']):
+            self.stdout.write('Эталона нет, сравнение пропущено.')
+            return
+        with open(options['baseline']) as source:
+            baseline = json.load(source)
+        regressions = benchmarks.compare(
+            results, baseline, options['tolerance'])
+        if regressions:
+            raise CommandError(
+                'Регрессии относительно эталона:\n' + '\n'.join(regressions))
+        self.stdout.write('Регрессий нет.')
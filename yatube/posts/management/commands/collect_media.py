@@ -0,0 +1,21 @@
+"""
+Удаление файлов изображений, на которые не ссылаются посты.
+"""
+from django.core.management.base import BaseCommand
+
+from posts.media import collect_orphans
+
+
+class Command(BaseCommand):
+    help = 'Удаляет изображения без ссылок вместе с миниатюрами.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace', type=int, default=3600,
+            help='Сколько секунд файл без ссылок хранится до удаления.')
+
+    def handle(self, *args, **options):
+        collected = collect_orphans(options['grace'])
+        for name in collected:
+            self.stdout.write(f'Удалён {name}')
+        self.stdout.write(f'Удалено файлов: {len(collected)}.')
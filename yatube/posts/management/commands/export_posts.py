@@ -0,0 +1,26 @@
+"""
+Выгрузка постов, комментариев, подписок и сообществ в NDJSON.
+"""
+from django.core.management.base import BaseCommand
+
+from posts.transfer import export, open_stream
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает сообщества, посты, комментарии и подписки построчно '
+        'в NDJSON; файл с расширением .gz сжимается.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'output', help='Путь к файлу или - для стандартного вывода.')
+        parser.add_argument(
+            '--chunk-size', type=int, default=2000,
+            help='Число строк, читаемых из базы за один запрос.')
+
+    def handle(self, *args, **options):
+        with open_stream(options['output'], 'w') as stream:
+            total = export(stream, options['chunk_size'])
+        if options['output'] != '-':
+            self.stdout.write(f'Выгружено записей: {total}.')
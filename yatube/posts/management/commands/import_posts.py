@@ -0,0 +1,64 @@
+"""
+Загрузка постов, комментариев, подписок и сообществ из NDJSON.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.transfer import (Checkpoint, TargetNotEmpty, load, open_stream,
+                            rebuild_derived)
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает выгрузку export_posts пачками. Прерванная загрузка '
+        'продолжается с последней сохранённой пачки; после загрузки '
+        'пересчитываются ленты, счётчики и поисковый индекс.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'input', help='Путь к файлу или - для стандартного ввода.')
+        parser.add_argument(
+            '--batch-size', type=int, default=2000,
+            help='Число записей в одной пачке bulk_create.')
+        parser.add_argument(
+            '--progress',
+            help='Файл прогресса; по умолчанию <input>.progress.')
+        parser.add_argument(
+            '--restart', action='store_true',
+            help='Начать загрузку заново, не глядя на файл прогресса.')
+        parser.add_argument(
+            '--merge', action='store_true',
+            help='Загружать в непустую базу; записи, чьи ключи заняты '
+                 'другими записями, пропускаются вместе с зависимыми.')
+
+    def handle(self, *args, **options):
+        path = options['progress']
+        if path is None and options['input'] != '-':
+            path = f'{options["input"]}.progress'
+        checkpoint = Checkpoint(path)
+        if options['restart']:
+            checkpoint.clear()
+        skipped = checkpoint.load()
+        if skipped:
+            self.stdout.write(f'Продолжение со строки {skipped + 1}.')
+        try:
+            with open_stream(options['input'], 'r') as stream:
+                counts = load(
+                    stream, checkpoint, options['batch_size'],
+                    log=self.stdout.write if options['verbosity'] > 1
+                    else None,
+                    merge=options['merge'])
+        except TargetNotEmpty as error:
+            raise CommandError(f'{error} Укажите --merge.')
+        self.stdout.write('Пересчёт лент, счётчиков и индекса.')
+        rebuild_derived(options['batch_size'])
+        checkpoint.clear()
+        loaded = ', '.join(
+            f'{kind}: {total}' for kind, total in counts.items())
+        self.stdout.write(f'Загружено записей: {loaded}.')
+        skipped = ', '.join(
+            f'{kind}: {len(pks)}'
+            for kind, pks in checkpoint.skipped.items() if pks)
+        if skipped:
+            self.stdout.write(
+                f'Пропущено записей, чьи ключи заняты в базе: {skipped}.')
@@ -0,0 +1,33 @@
+"""
+Пересчёт счётчиков авторов по таблицам постов и подписок.
+"""
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.models import AuthorStats
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики постов и подписок авторов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--author', help='Имя пользователя; по умолчанию все авторы.')
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Число авторов в одной пачке.')
+
+    def handle(self, *args, **options):
+        username = options['author']
+        if username:
+            try:
+                author = User.objects.get(username=username)
+            except User.DoesNotExist:
+                raise CommandError(f'Пользователь {username} не найден.')
+            AuthorStats.objects.rebuild(author.pk)
+            self.stdout.write(f'Счётчики {username} пересчитаны.')
+            return
+        fixed = AuthorStats.objects.rebuild_all(options['batch_size'])
+        self.stdout.write(f'Исправлено строк: {fixed}.')
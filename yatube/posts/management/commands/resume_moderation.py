@@ -0,0 +1,31 @@
+"""
+Продолжение заданий модерации, прерванных остановкой процесса.
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts.models import ModerationJob
+from posts.moderation import resumable_jobs, run_job
+
+
+class Command(BaseCommand):
+    help = (
+        'Выполняет ожидающие задания модерации и задания, брошенные '
+        'остановленным процессом. Пачки заданий можно повторять, '
+        'поэтому задание продолжается с уже обработанного места.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--stale-after', type=int,
+            default=settings.MODERATION_STALE_SECONDS,
+            help='Секунд без прогресса, после которых выполняющееся '
+                 'задание считается брошенным.')
+
+    def handle(self, *args, **options):
+        job_ids = resumable_jobs(options['stale_after'])
+        for job_id in job_ids:
+            run_job(job_id)
+            job = ModerationJob.objects.get(pk=job_id)
+            self.stdout.write(f'{job}: {job.get_status_display()}.')
+        self.stdout.write(f'Продолжено заданий: {len(job_ids)}.')
@@ -0,0 +1,73 @@
+"""
+Заполнение базы данными реалистичного объёма.
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import seeding
+
+
+class Command(BaseCommand):
+    help = (
+        'Добавляет в базу пользователей, сообщества, посты, комментарии '
+        'и подписки пачками через bulk_create, вместе с лентами, '
+        'счётчиками и поисковым индексом. Объёмы по умолчанию '
+        'соразмерны числу постов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--posts', type=int, default=100000, help='Число постов.')
+        parser.add_argument('--users', type=int, help='Число пользователей.')
+        parser.add_argument('--groups', type=int, help='Число сообществ.')
+        parser.add_argument(
+            '--comments', type=int, help='Число комментариев.')
+        parser.add_argument(
+            '--follows-per-user', type=int,
+            help='Среднее число подписок пользователя.')
+        parser.add_argument(
+            '--image-share', type=float,
+            help='Доля постов с изображением.')
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='Начальное значение генератора: те же данные при повторе.')
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help='Строк в одном INSERT.')
+        parser.add_argument(
+            '--transaction-rows', type=int, default=100000,
+            help='Строк в одной транзакции.')
+        parser.add_argument(
+            '--processes', type=int, default=1,
+            help='Число процессов, готовящих строки.')
+
+    def handle(self, *args, **options):
+        if options['posts'] < 0 or options['processes'] < 1:
+            raise CommandError('Объёмы и число процессов должны быть > 0.')
+        volumes = {
+            name: options[name]
+            for name in ('users', 'groups', 'comments', 'follows_per_user',
+                         'image_share')
+            if options[name] is not None
+        }
+        started = time.monotonic()
+
+        def log(message):
+            elapsed = time.monotonic() - started
+            self.stdout.write(f'[{elapsed:7.1f} с] {message}')
+
+        counts = seeding.seed(
+            options['posts'],
+            seed=options['seed'],
+            batch_size=options['batch_size'],
+            transaction_rows=options['transaction_rows'],
+            processes=options['processes'],
+            log=log,
+            **volumes,
+        )
+        elapsed = time.monotonic() - started
+        total = sum(counts.values())
+        self.stdout.write(self.style.SUCCESS(
+            f'Записано строк: {total} за {elapsed:.0f} с '
+            f'({total / max(elapsed, 0.001):.0f} строк/с).'))
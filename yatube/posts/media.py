@@ -0,0 +1,64 @@
+"""
+Сборка файлов изображений, на которые не ссылается ни один пост.
+
+Файл без ссылок удаляется вместе с миниатюрами sorl-thumbnail
+и адаптивными вариантами не раньше, чем через grace секунд после
+последнего изменения счётчика: за это время повторная загрузка
+того же содержимого успевает снова сослаться на файл. Запись
+о файле удаляется при нулевом счётчике в той же транзакции, что
+и сам файл, поэтому одновременный acquire файл не теряет.
+"""
+import datetime
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+from sorl.thumbnail import default
+from sorl.thumbnail.images import ImageFile
+
+from . import images
+from .models import MediaBlob, Post
+
+
+def _delete_variants(name):
+    """
+    Удаляет адаптивные варианты по их известным именам, не перебирая
+    каталог вариантов.
+    """
+    for width in settings.POST_IMAGE_WIDTHS:
+        for extension, *_ in images.VARIANT_FORMATS:
+            default_storage.delete(
+                images.variant_name(name, width, extension))
+
+
+def delete_blob(name):
+    """
+    Удаляет файл изображения и всё, что из него получено.
+    """
+    storage = Post._meta.get_field('image').storage
+    default.kvstore.delete_thumbnails(ImageFile(name, storage=storage))
+    _delete_variants(name)
+    storage.delete(name)
+
+
+def collect_orphans(grace=3600):
+    """
+    Удаляет файлы без ссылок и возвращает их имена. Счётчик
+    перепроверяется по постам, чтобы не удалить используемый файл.
+    """
+    deadline = timezone.now() - datetime.timedelta(seconds=grace)
+    orphans = MediaBlob.objects.filter(refs=0, updated__lt=deadline)
+    collected = []
+    for name in orphans.values_list('name', flat=True).iterator():
+        with transaction.atomic():
+            refs = Post.objects.filter(image=name).count()
+            if refs:
+                MediaBlob.objects.filter(name=name).update(refs=refs)
+                continue
+            deleted, _ = MediaBlob.objects.filter(
+                name=name, refs=0).delete()
+            if deleted:
+                delete_blob(name)
+                collected.append(name)
+    return collected
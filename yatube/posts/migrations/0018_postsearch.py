@@ -0,0 +1,50 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:09
+
+from django.db import migrations, models
+import django.db.models.deletion
+import posts.fields
+from posts.stemmer import stems
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    Post = apps.get_model('posts', 'Post')
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "CREATE VIRTUAL TABLE posts_postsearch USING fts5("
+            "body, tokenize='unicode61')"
+        )
+        posts = Post.objects.values_list('pk', 'text').iterator()
+        cursor.executemany(
+            'INSERT INTO posts_postsearch (rowid, body) VALUES (%s, %s)',
+            ((pk, ' '.join(stems(text))) for pk, text in posts),
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE posts_postsearch')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0017_mediablob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostSearch',
+            fields=[
+                ('post', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_entry', serialize=False, to='posts.Post')),
+                ('body', posts.fields.FullTextField()),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'posts_postsearch',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -1,8 +1,17 @@
 """
 Модели сообществ, постов, комментариев, подписок.
 """
+import json
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils.functional import cached_property
+
+from .fields import FullTextField
+from .storage import ContentAddressedStorage
 
 User = get_user_model()
 
@@ -19,6 +28,31 @@ class Group(models.Model):
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+    """
+    Выборки постов для страниц.
+    """
+
+    def for_feed(self):
+        """
+        Посты для ленты: автор и сообщество подгружаются тем же
+        запросом, из таблиц берутся только поля, нужные шаблонам.
+        """
+        return self.select_related('author', 'group').only(
+            'id',
+            'text',
+            'pub_date',
+            'image',
+            'image_variants',
+            'updated',
+            'author__username',
+            'author__first_name',
+            'author__last_name',
+            'group__slug',
+            'group__title',
+        )
+
+
 class Post(models.Model):
     """
     Создание модели постов.
@@ -40,15 +74,86 @@ class Post(models.Model):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
+        storage=ContentAddressedStorage(),
         blank=True
     )
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+    image_variants = models.TextField(blank=True, default='', editable=False)
+    updated = models.DateTimeField(auto_now=True)
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ('-pub_date', )
+        indexes = [
+            models.Index(
+                fields=['pub_date', 'id'], name='post_pub_date_idx'),
+            models.Index(
+                fields=['author', 'pub_date', 'id'],
+                name='post_author_pub_date_idx'),
+            models.Index(
+                fields=['group', 'pub_date', 'id'],
+                name='post_group_pub_date_idx'),
+        ]
 
     def __str__(self):
         return self.text[:15]
 
+    @cached_property
+    def image_sources(self):
+        """
+        Источники для <picture> по форматам: srcset, запасной src
+        и размеры. Пусто, пока варианты текущего изображения
+        не готовы.
+        """
+        if not self.image or not self.image_variants:
+            return []
+        data = json.loads(self.image_variants)
+        if data.get('source') != self.image.name:
+            return []
+        grouped = {}
+        for variant in data['variants']:
+            grouped.setdefault(variant['type'], []).append(variant)
+        return [
+            self._image_source(mime, variants)
+            for mime, variants in grouped.items()
+        ]
+
+    def _image_source(self, mime, variants):
+        url = self.image.storage.url
+        aspect_width = settings.POST_IMAGE_ASPECT[0]
+        fallback = [v for v in variants if v['width'] <= aspect_width]
+        fallback = (fallback or variants)[-1]
+        return {
+            'type': mime,
+            'srcset': ', '.join(
+                f"{url(v['name'])} {v['width']}w" for v in variants),
+            'src': url(fallback['name']),
+            'width': fallback['width'],
+            'height': fallback['height'],
+        }
+
+
+class PostSearch(models.Model):
+    """
+    Строка полнотекстового индекса постов: основы слов текста.
+    Таблица FTS5 создаётся миграцией, rowid совпадает с id поста,
+    rank — оценка bm25 при поиске (меньше — лучше).
+    """
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.DO_NOTHING,
+        primary_key=True,
+        db_column='rowid',
+        related_name='search_entry',
+    )
+    body = FullTextField()
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = 'posts_postsearch'
+
 
 class Comment(models.Model):
     """
@@ -67,6 +172,13 @@ class Comment(models.Model):
     text = models.TextField()
     created = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['post', 'created', 'id'],
+                name='comment_post_created_idx'),
+        ]
+
 
 class Follow(models.Model):
     """
@@ -88,3 +200,242 @@ class Follow(models.Model):
             models.UniqueConstraint(
                 fields=['user', 'author'], name='unique_follow')
         ]
+        indexes = [
+            models.Index(
+                fields=['author', 'user'], name='follow_author_user_idx'),
+        ]
+
+
+class FeedEntry(models.Model):
+    """
+    Создание модели материализованной ленты подписок:
+    запись о посте автора в ленте каждого его подписчика.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed_entries'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='feed_entries'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'], name='unique_feed_entry')
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', 'pub_date', 'post'],
+                name='feed_user_pub_date_idx'),
+            models.Index(
+                fields=['user', 'author'], name='feed_user_author_idx'),
+        ]
+
+
+def _count(model, field):
+    """
+    Число строк model, ссылающихся на внешнюю строку через field.
+    """
+    rows = model.objects.filter(**{field: OuterRef('pk')}).order_by()
+    total = rows.values(field).annotate(total=Count('pk')).values('total')
+    return Coalesce(Subquery(total), 0)
+
+
+class AuthorStatsManager(models.Manager):
+    """
+    Обновление и пересчёт счётчиков авторов.
+    """
+
+    def change(self, author_id, **deltas):
+        """
+        Изменяет счётчики автора на заданные величины. Строки, которой
+        ещё нет, изменение не касается: её посчитает for_author.
+        """
+        rows = self.filter(author_id=author_id)
+        for field, delta in deltas.items():
+            if delta < 0:
+                rows = rows.filter(**{f'{field}__gte': -delta})
+        rows.update(**{
+            field: F(field) + delta for field, delta in deltas.items()
+        })
+
+    def rebuild(self, author_id):
+        """
+        Пересчитывает счётчики автора по таблицам постов и подписок.
+        """
+        stats, _ = self.update_or_create(
+            author_id=author_id,
+            defaults={
+                'posts_count': Post.objects.filter(
+                    author_id=author_id).count(),
+                'followers_count': Follow.objects.filter(
+                    author_id=author_id).count(),
+                'following_count': Follow.objects.filter(
+                    user_id=author_id).count(),
+            },
+        )
+        return stats
+
+    def rebuild_all(self, batch_size=1000):
+        """
+        Сверяет счётчики всех авторов с таблицами и исправляет
+        расхождения пачками. Возвращает число исправленных строк.
+        """
+        users = User.objects.order_by('pk').annotate(
+            posts_total=_count(Post, 'author'),
+            followers_total=_count(Follow, 'author'),
+            following_total=_count(Follow, 'user'),
+        ).values_list(
+            'pk', 'posts_total', 'followers_total', 'following_total')
+        fixed = 0
+        last_pk = 0
+        while True:
+            rows = list(users.filter(pk__gt=last_pk)[:batch_size])
+            if not rows:
+                return fixed
+            last_pk = rows[-1][0]
+            fixed += self._sync_rows(rows)
+
+    def _sync_rows(self, rows):
+        existing = self.in_bulk([row[0] for row in rows])
+        fields = ('posts_count', 'followers_count', 'following_count')
+        created, changed = [], []
+        for author_id, *counts in rows:
+            stats = existing.get(author_id)
+            if stats is None:
+                created.append(self.model(author_id=author_id, **dict(
+                    zip(fields, counts))))
+            elif [getattr(stats, field) for field in fields] != counts:
+                for field, value in zip(fields, counts):
+                    setattr(stats, field, value)
+                changed.append(stats)
+        with transaction.atomic():
+            self.bulk_create(created, ignore_conflicts=True)
+            self.bulk_update(changed, fields)
+        return len(created) + len(changed)
+
+    def for_author(self, author):
+        """
+        Счётчики автора без агрегирующих запросов, если строка есть.
+        """
+        try:
+            return self.get(author=author)
+        except self.model.DoesNotExist:
+            return self.rebuild(author.pk)
+
+
+class AuthorStats(models.Model):
+    """
+    Создание модели счётчиков автора: постов, подписчиков и подписок.
+    """
+    author = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats'
+    )
+    posts_count = models.PositiveIntegerField(default=0)
+    followers_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
+
+    objects = AuthorStatsManager()
+
+
+class MediaBlobManager(models.Manager):
+    """
+    Учёт ссылок постов на файлы изображений.
+    """
+
+    def acquire(self, name):
+        """
+        Увеличивает число ссылок на файл, заводя запись при первой.
+        """
+        if not name:
+            return
+        updated = self.filter(name=name).update(refs=F('refs') + 1)
+        if not updated:
+            _, created = self.get_or_create(name=name, defaults={'refs': 1})
+            if not created:
+                self.filter(name=name).update(refs=F('refs') + 1)
+
+    def release(self, name):
+        """
+        Уменьшает число ссылок на файл; файл без ссылок удалит
+        команда collect_media.
+        """
+        if name:
+            self.filter(name=name, refs__gt=0).update(refs=F('refs') - 1)
+
+
+class MediaBlob(models.Model):
+    """
+    Создание модели файла изображения с числом ссылающихся постов.
+    """
+    name = models.CharField(max_length=100, primary_key=True)
+    refs = models.PositiveIntegerField(default=0)
+    updated = models.DateTimeField(auto_now=True, db_index=True)
+
+    objects = MediaBlobManager()
+
+
+class ModerationJob(models.Model):
+    """
+    Создание модели фонового задания модерации с ходом выполнения.
+    """
+    DELETE_POSTS = 'delete_posts'
+    DELETE_COMMENTS = 'delete_comments'
+    REASSIGN_GROUP = 'reassign_group'
+    PURGE_USERS = 'purge_users'
+    KINDS = (
+        (DELETE_POSTS, 'Удаление постов авторов'),
+        (DELETE_COMMENTS, 'Удаление комментариев авторов'),
+        (REASSIGN_GROUP, 'Перенос постов в сообщество'),
+        (PURGE_USERS, 'Очистка материалов пользователей'),
+    )
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (PENDING, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнено'),
+        (FAILED, 'Ошибка'),
+    )
+    kind = models.CharField('Задание', max_length=32, choices=KINDS)
+    params = models.TextField('Параметры', default='{}')
+    status = models.CharField(
+        'Состояние', max_length=16, choices=STATUSES, default=PENDING)
+    total = models.PositiveIntegerField('Всего', default=0)
+    processed = models.PositiveIntegerField('Обработано', default=0)
+    error = models.TextField('Ошибка', blank=True)
+    created_by = models.ForeignKey(
+        User,
+        null=True,
+        on_delete=models.SET_NULL,
+        related_name='moderation_jobs'
+    )
+    created = models.DateTimeField('Создано', auto_now_add=True)
+    updated = models.DateTimeField('Обновлено', auto_now=True)
+
+    class Meta:
+        ordering = ('-created',)
+
+    def __str__(self):
+        return f'{self.get_kind_display()} #{self.pk}'
+
+    @property
+    def progress(self):
+        if not self.total:
+            return 100 if self.status == self.DONE else 0
+        return min(100, self.processed * 100 // self.total)
@@ -0,0 +1,145 @@
+"""
+Фоновые задания модерации: массовое удаление постов и комментариев,
+перенос постов в сообщество, очистка материалов пользователей.
+
+Задание выполняется в отдельном фоновом пуле пачками по
+MODERATION_BATCH_SIZE записей, каждая пачка фиксируется отдельной
+транзакцией, поэтому запрос администратора завершается сразу, а база
+не держит долгую блокировку записи. Ход выполнения сохраняется
+в ModerationJob. Пачки можно повторять, поэтому задание, прерванное
+остановкой процесса, продолжается командой resume_moderation.
+"""
+import datetime
+import json
+import logging
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .background import MODERATION_POOL, run_after_commit
+from .caching import bump_feed_version
+from .models import Comment, Follow, ModerationJob, Post
+
+User = get_user_model()
+logger = logging.getLogger(__name__)
+
+
+def _delete_batches(queryset):
+    """
+    Удаляет выборку пачками; каждая пачка — своя транзакция.
+    """
+    batch = queryset.order_by('pk').values_list('pk', flat=True)
+    while True:
+        with transaction.atomic():
+            pks = list(batch[:settings.MODERATION_BATCH_SIZE])
+            if not pks:
+                return
+            queryset.model.objects.filter(pk__in=pks).delete()
+        yield len(pks)
+
+
+def _update_batches(queryset, **values):
+    pks = list(queryset.order_by('pk').values_list('pk', flat=True))
+    size = settings.MODERATION_BATCH_SIZE
+    for start in range(0, len(pks), size):
+        chunk = pks[start:start + size]
+        with transaction.atomic():
+            queryset.model.objects.filter(pk__in=chunk).update(**values)
+        yield len(chunk)
+
+
+def _user_content(user_ids):
+    return (
+        Comment.objects.filter(author_id__in=user_ids),
+        Post.objects.filter(author_id__in=user_ids),
+        Follow.objects.filter(
+            Q(user_id__in=user_ids) | Q(author_id__in=user_ids)),
+    )
+
+
+def _targets(kind, params):
+    """
+    Выборки, которые обрабатывает задание.
+    """
+    if kind == ModerationJob.DELETE_POSTS:
+        return (Post.objects.filter(author_id__in=params['author_ids']),)
+    if kind == ModerationJob.DELETE_COMMENTS:
+        return (Comment.objects.filter(author_id__in=params['author_ids']),)
+    if kind == ModerationJob.REASSIGN_GROUP:
+        return (Post.objects.filter(pk__in=params['post_ids']),)
+    return _user_content(params['user_ids'])
+
+
+def _steps(kind, params):
+    targets = _targets(kind, params)
+    if kind == ModerationJob.REASSIGN_GROUP:
+        yield from _update_batches(
+            targets[0], group_id=params['group_id'], updated=timezone.now())
+        return
+    for queryset in targets:
+        yield from _delete_batches(queryset)
+    if kind == ModerationJob.PURGE_USERS:
+        User.objects.filter(pk__in=params['user_ids']).update(
+            is_active=False)
+
+
+def start_job(kind, created_by, **params):
+    """
+    Создаёт задание и ставит его в фоновый пул после фиксации
+    текущей транзакции.
+    """
+    total = sum(queryset.count() for queryset in _targets(kind, params))
+    job = ModerationJob.objects.create(
+        kind=kind,
+        params=json.dumps(params),
+        total=total,
+        created_by=created_by,
+    )
+    run_after_commit(run_job, job.pk, pool=MODERATION_POOL)
+    return job
+
+
+def run_job(job_id):
+    """
+    Выполняет задание, отмечая число обработанных записей
+    после каждой пачки.
+    """
+    jobs = ModerationJob.objects.filter(pk=job_id)
+    if not jobs.filter(status=ModerationJob.PENDING).update(
+            status=ModerationJob.RUNNING, updated=timezone.now()):
+        return
+    job = jobs.get()
+    try:
+        for count in _steps(job.kind, json.loads(job.params)):
+            jobs.update(
+                processed=F('processed') + count, updated=timezone.now())
+            time.sleep(settings.MODERATION_BATCH_PAUSE)
+    except Exception as error:
+        logger.exception('Задание модерации %s не выполнено', job_id)
+        jobs.update(status=ModerationJob.FAILED, error=str(error))
+        return
+    finally:
+        bump_feed_version()
+    jobs.update(status=ModerationJob.DONE)
+
+
+def resumable_jobs(stale_after=None):
+    """
+    Ключи заданий, которые надо продолжить: ожидающих запуска и
+    брошенных остановленным процессом — выполняющихся, но не
+    отмечавших прогресс stale_after секунд. Брошенные задания
+    возвращаются в очередь.
+    """
+    if stale_after is None:
+        stale_after = settings.MODERATION_STALE_SECONDS
+    deadline = timezone.now() - datetime.timedelta(seconds=stale_after)
+    ModerationJob.objects.filter(
+        status=ModerationJob.RUNNING, updated__lt=deadline,
+    ).update(status=ModerationJob.PENDING, updated=timezone.now())
+    return list(ModerationJob.objects.filter(
+        status=ModerationJob.PENDING).order_by('created', 'pk').values_list(
+        'pk', flat=True))
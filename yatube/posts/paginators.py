@@ -0,0 +1,284 @@
+"""
+Постраничный вывод записей по ключу сортировки (keyset/cursor).
+"""
+import base64
+import binascii
+import datetime
+import heapq
+import json
+import math
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.paginator import Page, Paginator
+from django.db.models import Max, Q
+from django.utils.functional import cached_property
+
+FEED_ORDERING = ('-pub_date', '-pk')
+COMMENT_ORDERING = ('created', 'pk')
+# Наибольшее смещение, которое SQLite принимает в OFFSET.
+MAX_OFFSET = 2 ** 63 - 1
+
+
+class CursorEncoder(json.JSONEncoder):
+    """
+    Сериализует даты без потери микросекунд, в отличие
+    от DjangoJSONEncoder, иначе курсор пропускал бы записи.
+    """
+
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+class InvalidCursor(Exception):
+    """
+    Курсор повреждён или не относится к данной выборке.
+    """
+
+
+class CursorPaginator(Paginator):
+    """
+    Пагинатор, выбирающий страницу условием по ключу сортировки
+    вместо LIMIT/OFFSET и не выполняющий COUNT(*) по всей таблице.
+
+    Страница задаётся непрозрачным курсором after (следующая страница)
+    или before (предыдущая). Для старых ссылок вида ?page=N сохранён
+    режим совместимости со смещением: номер после последней
+    страницы, как и у Paginator.get_page, даёт последнюю страницу.
+    """
+
+    def __init__(self, object_list, per_page, ordering=FEED_ORDERING,
+                 after=None, before=None, number=None):
+        super().__init__(object_list, per_page)
+        self.ordering = tuple(ordering)
+        self.after = after
+        self.before = before
+        self.number = number
+        self.next_cursor = None
+        self.previous_cursor = None
+        self._has_next = False
+        self._page = None
+
+    def _check_object_list_is_ordered(self):
+        """
+        Порядок задаёт сам пагинатор через ordering, поэтому
+        неупорядоченная выборка не повод для предупреждения.
+        """
+
+    @property
+    def count(self):
+        """
+        Число записей, известных пагинатору, без запроса COUNT(*).
+        """
+        page = self.get_page()
+        offset = (page.number - 1) * self.per_page
+        return offset + len(page.object_list) + int(self._has_next)
+
+    @property
+    def num_pages(self):
+        page = self.get_page()
+        return page.number + int(self._has_next)
+
+    def validate_number(self, number):
+        return number
+
+    def encode_cursor(self, obj):
+        values = list(self._key(obj))
+        raw = json.dumps(values, cls=CursorEncoder).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        padding = '=' * (-len(cursor) % 4)
+        try:
+            raw = base64.urlsafe_b64decode(cursor + padding)
+            values = json.loads(raw.decode())
+        except (binascii.Error, ValueError):
+            raise InvalidCursor(cursor)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise InvalidCursor(cursor)
+        try:
+            return [
+                self._get_field(name.lstrip('-')).to_python(value)
+                for name, value in zip(self.ordering, values)
+            ]
+        except ValidationError:
+            raise InvalidCursor(cursor)
+
+    def _sources(self):
+        """
+        Выборки, из которых собирается лента: одна или несколько
+        с одинаковым ключом сортировки, сливаемых по этому ключу.
+        """
+        if isinstance(self.object_list, (list, tuple)):
+            return self.object_list
+        return [self.object_list]
+
+    def _get_field(self, name):
+        query = self._sources()[0].query
+        if name in query.annotations:
+            return query.annotations[name].output_field
+        opts = query.model._meta
+        if name == 'pk':
+            return opts.pk
+        return opts.get_field(name)
+
+    def _key(self, obj):
+        return tuple(getattr(obj, name.lstrip('-')) for name in self.ordering)
+
+    def _keyset_filter(self, values, reverse=False):
+        """
+        Условие «строго после ключа» для составной сортировки:
+        (a > x) OR (a = x AND b > y) OR ...
+
+        Дополнительная граница a >= x позволяет базе выполнить
+        поиск по диапазону индекса, а не перебор с начала.
+        """
+        condition = Q()
+        bound = Q()
+        equal = {}
+        for name, value in zip(self.ordering, values):
+            field = name.lstrip('-')
+            descending = name.startswith('-') != reverse
+            lookup = 'lt' if descending else 'gt'
+            if not equal:
+                bound = Q(**{f'{field}__{lookup}e': value})
+            condition |= Q(**equal, **{f'{field}__{lookup}': value})
+            equal[field] = value
+        return bound & condition
+
+    def _reversed_ordering(self):
+        return tuple(
+            name[1:] if name.startswith('-') else f'-{name}'
+            for name in self.ordering
+        )
+
+    def _merge(self, querysets, ordering, limit):
+        """
+        Слияние уже отсортированных выборок по ключу без дублей.
+        """
+        descending = ordering[0].startswith('-')
+        merged = heapq.merge(*querysets, key=self._key, reverse=descending)
+        objects = []
+        seen = set()
+        for obj in merged:
+            if obj.pk not in seen:
+                seen.add(obj.pk)
+                objects.append(obj)
+            if len(objects) == limit:
+                break
+        return objects
+
+    def _position(self):
+        """
+        Разбирает параметры страницы: условие по курсору, порядок
+        выборки, номер страницы и признак движения назад.
+        """
+        try:
+            if self.before:
+                values = self.decode_cursor(self.before)
+                condition = self._keyset_filter(values, reverse=True)
+                return condition, self._reversed_ordering(), 1, True
+            if self.after:
+                values = self.decode_cursor(self.after)
+                return self._keyset_filter(values), self.ordering, 2, False
+            if self.number:
+                number = min(
+                    max(int(self.number), 1), MAX_OFFSET // self.per_page)
+                return None, self.ordering, number, False
+        except (InvalidCursor, ValueError):
+            pass
+        return None, self.ordering, 1, False
+
+    def _slice(self, querysets, ordering, offset):
+        limit = self.per_page + 1
+        if len(querysets) == 1:
+            return list(querysets[0][offset:offset + limit])
+        return self._merge(
+            [queryset[:offset + limit] for queryset in querysets],
+            ordering,
+            offset + limit,
+        )[offset:]
+
+    def _last_number(self):
+        """
+        Номер последней страницы; COUNT(*) выполняется только
+        для номера страницы за концом выборки.
+        """
+        total = sum(queryset.count() for queryset in self._sources())
+        return max(math.ceil(total / self.per_page), 1)
+
+    def _fetch(self):
+        condition, ordering, number, backwards = self._position()
+        offset = 0 if condition is not None else (number - 1) * self.per_page
+        querysets = []
+        for queryset in self._sources():
+            if condition is not None:
+                queryset = queryset.filter(condition)
+            querysets.append(queryset.order_by(*ordering))
+        objects = self._slice(querysets, ordering, offset)
+        if not objects and offset:
+            number = self._last_number()
+            offset = (number - 1) * self.per_page
+            objects = self._slice(querysets, ordering, offset)
+        has_extra = len(objects) > self.per_page
+        objects = objects[:self.per_page]
+        if backwards:
+            objects.reverse()
+            return objects, 1 + int(has_extra), has_extra, True
+        return objects, number, number > 1, has_extra
+
+    def get_page(self, number=None):
+        """
+        Возвращает страницу, выбранную курсором; аргумент number
+        оставлен для совместимости с Paginator.get_page.
+        """
+        if self._page is None:
+            objects, number, has_previous, has_next = self._fetch()
+            self._has_next = has_next
+            if objects and has_next:
+                self.next_cursor = self.encode_cursor(objects[-1])
+            if objects and has_previous:
+                self.previous_cursor = self.encode_cursor(objects[0])
+            self._page = Page(objects, number, self)
+        return self._page
+
+    page = get_page
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Пагинатор для списков админки. Число записей в таблице без
+    фильтров оценивается по наибольшему первичному ключу, который
+    SQLite находит без обхода таблицы; в отфильтрованной выборке
+    записи считаются не дальше ADMIN_EXACT_COUNT_LIMIT + 1, так что
+    широкий фильтр или поиск не обходит всю таблицу.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if queryset.query.where:
+            limit = settings.ADMIN_EXACT_COUNT_LIMIT
+            return queryset[:limit + 1].count()
+        estimate = queryset.aggregate(estimate=Max('pk'))['estimate'] or 0
+        if estimate > settings.ADMIN_EXACT_COUNT_LIMIT:
+            return estimate
+        return queryset.count()
+
+
+def paginate(request, object_list, ordering=FEED_ORDERING, per_page=None):
+    """
+    Возвращает страницу выборки по параметрам запроса
+    ?after=, ?before= или устаревшему ?page=.
+    """
+    paginator = CursorPaginator(
+        object_list,
+        per_page or settings.PAGE,
+        ordering=ordering,
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+        number=request.GET.get('page'),
+    )
+    return paginator.get_page()
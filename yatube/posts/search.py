@@ -0,0 +1,74 @@
+"""
+Полнотекстовый поиск постов по индексу SQLite FTS5.
+
+В индекс пишутся основы слов текста поста (русский стеммер Snowball),
+запрос приводится к основам так же, поэтому «кошки» находят «кошку».
+Результаты упорядочены по bm25 и листаются CursorPaginator.
+"""
+from django.db import connection
+from django.db.models import F
+
+from .models import Post, PostSearch
+from .stemmer import stems
+
+SEARCH_ORDERING = ('search_rank', '-pk')
+TABLE = PostSearch._meta.db_table
+INSERT_SQL = f'INSERT INTO {TABLE} (rowid, body) VALUES (%s, %s)'
+DELETE_SQL = f'DELETE FROM {TABLE} WHERE rowid = %s'
+
+
+def match_expression(query):
+    """
+    Запрос FTS5 из основ слов: все слова обязательны, спецсимволы
+    синтаксиса FTS5 до индекса не доходят.
+    """
+    terms = dict.fromkeys(term for term in stems(query) if term)
+    return ' '.join(f'"{term}"' for term in terms)
+
+
+def index_post(post):
+    """
+    Добавляет пост в индекс или обновляет его строку.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(DELETE_SQL, [post.pk])
+        cursor.execute(INSERT_SQL, [post.pk, ' '.join(stems(post.text))])
+
+
+def unindex_post(post_id):
+    with connection.cursor() as cursor:
+        cursor.execute(DELETE_SQL, [post_id])
+
+
+def rebuild_index(batch_size=1000):
+    """
+    Заново строит индекс по всем постам. Возвращает число постов.
+    """
+    total = 0
+    last_pk = 0
+    posts = Post.objects.order_by('pk').values_list('pk', 'text')
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE}')
+        while True:
+            rows = list(posts.filter(pk__gt=last_pk)[:batch_size])
+            if not rows:
+                return total
+            cursor.executemany(INSERT_SQL, [
+                (pk, ' '.join(stems(text))) for pk, text in rows
+            ])
+            last_pk = rows[-1][0]
+            total += len(rows)
+
+
+def search_posts(query, queryset=None):
+    """
+    Посты, содержащие все слова запроса, с оценкой search_rank.
+    """
+    if queryset is None:
+        queryset = Post.objects.all()
+    expression = match_expression(query)
+    if not expression:
+        queryset = queryset.none()
+    else:
+        queryset = queryset.filter(search_entry__body__match=expression)
+    return queryset.annotate(search_rank=F('search_entry__rank'))
@@ -0,0 +1,435 @@
+"""
+Быстрое заполнение базы данными реалистичного объёма.
+
+Строки пишутся через bulk_create пачками с заранее выбранными
+первичными ключами, без сохранения каждой модели. Поэтому сигналы
+не срабатывают, и всё, что они поддерживают, заполняется здесь же:
+счётчики комментариев и авторов, ленты подписок, полнотекстовый
+индекс и ссылки на файлы изображений. В конце меняется версия
+ленты, чтобы кеш страниц и ETag не отдавали прежнее содержимое;
+подписки и комментарии касаются только новых пользователей
+и постов, так что их версии менять не нужно.
+
+Распределения близки к живому сайту: немногие авторы пишут
+большую часть постов, на немногих авторов подписана большая часть
+пользователей (степенной закон), комментарии скапливаются
+у новых постов. Строки готовят функции posts.generators, при
+processes > 1 — в нескольких процессах; при одном и том же seed
+данные одинаковы при любом числе процессов.
+"""
+import datetime
+import json
+import multiprocessing
+import random
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from io import BytesIO
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from django.db.models import F, Max
+from django.utils import timezone
+from PIL import Image, ImageDraw
+
+from . import generators, images, search
+from .caching import bump_feed_version
+from .models import (AuthorStats, Comment, FeedEntry, Follow, Group,
+                     MediaBlob, Post)
+from .stemmer import stem
+
+User = get_user_model()
+
+STEMS = {word: stem(word) for word in generators.WORDS}
+SEED_PASSWORD = 'yatube-seed'
+IMAGE_POOL = 8
+POST_PERIOD = datetime.timedelta(days=365)
+COMMENT_DELAY = datetime.timedelta(hours=6)
+
+
+def scale(posts):
+    """
+    Объёмы остальных таблиц для заданного числа постов:
+    на миллион постов — сто тысяч пользователей.
+    """
+    return {
+        'users': max(20, posts // 10),
+        'groups': max(5, posts // 2000),
+        'posts': posts,
+        'comments': posts // 2,
+        'follows_per_user': 20,
+        'image_share': 0.1,
+    }
+
+
+def _batches(rows, size):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _next_id(model):
+    return (model.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+
+
+@contextmanager
+def tuned_load():
+    """
+    Настройки SQLite на время загрузки: без fsync на каждой
+    фиксации и с большим кешем страниц. При сбое загрузку
+    проще повторить, чем сохранить. После загрузки
+    восстанавливаются значения из SQLITE_PRAGMAS. Внутри открытой
+    транзакции SQLite не меняет synchronous, и настройки остаются.
+    """
+    if connection.vendor != 'sqlite' or connection.in_atomic_block:
+        yield
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA synchronous = OFF')
+        cursor.execute('PRAGMA cache_size = -262144')
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            for name in ('synchronous', 'cache_size'):
+                value = settings.SQLITE_PRAGMAS.get(name)
+                if value is not None:
+                    cursor.execute(f'PRAGMA {name} = {value}')
+
+
+@contextmanager
+def explicit_dates(*fields):
+    """
+    Позволяет записать заданные даты в поля с auto_now_add:
+    иначе bulk_create заменил бы их текущим временем.
+    """
+    saved = [(field, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, value in saved:
+            field.auto_now_add = value
+
+
+def make_image(number, size=(1200, 800)):
+    """
+    Полосатое изображение JPEG, разное для каждого номера.
+    """
+    generator = random.Random(number)
+    image = Image.new('RGB', size)
+    draw = ImageDraw.Draw(image)
+    for left in range(0, size[0], 40):
+        color = tuple(generator.randrange(256) for _ in range(3))
+        draw.rectangle((left, 0, left + 40, size[1]), fill=color)
+    buffer = BytesIO()
+    image.save(buffer, 'JPEG', quality=85)
+    return ContentFile(buffer.getvalue(), name=f'seed-{number}.jpg')
+
+
+class Seeder:
+    """
+    Загрузчик данных. Новые строки добавляются после уже
+    существующих, поэтому базу можно наращивать в несколько заходов.
+
+    Строки пишутся пачками по batch_size, по transaction_rows
+    строк в одной транзакции.
+    """
+
+    def __init__(self, seed=0, batch_size=5000, log=None, processes=1,
+                 transaction_rows=100000):
+        self.seed = seed
+        self.batch_size = batch_size
+        self.transaction_rows = max(transaction_rows, batch_size)
+        self.log = log or (lambda message: None)
+        self.processes = processes
+        self.pool = None
+        self.users = (0, 0)
+        self.groups = (0, 0)
+        self.posts = (0, 0)
+        self.first_date = timezone.now() - POST_PERIOD
+        self.follows = []
+        self.posts_by_author = defaultdict(list)
+        self.image_refs = Counter()
+        self.counts = Counter()
+
+    def generate(self, function, tasks):
+        """
+        Порции строк по порядку заданий, из пула процессов,
+        если он запущен.
+        """
+        if self.pool is None:
+            return map(function, tasks)
+        return self.pool.imap(function, tasks)
+
+    def rows(self, function, tasks):
+        for chunk in self.generate(function, tasks):
+            yield from chunk
+
+    def write(self, name, rows, write):
+        per_transaction = self.transaction_rows // self.batch_size
+        total = 0
+        for group in _batches(_batches(rows, self.batch_size),
+                              per_transaction):
+            with transaction.atomic():
+                for batch in group:
+                    write(batch)
+                    total += len(batch)
+        self.counts[name] += total
+        self.log(f'{name}: {total}')
+        return total
+
+    def insert(self, model, rows, **options):
+        return self.write(
+            model._meta.model_name, rows,
+            lambda batch: model.objects.bulk_create(batch, **options))
+
+    def execute_many(self, name, sql, rows):
+        def write(batch):
+            with connection.cursor() as cursor:
+                cursor.executemany(sql, batch)
+        return self.write(name, rows, write)
+
+    def insert_values(self, model, field_names, rows):
+        """
+        Вставка готовых значений столбцов без создания объектов
+        моделей: для производных таблиц в десятки раз больше
+        исходных. Совпадающие строки пропускаются.
+        """
+        quote = connection.ops.quote_name
+        columns = ', '.join(
+            quote(model._meta.get_field(name).column)
+            for name in field_names)
+        placeholders = ', '.join(['%s'] * len(field_names))
+        sql = (
+            f'{connection.ops.insert_statement(ignore_conflicts=True)} '
+            f'{quote(model._meta.db_table)} ({columns}) '
+            f'VALUES ({placeholders})'
+            f'{connection.ops.ignore_conflicts_suffix_sql(True)}'
+        )
+        return self.execute_many(model._meta.model_name, sql, rows)
+
+    def create_users(self, count):
+        start = _next_id(User)
+        password = make_password(SEED_PASSWORD)
+        joined = timezone.now() - POST_PERIOD
+        self.users = (start, count)
+        self.insert(User, (
+            User(
+                pk=pk,
+                username=f'user{pk}',
+                first_name=f'Имя{pk}',
+                last_name=f'Фамилия{pk}',
+                password=password,
+                date_joined=joined,
+            )
+            for pk in range(start, start + count)
+        ))
+
+    def create_groups(self, count):
+        start = _next_id(Group)
+        self.groups = (start, count)
+        self.insert(Group, (
+            Group(
+                pk=pk,
+                title=f'Сообщество {pk}',
+                slug=f'group-{pk}',
+                description=f'Описание сообщества {pk}',
+            )
+            for pk in range(start, start + count)
+        ))
+
+    def create_images(self):
+        """
+        Пул изображений с готовыми вариантами:
+        посты ссылаются на одни и те же файлы, как при повторных
+        загрузках одинаковых картинок.
+        """
+        storage = Post._meta.get_field('image').storage
+        pool = []
+        for number in range(IMAGE_POOL):
+            name = storage.save(f'posts/seed-{number}.jpg', make_image(number))
+            variants = images._render_variants(name, storage)
+            pool.append(
+                (name, json.dumps({'source': name, 'variants': variants})))
+        return pool
+
+    def common(self):
+        """
+        Общие параметры заданий генераторов постов и комментариев.
+        """
+        return {
+            'users': self.users,
+            'groups': self.groups,
+            'posts': self.posts,
+            'first_date': self.first_date,
+            'step': POST_PERIOD / max(self.posts[1], 1),
+        }
+
+    def _post(self, row):
+        pk, text, pub_date, author_id, group_id, image, variants = row
+        self.posts_by_author[author_id].append((pub_date, pk))
+        if image:
+            self.image_refs[image] += 1
+        return Post(
+            pk=pk,
+            text=text,
+            pub_date=pub_date,
+            author_id=author_id,
+            group_id=group_id,
+            image=image,
+            image_variants=variants,
+        )
+
+    def create_posts(self, count, image_share):
+        """
+        Посты с датами по возрастанию ключа за POST_PERIOD
+        до текущего момента.
+        """
+        self.posts = (_next_id(Post), count)
+        tasks = generators.chunks(
+            'post', self.seed, *self.posts,
+            images=self.create_images() if image_share else [],
+            image_share=image_share,
+            **self.common(),
+        )
+        with explicit_dates(Post._meta.get_field('pub_date')):
+            self.insert(Post, (
+                self._post(row)
+                for row in self.rows(generators.post_rows, tasks)
+            ))
+
+    def _comments(self, rows, counts):
+        for post_id, author_id, text, created in rows:
+            counts[post_id] += 1
+            yield Comment(
+                post_id=post_id,
+                author_id=author_id,
+                text=text,
+                created=created,
+            )
+
+    def create_comments(self, count):
+        """
+        Комментарии к новым постам; счётчики комментариев
+        постов увеличиваются после вставки.
+        """
+        if not self.posts[1]:
+            return
+        counts = Counter()
+        tasks = generators.chunks(
+            'comment', self.seed, 0, count, pause=COMMENT_DELAY,
+            **self.common())
+        with explicit_dates(Comment._meta.get_field('created')):
+            self.insert(Comment, self._comments(
+                self.rows(generators.comment_rows, tasks), counts))
+        table = connection.ops.quote_name(Post._meta.db_table)
+        self.execute_many(
+            'comment_count',
+            f'UPDATE {table} SET comment_count = comment_count + %s '
+            f'WHERE id = %s',
+            ((total, pk) for pk, total in counts.items()),
+        )
+
+    def create_follows(self, follows_per_user):
+        start, count = self.users
+        popular = list(range(start, start + count))
+        random.Random(f'{self.seed}:popular').shuffle(popular)
+        tasks = generators.chunks(
+            'follow', self.seed, start, count,
+            popular=popular, follows_per_user=follows_per_user)
+        self.follows = list(self.rows(generators.follow_rows, tasks))
+        self.insert(Follow, (
+            Follow(user_id=user_id, author_id=author_id)
+            for user_id, author_id in self.follows
+        ), ignore_conflicts=True)
+
+    def create_feed_entries(self):
+        """
+        Ленты подписчиков: последние FEED_BACKFILL_LIMIT постов
+        каждого автора, как при подписке. Посты авторов
+        с числом подписчиков больше FEED_FANOUT_LIMIT не
+        раскладываются, их лента подтягивает при чтении.
+        """
+        followers = Counter(author_id for _, author_id in self.follows)
+        limit = settings.FEED_BACKFILL_LIMIT
+        pub_date = FeedEntry._meta.get_field('pub_date')
+        recent = {
+            author_id: [
+                (pub_date.get_db_prep_value(date, connection), post_id)
+                for date, post_id in posts[-limit:]
+            ]
+            for author_id, posts in self.posts_by_author.items()
+            if followers[author_id] <= settings.FEED_FANOUT_LIMIT
+        }
+        self.insert_values(
+            FeedEntry,
+            ('user', 'post', 'author', 'pub_date'),
+            (
+                (user_id, post_id, author_id, date)
+                for user_id, author_id in self.follows
+                for date, post_id in recent.get(author_id, ())
+            ),
+        )
+
+    def index_posts(self):
+        """
+        Строки полнотекстового индекса из основ слов словаря
+        без повторного разбора текста стеммером.
+        """
+        if connection.vendor != 'sqlite' or not self.posts[1]:
+            return
+        posts = Post.objects.filter(pk__gte=self.posts[0]).order_by(
+            'pk').values_list('pk', 'text')
+        self.execute_many('postsearch', search.INSERT_SQL, (
+            (pk, ' '.join(STEMS[word] for word in text.split()))
+            for pk, text in posts.iterator(chunk_size=self.batch_size)
+        ))
+
+    def count_image_refs(self):
+        for name, refs in self.image_refs.items():
+            updated = MediaBlob.objects.filter(name=name).update(
+                refs=F('refs') + refs)
+            if not updated:
+                MediaBlob.objects.create(name=name, refs=refs)
+
+    def run(self, users, groups, posts, comments, follows_per_user=20,
+            image_share=0.1):
+        if self.processes > 1:
+            self.pool = multiprocessing.Pool(self.processes)
+        try:
+            with tuned_load():
+                self.create_users(users)
+                self.create_groups(groups)
+                self.create_posts(posts, image_share)
+                self.create_comments(comments)
+                self.create_follows(follows_per_user)
+                self.create_feed_entries()
+                self.index_posts()
+                self.count_image_refs()
+                AuthorStats.objects.rebuild_all(batch_size=self.batch_size)
+            bump_feed_version()
+        finally:
+            if self.pool is not None:
+                self.pool.close()
+                self.pool.join()
+        return self.counts
+
+
+def seed(posts, seed=0, batch_size=5000, log=None, processes=1,
+         transaction_rows=100000, **volumes):
+    """
+    Заполняет базу постами и соразмерными им данными
+    (см. scale); отдельные объёмы можно переопределить.
+    """
+    options = scale(posts)
+    options.update(volumes)
+    seeder = Seeder(seed, batch_size, log, processes, transaction_rows)
+    return seeder.run(**options)
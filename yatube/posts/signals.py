@@ -0,0 +1,238 @@
+"""
+Обработчики сигналов моделей постов и подписок.
+"""
+from functools import partial
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import (post_delete, post_init, post_save,
+                                      pre_save)
+from django.dispatch import receiver
+
+from . import feeds, images, search
+from .background import FEED_POOL, run_after_commit
+from .caching import (COMMENTS_VERSION_KEY, FOLLOW_VERSION_KEY,
+                      bump_feed_version, bump_version, forget_group_choices)
+from .models import AuthorStats, Comment, Follow, Group, MediaBlob, Post
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=Post)
+def fan_out_new_post(sender, instance, created, **kwargs):
+    """
+    Раскладывает новый пост по лентам подписчиков в фоне после
+    фиксации, не удерживая блокировку записи транзакции поста.
+    """
+    if created:
+        run_after_commit(feeds.fan_out_post, instance.pk, pool=FEED_POOL)
+
+
+@receiver(post_save, sender=Post)
+def process_post_image(sender, instance, raw=False, **kwargs):
+    """
+    Готовит адаптивные варианты изображения поста в фоне. Миниатюра
+    sorl-thumbnail нужна шаблону, только пока вариантов ещё нет,
+    поэтому заранее не создаётся: изображение декодируется один раз.
+    """
+    if not raw:
+        images.schedule(instance)
+
+
+def _image_name(value):
+    return getattr(value, 'name', value) or ''
+
+
+@receiver(post_init, sender=Post)
+def remember_stored_image(sender, instance, **kwargs):
+    """
+    Запоминает сохранённое в базе изображение поста. Для отложенного
+    поля (only/defer) значение неизвестно и читается перед сохранением.
+    """
+    if 'image' in instance.__dict__:
+        instance._stored_image = _image_name(instance.__dict__['image'])
+    else:
+        instance._stored_image = None
+
+
+@receiver(pre_save, sender=Post)
+def load_stored_image(sender, instance, raw=False, **kwargs):
+    """
+    Дочитывает прежнее изображение, если при загрузке оно было отложено.
+    """
+    if instance._stored_image is None and instance.pk and not raw:
+        stored = Post.objects.filter(pk=instance.pk).values_list(
+            'image', flat=True).first()
+        instance._stored_image = stored or ''
+
+
+@receiver(post_save, sender=Post)
+def count_image_refs(sender, instance, created, **kwargs):
+    """
+    Переносит ссылку поста с прежнего файла изображения на новый.
+    """
+    stored = '' if created else instance._stored_image or ''
+    current = _image_name(instance.image)
+    if current != stored:
+        MediaBlob.objects.acquire(current)
+        MediaBlob.objects.release(stored)
+    instance._stored_image = current
+
+
+@receiver(post_delete, sender=Post)
+def release_deleted_image(sender, instance, **kwargs):
+    """
+    Снимает ссылку удалённого поста с файла изображения.
+    """
+    MediaBlob.objects.release(_image_name(instance.image))
+
+
+@receiver(post_save, sender=Post)
+def index_saved_post(sender, instance, created, update_fields=None,
+                     **kwargs):
+    """
+    Обновляет строку поста в полнотекстовом индексе.
+    """
+    if created or update_fields is None or 'text' in update_fields:
+        search.index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_deleted_post(sender, instance, **kwargs):
+    """
+    Убирает удалённый пост из полнотекстового индекса.
+    """
+    search.unindex_post(instance.pk)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_new_follow(sender, instance, created, **kwargs):
+    """
+    Заполняет ленту при подписке на автора.
+    """
+    if created:
+        feeds.backfill_follow(instance)
+
+
+@receiver(post_save, sender=Comment)
+def count_new_comment(sender, instance, created, **kwargs):
+    """
+    Увеличивает счётчик комментариев поста.
+    """
+    if created:
+        Post.objects.filter(pk=instance.post_id).update(
+            comment_count=F('comment_count') + 1)
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    """
+    Уменьшает счётчик комментариев поста.
+    """
+    Post.objects.filter(pk=instance.post_id, comment_count__gt=0).update(
+        comment_count=F('comment_count') - 1)
+
+
+@receiver(post_delete, sender=Follow)
+def drop_deleted_follow(sender, instance, **kwargs):
+    """
+    Очищает ленту при отписке от автора.
+    """
+    feeds.drop_follow(instance)
+
+
+@receiver(post_save, sender=User)
+def create_author_stats(sender, instance, created, raw=False, **kwargs):
+    """
+    Заводит нулевые счётчики новому пользователю.
+    """
+    if created and not raw:
+        AuthorStats.objects.get_or_create(author=instance)
+
+
+@receiver(post_save, sender=Post)
+def count_new_post(sender, instance, created, **kwargs):
+    """
+    Увеличивает счётчик постов автора.
+    """
+    if created:
+        AuthorStats.objects.change(instance.author_id, posts_count=1)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    """
+    Уменьшает счётчик постов автора.
+    """
+    AuthorStats.objects.change(instance.author_id, posts_count=-1)
+
+
+@receiver(post_save, sender=Follow)
+def count_new_follow(sender, instance, created, **kwargs):
+    """
+    Увеличивает счётчики подписчиков автора и подписок пользователя.
+    """
+    if created:
+        AuthorStats.objects.change(instance.author_id, followers_count=1)
+        AuthorStats.objects.change(instance.user_id, following_count=1)
+
+
+@receiver(post_delete, sender=Follow)
+def count_deleted_follow(sender, instance, **kwargs):
+    """
+    Уменьшает счётчики подписчиков автора и подписок пользователя.
+    """
+    AuthorStats.objects.change(instance.author_id, followers_count=-1)
+    AuthorStats.objects.change(instance.user_id, following_count=-1)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_group_choices(sender, **kwargs):
+    """
+    Сбрасывает кеш вариантов выбора сообщества в админке.
+    """
+    forget_group_choices()
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_feed_pages(sender, update_fields=None, **kwargs):
+    """
+    Сбрасывает кеш страниц лент при изменении показанных в них данных.
+    Обновление только last_login при входе ленты не меняет.
+
+    Версии здесь и ниже меняются после фиксации транзакции: иначе
+    параллельный запрос закешировал бы под новой версией данные,
+    которые ещё видит до фиксации.
+    """
+    if update_fields is not None and set(update_fields) == {'last_login'}:
+        return
+    transaction.on_commit(bump_feed_version)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def bump_follow_versions(sender, instance, **kwargs):
+    """
+    Меняет версии подписок пользователя и автора: от них зависят
+    лента подписок и счётчики на странице профиля.
+    """
+    for user_id in (instance.user_id, instance.author_id):
+        transaction.on_commit(
+            partial(bump_version, FOLLOW_VERSION_KEY.format(user_id)))
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def bump_comments_version(sender, instance, **kwargs):
+    """
+    Меняет версию комментариев поста для страницы поста.
+    """
+    transaction.on_commit(partial(
+        bump_version, COMMENTS_VERSION_KEY.format(instance.post_id)))
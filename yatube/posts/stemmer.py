@@ -0,0 +1,141 @@
+"""
+Стеммер русского языка по алгоритму Snowball (Porter).
+
+Отрезает окончания в области RV (после первой гласной),
+словообразовательные суффиксы -ост/-ость в области R2.
+"""
+import re
+
+VOWELS = 'аеиоуыэюя'
+
+PERFECTIVE_GERUND = (
+    ('в', 'вши', 'вшись'),
+    ('ив', 'ивши', 'ившись', 'ыв', 'ывши', 'ывшись'),
+)
+ADJECTIVE = (
+    (),
+    (
+        'ее', 'ие', 'ые', 'ое', 'ими', 'ыми', 'ей', 'ий', 'ый', 'ой',
+        'ем', 'им', 'ым', 'ом', 'его', 'ого', 'ему', 'ому', 'их', 'ых',
+        'ую', 'юю', 'ая', 'яя', 'ою', 'ею',
+    ),
+)
+PARTICIPLE = (
+    ('ем', 'нн', 'вш', 'ющ', 'щ'),
+    ('ивш', 'ывш', 'ующ'),
+)
+REFLEXIVE = ((), ('ся', 'сь'))
+VERB = (
+    (
+        'ла', 'на', 'ете', 'йте', 'ли', 'й', 'л', 'ем', 'н', 'ло', 'но',
+        'ет', 'ют', 'ны', 'ть', 'ешь', 'нно',
+    ),
+    (
+        'ила', 'ыла', 'ена', 'ейте', 'уйте', 'ите', 'или', 'ыли', 'ей',
+        'уй', 'ил', 'ыл', 'им', 'ым', 'ен', 'ило', 'ыло', 'ено', 'ят',
+        'ует', 'уют', 'ит', 'ыт', 'ены', 'ить', 'ыть', 'ишь', 'ую', 'ю',
+    ),
+)
+NOUN = (
+    (),
+    (
+        'а', 'ев', 'ов', 'ие', 'ье', 'е', 'иями', 'ями', 'ами', 'еи',
+        'ии', 'и', 'ией', 'ей', 'ой', 'ий', 'й', 'иям', 'ям', 'ием',
+        'ем', 'ам', 'ом', 'о', 'у', 'ах', 'иях', 'ях', 'ы', 'ь', 'ию',
+        'ью', 'ю', 'ия', 'ья', 'я',
+    ),
+)
+SUPERLATIVE = ('ейше', 'ейш')
+DERIVATIONAL = ('ость', 'ост')
+
+WORD_RE = re.compile(r'\w+')
+CYRILLIC_RE = re.compile('[а-я]')
+
+
+def _regions(word):
+    """
+    Начала областей RV и R2 в слове.
+    """
+    def after_vowel_consonant(start):
+        for i in range(start + 1, len(word)):
+            if word[i] not in VOWELS and word[i - 1] in VOWELS:
+                return i + 1
+        return len(word)
+
+    rv = next(
+        (i + 1 for i, char in enumerate(word) if char in VOWELS),
+        len(word),
+    )
+    r1 = after_vowel_consonant(0)
+    r2 = after_vowel_consonant(r1)
+    return rv, r2
+
+
+def _remove(word, start, groups):
+    """
+    Отрезает самое длинное окончание из групп, если оно целиком
+    лежит после start. Окончания первой группы допустимы только
+    после «а» или «я». Возвращает None, если окончание не найдено.
+    """
+    endings = [
+        (ending, number)
+        for number, group in enumerate(groups) for ending in group
+        if word.endswith(ending) and len(word) - len(ending) >= start
+    ]
+    if not endings:
+        return None
+    ending, number = max(endings, key=lambda item: len(item[0]))
+    stem = word[:-len(ending)]
+    if number == 0 and (len(stem) <= start or stem[-1] not in 'ая'):
+        return None
+    return stem
+
+
+def _step_one(word, rv):
+    stem = _remove(word, rv, PERFECTIVE_GERUND)
+    if stem is not None:
+        return stem
+    word = _remove(word, rv, REFLEXIVE) or word
+    stem = _remove(word, rv, ADJECTIVE)
+    if stem is not None:
+        return _remove(stem, rv, PARTICIPLE) or stem
+    for groups in (VERB, NOUN):
+        stem = _remove(word, rv, groups)
+        if stem is not None:
+            return stem
+    return word
+
+
+def stem(word):
+    """
+    Основа слова; слова без кириллицы возвращаются как есть.
+    """
+    word = word.lower().replace('ё', 'е')
+    if not CYRILLIC_RE.search(word):
+        return word
+    rv, r2 = _regions(word)
+    word = _step_one(word, rv)
+    if word.endswith('и') and len(word) - 1 >= rv:
+        word = word[:-1]
+    for ending in DERIVATIONAL:
+        if word.endswith(ending) and len(word) - len(ending) >= r2:
+            word = word[:-len(ending)]
+            break
+    if word.endswith('нн') and len(word) - 1 >= rv:
+        return word[:-1]
+    for ending in SUPERLATIVE:
+        if word.endswith(ending) and len(word) - len(ending) >= rv:
+            word = word[:-len(ending)]
+            if word.endswith('нн') and len(word) - 1 >= rv:
+                word = word[:-1]
+            return word
+    if word.endswith('ь') and len(word) - 1 >= rv:
+        return word[:-1]
+    return word
+
+
+def stems(text):
+    """
+    Основы всех слов текста по порядку.
+    """
+    return [stem(word) for word in WORD_RE.findall(text.lower())]
@@ -0,0 +1,65 @@
+"""
+Хранилище изображений постов с адресацией по содержимому.
+
+Файл сохраняется под именем из SHA-256 его содержимого, поэтому
+одинаковые изображения хранятся и обрабатываются один раз: вторая
+загрузка получает имя уже сохранённого файла, а миниатюры sorl-thumbnail
+и адаптивные варианты находятся по этому имени готовыми.
+
+Файл пишется под временным именем и появляется под своим именем
+атомарно (жёсткой ссылкой): при одновременной загрузке одинакового
+содержимого второй запрос получает то же имя, а не копию с суффиксом.
+"""
+import hashlib
+import os
+import uuid
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+def content_digest(content):
+    """
+    SHA-256 содержимого файла. Обработчик загрузки считает хеш
+    при приёме и сохраняет его в content_digest; иначе файл
+    читается частями.
+    """
+    digest = getattr(content, 'content_digest', None)
+    if digest:
+        return digest
+    hasher = hashlib.sha256()
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    for chunk in content.chunks():
+        hasher.update(chunk)
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    return hasher.hexdigest()
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Файловое хранилище, сохраняющее файл в <каталог>/<aa>/<хеш><.расш>.
+    Уже сохранённое содержимое повторно не записывается.
+    """
+
+    def digest_name(self, name, content):
+        directory = os.path.dirname(name)
+        extension = os.path.splitext(name)[1].lower()
+        digest = content_digest(content)
+        return os.path.join(
+            directory, digest[:2], f'{digest}{extension}').replace('\\', '/')
+
+    def _save(self, name, content):
+        name = self.digest_name(name, content)
+        if self.exists(name):
+            return name
+        temporary = super()._save(f'{name}.{uuid.uuid4().hex}.part', content)
+        try:
+            os.link(self.path(temporary), self.path(name))
+        except FileExistsError:
+            pass
+        finally:
+            self.delete(temporary)
+        return name
@@ -0,0 +1,91 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import Group, Post
+
+User = get_user_model()
+
+
+class PostAdminChangelistTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password')
+        self.client = Client()
+        self.client.force_login(self.admin)
+        self.groups = [
+            Group.objects.create(
+                title=f'Группа {number}', slug=f'group-{number}',
+                description='Описание')
+            for number in range(3)
+        ]
+        self.url = reverse('admin:posts_post_changelist')
+
+    def create_posts(self, count):
+        start = Post.objects.count()
+        for number in range(start, start + count):
+            author = User.objects.create_user(username=f'user{number}')
+            Post.objects.create(
+                author=author, text=f'Пост {number}',
+                group=self.groups[number % 3])
+
+    def changelist_queries(self, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return [query['sql'] for query in queries.captured_queries]
+
+    def test_queries_do_not_grow_with_rows(self):
+        self.create_posts(2)
+        self.changelist_queries()
+        few = len(self.changelist_queries())
+        self.create_posts(8)
+        self.assertEqual(len(self.changelist_queries()), few)
+
+    def test_group_choices_are_cached(self):
+        self.create_posts(3)
+        self.changelist_queries()
+        queries = self.changelist_queries()
+        self.assertFalse(
+            [sql for sql in queries if 'FROM "posts_group"' in sql])
+        Group.objects.create(title='Новая', slug='new', description='-')
+        self.assertContains(self.client.get(self.url), 'Новая')
+
+    @override_settings(ADMIN_EXACT_COUNT_LIMIT=0)
+    def test_unfiltered_count_is_estimated(self):
+        self.create_posts(3)
+        queries = self.changelist_queries()
+        self.assertFalse([sql for sql in queries if 'COUNT(' in sql])
+        self.assertTrue([sql for sql in queries if 'MAX(' in sql])
+
+    @override_settings(ADMIN_EXACT_COUNT_LIMIT=1)
+    def test_filtered_count_is_capped(self):
+        self.create_posts(6)
+        queries = self.changelist_queries(q='Пост')
+        self.assertTrue([
+            sql for sql in queries if 'COUNT(' in sql and 'LIMIT 2' in sql])
+        response = self.client.get(self.url, {'q': 'Пост'})
+        self.assertEqual(response.context['cl'].result_count, 2)
+
+    def test_date_filter_does_not_scan_dates(self):
+        self.create_posts(2)
+        today = timezone.localdate()
+        params = {
+            'pub_date__gte': today.isoformat(),
+            'pub_date__lt': (today + timedelta(days=1)).isoformat(),
+        }
+        queries = self.changelist_queries(**params)
+        self.assertFalse([
+            sql for sql in queries
+            if 'django_date_trunc' in sql or 'MIN(' in sql
+        ])
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.context['cl'].result_count, 2)
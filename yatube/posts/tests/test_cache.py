@@ -1,32 +1,169 @@
+from unittest import mock
+
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
-from django.test import Client, TestCase
+from django.db import transaction
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, TestCase, TransactionTestCase
 from django.urls import reverse
 
-from ..models import Post
+from .. import caching
+from ..models import Group, Post
 
 User = get_user_model()
 
 
-class CacheTests(TestCase):
+class CacheTests(TransactionTestCase):
 
     def setUp(self):
+        cache.clear()
         self.user = User.objects.create(username='test_user')
         self.authorized_client = Client()
         self.authorized_client.force_login(self.user)
 
+    def get_index(self):
+        return self.authorized_client.get(reverse('posts:index')).content
+
     def test_cache_index_page(self):
         post = Post.objects.create(
             text='Новый тестовый пост',
             author=self.user,
         )
-        content_new = self.authorized_client.get(
-            reverse('posts:index')).content
+        content_new = self.get_index()
+        Post.objects.filter(pk=post.pk).update(text='Изменён в обход ORM')
+        content_updated = self.get_index()
+        self.assertEqual(content_new, content_updated)
+        cache.clear()
+        content_updated = self.get_index()
+        self.assertNotEqual(content_new, content_updated)
+
+    def test_post_delete_invalidates_index_page(self):
+        post = Post.objects.create(
+            text='Новый тестовый пост',
+            author=self.user,
+        )
+        content_new = self.get_index()
         post.delete()
-        content_delete = self.authorized_client.get(
-            reverse('posts:index')).content
-        self.assertEqual(content_new, content_delete)
+        self.assertNotEqual(content_new, self.get_index())
+
+    def test_version_changes_after_commit(self):
+        version = caching.get_version(caching.FEED_VERSION_KEY)
+        with transaction.atomic():
+            Post.objects.create(text='Новый тестовый пост', author=self.user)
+            self.assertEqual(
+                caching.get_version(caching.FEED_VERSION_KEY), version)
+        self.assertNotEqual(
+            caching.get_version(caching.FEED_VERSION_KEY), version)
+
+    def test_group_change_invalidates_index_page(self):
+        group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        Post.objects.create(
+            text='Новый тестовый пост',
+            author=self.user,
+            group=group,
+        )
+        content_new = self.get_index()
+        group.slug = 'new-slug'
+        group.save()
+        self.assertNotEqual(content_new, self.get_index())
+
+
+class SingleFlightCacheTests(TestCase):
+
+    def setUp(self):
         cache.clear()
-        content_delete = self.authorized_client.get(
-            reverse('posts:index')).content
-        self.assertNotEqual(content_new, content_delete)
+        self.factory = RequestFactory()
+        self.version = 1
+        self.calls = 0
+
+        @caching.cache_page_single_flight(
+            60, key_prefix='test', version=lambda: self.version)
+        def view(request):
+            self.calls += 1
+            return HttpResponse(f'{self.version}:{self.calls}')
+
+        self.view = view
+
+    def get(self):
+        return self.view(self.factory.get('/feed/')).content.decode()
+
+    def test_fresh_entry_is_served_from_cache(self):
+        self.assertEqual(self.get(), '1:1')
+        self.assertEqual(self.get(), '1:1')
+        self.assertEqual(self.calls, 1)
+
+    def test_new_version_is_recomputed(self):
+        self.get()
+        self.version = 2
+        self.assertEqual(self.get(), '2:2')
+
+    def test_stale_entry_is_served_while_locked(self):
+        self.get()
+        self.version = 2
+        request = self.factory.get('/feed/')
+        cache.add(caching._lock_key(request, 'test'), 1)
+        self.assertEqual(self.get(), '1:1')
+        self.assertEqual(self.calls, 1)
+
+    def test_stale_entry_is_not_stored_by_client(self):
+        self.get()
+        self.version = 2
+        request = self.factory.get('/feed/')
+        cache.add(caching._lock_key(request, 'test'), 1)
+        response = self.view(request)
+        self.assertIn('no-store', response['Cache-Control'])
+
+    def test_entry_expires_early_with_probability(self):
+        entry = {'version': 1, 'stale_at': caching.time.time() + 10,
+                 'delta': 5}
+        with mock.patch.object(caching.random, 'random', return_value=0):
+            self.assertTrue(caching._is_fresh(entry, 1, beta=1.0))
+        with mock.patch.object(caching.random, 'random',
+                               return_value=0.99999):
+            self.assertFalse(caching._is_fresh(entry, 1, beta=1.0))
+
+
+class PostCardCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create(
+            username='author', first_name='Имя', last_name='Фамилия')
+        self.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        self.post = Post.objects.create(
+            text='Текст поста', author=self.author, group=self.group)
+        self.url = reverse('posts:group_list', kwargs={'slug': 'test-slug'})
+
+    def get_page(self):
+        return Client().get(self.url).content.decode()
+
+    def test_card_is_served_from_cache(self):
+        self.get_page()
+        Post.objects.filter(pk=self.post.pk).update(text='В обход ORM')
+        self.assertIn('Текст поста', self.get_page())
+
+    def test_post_save_refreshes_card(self):
+        self.get_page()
+        self.post.text = 'Новый текст'
+        self.post.save()
+        self.assertIn('Новый текст', self.get_page())
+
+    def test_author_name_change_refreshes_card(self):
+        self.get_page()
+        self.author.first_name = 'Другое'
+        self.author.save()
+        self.assertIn('Другое Фамилия', self.get_page())
+
+    def test_cards_are_shared_between_feeds(self):
+        self.get_page()
+        Post.objects.filter(pk=self.post.pk).update(text='В обход ORM')
+        index = Client().get(reverse('posts:index'))
+        self.assertContains(index, 'Текст поста')
@@ -0,0 +1,57 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Post
+
+User = get_user_model()
+
+
+@override_settings(COMMENTS_PAGE=5)
+class PostCommentsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.post = Post.objects.create(author=cls.user, text='Тестовый пост')
+        cls.commenters = [
+            User.objects.create_user(username=f'reader{number}')
+            for number in range(7)
+        ]
+        for commenter in cls.commenters:
+            Comment.objects.create(
+                post=cls.post, author=commenter, text=f'От {commenter}')
+
+    def setUp(self):
+        self.client = Client()
+        self.url = reverse('posts:post_detail', args=[self.post.id])
+
+    def test_comment_count_follows_writes(self):
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 7)
+        Comment.objects.filter(author=self.commenters[0]).delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 6)
+
+    def test_comments_are_paginated_oldest_first(self):
+        first = self.client.get(self.url).context['comments']
+        self.assertEqual(
+            [comment.author for comment in first], self.commenters[:5])
+        cursor = first.paginator.next_cursor
+        second = self.client.get(f'{self.url}?after={cursor}')
+        self.assertEqual(
+            [comment.author for comment in second.context['comments']],
+            self.commenters[5:],
+        )
+
+    def test_comment_authors_are_loaded_with_comments(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url)
+        comment_queries = [
+            query for query in queries.captured_queries
+            if 'posts_comment' in query['sql']
+        ]
+        self.assertEqual(len(comment_queries), 1)
+        self.assertIn('auth_user', comment_queries[0]['sql'])
@@ -0,0 +1,90 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.test import Client, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from ..models import FeedEntry, Follow, Post
+
+User = get_user_model()
+
+
+@override_settings(BACKGROUND_WORKERS=0)
+class FollowFeedTests(TransactionTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.reader = User.objects.create_user(username='reader')
+        self.author = User.objects.create_user(username='author')
+        self.star = User.objects.create_user(username='star')
+        self.fan = User.objects.create_user(username='fan')
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def feed(self, query=''):
+        response = self.client.get(reverse('posts:follow_index') + query)
+        return response.context['page_obj']
+
+    def test_new_post_is_fanned_out(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(author=self.author, text='Новый пост')
+        self.assertTrue(
+            FeedEntry.objects.filter(user=self.reader, post=post).exists())
+        self.assertEqual(list(self.feed()), [post])
+
+    def test_fan_out_runs_after_commit(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        with transaction.atomic():
+            post = Post.objects.create(author=self.author, text='Новый пост')
+            self.assertFalse(FeedEntry.objects.filter(post=post).exists())
+        self.assertTrue(
+            FeedEntry.objects.filter(user=self.reader, post=post).exists())
+
+    def test_follow_backfills_and_unfollow_clears_feed(self):
+        post = Post.objects.create(author=self.author, text='Старый пост')
+        self.client.get(
+            reverse('posts:profile_follow', args=[self.author.username]))
+        self.assertEqual(list(self.feed()), [post])
+        self.client.get(
+            reverse('posts:profile_unfollow', args=[self.author.username]))
+        self.assertFalse(FeedEntry.objects.filter(user=self.reader).exists())
+        self.assertEqual(list(self.feed()), [])
+
+    @override_settings(FEED_FANOUT_LIMIT=1)
+    def test_popular_author_posts_are_pulled(self):
+        Follow.objects.create(user=self.fan, author=self.star)
+        Follow.objects.create(user=self.reader, author=self.star)
+        Follow.objects.create(user=self.reader, author=self.author)
+        posts = [
+            Post.objects.create(
+                author=(self.star, self.author)[number % 2],
+                text=f'Пост {number}',
+            )
+            for number in range(15)
+        ]
+        self.assertFalse(FeedEntry.objects.filter(author=self.star).exists())
+        first = self.feed()
+        second = self.feed(f'?after={first.paginator.next_cursor}')
+        self.assertEqual(list(first) + list(second), posts[::-1])
+        self.assertFalse(second.has_next())
+
+    @override_settings(FEED_FANOUT_LIMIT=1)
+    def test_author_under_limit_again_is_backfilled(self):
+        Follow.objects.create(user=self.fan, author=self.star)
+        Follow.objects.create(user=self.reader, author=self.star)
+        post = Post.objects.create(author=self.star, text='Пост')
+        self.assertFalse(FeedEntry.objects.filter(author=self.star).exists())
+        Follow.objects.get(user=self.fan, author=self.star).delete()
+        self.assertEqual(list(self.feed()), [post])
+        self.assertTrue(FeedEntry.objects.filter(
+            user=self.reader, post=post).exists())
+
+    @override_settings(FEED_FANOUT_LIMIT=2)
+    def test_bulk_unfollow_below_limit_backfills(self):
+        for user in (self.fan, self.author, self.reader):
+            Follow.objects.create(user=user, author=self.star)
+        post = Post.objects.create(author=self.star, text='Пост')
+        Follow.objects.filter(user__in=[self.fan, self.author]).delete()
+        self.assertEqual(list(self.feed()), [post])
+        self.assertTrue(FeedEntry.objects.filter(
+            user=self.reader, post=post).exists())
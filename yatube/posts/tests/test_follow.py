@@ -1,6 +1,6 @@
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
-from django.test import Client, TestCase
+from django.test import Client, TransactionTestCase, override_settings
 from django.urls import reverse
 
 from ..models import Follow, Group, Post
@@ -8,31 +8,29 @@ from ..models import Follow, Group, Post
 User = get_user_model()
 
 
-class FollowTests(TestCase):
-    @classmethod
-    def setUpClass(cls):
-        super().setUpClass()
-        cls.username = 'auth'
-        cls.username_one = 'david'
-        cls.username_two = 'yakov'
-        cls.user = User.objects.create_user(username=cls.username)
-        cls.title = 'Тестовая группа'
-        cls.slug = 'test-slug'
-        cls.description = 'Тестовое описание'
-        cls.group = Group.objects.create(
-            title=cls.title,
-            slug=cls.slug,
-            description=cls.description,
-        )
-        cls.text = 'Тестовый текст'
-        cls.post = Post.objects.create(
-            author=cls.user,
-            text=cls.text,
-            group=cls.group,
-        )
+@override_settings(BACKGROUND_WORKERS=0)
+class FollowTests(TransactionTestCase):
 
     def setUp(self):
         cache.clear()
+        self.username = 'auth'
+        self.username_one = 'david'
+        self.username_two = 'yakov'
+        self.user = User.objects.create_user(username=self.username)
+        self.title = 'Тестовая группа'
+        self.slug = 'test-slug'
+        self.description = 'Тестовое описание'
+        self.group = Group.objects.create(
+            title=self.title,
+            slug=self.slug,
+            description=self.description,
+        )
+        self.text = 'Тестовый текст'
+        self.post = Post.objects.create(
+            author=self.user,
+            text=self.text,
+            group=self.group,
+        )
         self.guest_client = Client()
         self.user1 = User.objects.create(username=self.username_one)
         self.authorized_client = Client()
@@ -1,3 +1,4 @@
+import hashlib
 import shutil
 import tempfile
 
@@ -203,6 +204,7 @@ class PostFormImageTests(TestCase):
             content=small_gif,
             content_type='image/gif'
         )
+        digest = hashlib.sha256(small_gif).hexdigest()
         post_text = 'Новый текст'
         form_data = {
             'text': post_text,
@@ -221,6 +223,6 @@ class PostFormImageTests(TestCase):
             Post.objects.filter(
                 group__slug=self.slug,
                 text=post_text,
-                image='posts/small.gif'
+                image=f'posts/{digest[:2]}/{digest}.gif'
             ).exists()
         )
@@ -0,0 +1,93 @@
+import json
+import os
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+from sorl.thumbnail.base import ThumbnailBackend
+
+from .. import background, images
+from ..models import Post
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def make_image(name, size):
+    buffer = BytesIO()
+    Image.new('RGB', size, 'teal').save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), 'image/png')
+
+
+@override_settings(
+    MEDIA_ROOT=TEMP_MEDIA_ROOT, POST_IMAGE_WIDTHS=(480, 960, 1440))
+class ImageVariantsTests(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='auth')
+        self.post = Post.objects.create(
+            author=self.user,
+            text='Пост с картинкой',
+            image=make_image('wide.png', (1000, 500)),
+        )
+
+    def variants(self):
+        self.post.refresh_from_db()
+        return json.loads(self.post.image_variants)['variants']
+
+    def test_variants_are_recorded_without_upscaling(self):
+        images.build_variants(self.post.pk)
+        variants = self.variants()
+        self.assertEqual(
+            sorted((v['width'], v['type']) for v in variants),
+            [(480, 'image/jpeg'), (480, 'image/webp'),
+             (960, 'image/jpeg'), (960, 'image/webp')],
+        )
+        for variant in variants:
+            path = os.path.join(TEMP_MEDIA_ROOT, variant['name'])
+            with Image.open(path) as image:
+                self.assertEqual(
+                    image.size, (variant['width'], variant['height']))
+        self.assertEqual(variants[0]['height'], 170)
+
+    @override_settings(BACKGROUND_WORKERS=0)
+    def test_save_decodes_image_once(self):
+        with mock.patch.object(
+                background.transaction, 'on_commit',
+                side_effect=lambda callback: callback()), \
+                mock.patch.object(
+                    ThumbnailBackend, '_create_thumbnail') as create:
+            self.post.save()
+        create.assert_not_called()
+        self.assertTrue(self.variants())
+
+    def test_feed_renders_srcset(self):
+        images.build_variants(self.post.pk)
+        response = Client().get(reverse('posts:index'))
+        self.assertContains(response, '<source type="image/webp"')
+        self.assertContains(response, '480w')
+        self.assertContains(response, 'loading="lazy"')
+
+    def test_replaced_image_drops_stale_variants(self):
+        images.build_variants(self.post.pk)
+        self.post.image = make_image('other.png', (600, 300))
+        self.post.save()
+        post = Post.objects.get(pk=self.post.pk)
+        self.assertEqual(post.image_sources, [])
+        images.build_variants(self.post.pk)
+        post = Post.objects.get(pk=self.post.pk)
+        self.assertEqual(len(post.image_sources), 2)
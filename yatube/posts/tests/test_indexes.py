@@ -0,0 +1,87 @@
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+FEED_TABLES = (
+    'posts_post', 'posts_comment', 'posts_follow', 'posts_feedentry')
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN для SQLite')
+class FeedQueryPlanTests(TestCase):
+    """
+    Запросы лент должны идти по индексам, без полного
+    перебора таблицы и сортировки во временном B-дереве.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        Post.objects.bulk_create(
+            Post(author=cls.user, group=cls.group, text=f'Текст {number}')
+            for number in range(15)
+        )
+        Follow.objects.create(user=cls.reader, author=cls.user)
+        cls.post = Post.objects.first()
+        Comment.objects.create(
+            post=cls.post, author=cls.reader, text='Комментарий')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def feed_urls(self):
+        return (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user}),
+            reverse('posts:follow_index'),
+            reverse('posts:post_detail', args=[self.post.id]),
+        )
+
+    def capture_feed_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        page = response.context.get('page_obj')
+        captured = [query['sql'] for query in queries.captured_queries]
+        if page is not None and page.has_next():
+            cursor = page.paginator.next_cursor
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(f'{url}?after={cursor}')
+            captured += [query['sql'] for query in queries.captured_queries]
+        return [
+            sql for sql in captured
+            if sql.startswith('SELECT')
+            and any(table in sql for table in FEED_TABLES)
+        ]
+
+    def query_plan(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return [row[-1] for row in cursor.fetchall()]
+
+    def test_feed_queries_use_indexes(self):
+        for url in self.feed_urls():
+            for sql in self.capture_feed_queries(url):
+                plan = self.query_plan(sql)
+                with self.subTest(url=url, sql=sql, plan=plan):
+                    for step in plan:
+                        for table in FEED_TABLES:
+                            self.assertNotRegex(
+                                step, rf'^SCAN (TABLE )?{table}( AS \w+)?$')
+                        self.assertNotIn('TEMP B-TREE FOR', step)
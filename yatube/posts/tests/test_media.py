@@ -0,0 +1,143 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+from sorl.thumbnail import get_thumbnail
+
+from .. import images, media
+from ..media import collect_orphans
+from ..models import MediaBlob, Post
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def image_bytes(color):
+    buffer = BytesIO()
+    Image.new('RGB', (40, 20), color).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ContentAddressedMediaTests(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='auth')
+        self.client = Client()
+        self.client.force_login(self.user)
+        self.red = image_bytes('red')
+        self.digest = hashlib.sha256(self.red).hexdigest()
+
+    def create(self, content, name='picture.png'):
+        return Post.objects.create(
+            author=self.user,
+            text='Пост',
+            image=SimpleUploadedFile(name, content, 'image/png'),
+        )
+
+    def refs(self, name):
+        return MediaBlob.objects.get(name=name).refs
+
+    def test_same_content_is_stored_once(self):
+        first = self.create(self.red, 'one.png')
+        second = self.create(self.red, 'TWO.PNG')
+        expected = f'posts/{self.digest[:2]}/{self.digest}.png'
+        self.assertEqual(first.image.name, expected)
+        self.assertEqual(second.image.name, expected)
+        self.assertEqual(
+            os.listdir(os.path.dirname(first.image.path)),
+            [f'{self.digest}.png'],
+        )
+        self.assertEqual(self.refs(expected), 2)
+
+    def test_concurrent_save_of_same_content_is_not_duplicated(self):
+        first = self.create(self.red)
+        storage = first.image.storage
+        exists = storage.exists
+        missed = [False, False]
+
+        def racing_exists(name):
+            return missed.pop() if missed else exists(name)
+
+        with mock.patch.object(storage, 'exists', racing_exists):
+            name = storage.save('posts/copy.png', ContentFile(self.red))
+        self.assertEqual(name, first.image.name)
+        self.assertEqual(
+            os.listdir(os.path.dirname(first.image.path)),
+            [f'{self.digest}.png'],
+        )
+
+    def test_upload_is_hashed_while_streaming(self):
+        self.client.post(reverse('posts:post_create'), data={
+            'text': 'Пост',
+            'image': SimpleUploadedFile('red.png', self.red, 'image/png'),
+        })
+        post = Post.objects.get()
+        self.assertIn(self.digest, post.image.name)
+
+    def test_replaced_image_is_collected(self):
+        post = self.create(self.red)
+        old_name = post.image.name
+        images.build_variants(post.pk)
+        thumbnail = get_thumbnail(post.image, '960x339', crop='center')
+        self.client.post(
+            reverse('posts:post_edit', args=[post.pk]),
+            data={
+                'text': 'Новая картинка',
+                'image': SimpleUploadedFile(
+                    'blue.png', image_bytes('blue'), 'image/png'),
+            },
+        )
+        post.refresh_from_db()
+        self.assertNotEqual(post.image.name, old_name)
+        self.assertEqual(self.refs(old_name), 0)
+        self.assertEqual(collect_orphans(grace=0), [old_name])
+        storage = post.image.storage
+        self.assertFalse(storage.exists(old_name))
+        self.assertFalse(os.listdir(storage.path('posts/variants')))
+        self.assertFalse(thumbnail.exists())
+        self.assertTrue(storage.exists(post.image.name))
+        self.assertFalse(MediaBlob.objects.filter(name=old_name).exists())
+
+    def test_referenced_file_is_kept(self):
+        post = self.create(self.red)
+        MediaBlob.objects.filter(name=post.image.name).update(refs=0)
+        self.assertEqual(collect_orphans(grace=0), [])
+        self.assertTrue(post.image.storage.exists(post.image.name))
+        self.assertEqual(self.refs(post.image.name), 1)
+
+    def test_file_acquired_during_collection_is_kept(self):
+        post = self.create(self.red)
+        name = post.image.name
+        post.delete()
+        posts = media.Post.objects
+
+        def acquire_then_count(**kwargs):
+            MediaBlob.objects.acquire(name)
+            return posts.none()
+
+        with mock.patch.object(posts, 'filter', acquire_then_count):
+            self.assertEqual(collect_orphans(grace=0), [])
+        self.assertTrue(post.image.storage.exists(name))
+        self.assertEqual(self.refs(name), 1)
+
+    def test_deleted_post_releases_image(self):
+        post = self.create(self.red)
+        name = post.image.name
+        post.delete()
+        self.assertEqual(self.refs(name), 0)
@@ -0,0 +1,143 @@
+import datetime
+import json
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import moderation
+from ..models import Comment, Follow, Group, ModerationJob, Post
+
+User = get_user_model()
+
+
+@override_settings(MODERATION_BATCH_SIZE=2, MODERATION_BATCH_PAUSE=0)
+class ModerationJobTests(TestCase):
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password')
+        self.client = Client()
+        self.client.force_login(self.admin)
+        self.spammer = User.objects.create_user(username='spammer')
+        self.reader = User.objects.create_user(username='reader')
+        self.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        self.spam = [
+            Post.objects.create(author=self.spammer, text=f'Спам {number}')
+            for number in range(5)
+        ]
+        self.post = Post.objects.create(author=self.reader, text='Пост')
+        Comment.objects.create(
+            post=self.post, author=self.spammer, text='Спам')
+        Follow.objects.create(user=self.reader, author=self.spammer)
+
+    def run_action(self, model, action, objects, **data):
+        with mock.patch.object(moderation, 'run_after_commit') as queued:
+            response = self.client.post(
+                reverse(f'admin:posts_{model}_changelist'),
+                {
+                    'action': action,
+                    '_selected_action': [obj.pk for obj in objects],
+                    **data,
+                },
+                follow=True,
+            )
+        self.assertEqual(response.status_code, 200)
+        job = ModerationJob.objects.get()
+        queued.assert_called_once_with(
+            moderation.run_job, job.pk, pool=moderation.MODERATION_POOL)
+        return job
+
+    def test_delete_authors_posts_runs_in_batches(self):
+        job = self.run_action(
+            'post', 'delete_authors_posts', self.spam[:1])
+        self.assertEqual(job.total, 5)
+        self.assertEqual(Post.objects.filter(author=self.spammer).count(), 5)
+        with mock.patch.object(moderation.time, 'sleep') as pause:
+            moderation.run_job(job.pk)
+        self.assertEqual(pause.call_count, 3)
+        job.refresh_from_db()
+        self.assertEqual(
+            (job.status, job.processed, job.progress),
+            (ModerationJob.DONE, 5, 100),
+        )
+        self.assertFalse(Post.objects.filter(author=self.spammer).exists())
+        self.assertTrue(Post.objects.filter(pk=self.post.pk).exists())
+
+    def test_reassign_group(self):
+        job = self.run_action(
+            'post', 'reassign_group', self.spam[:3], group=self.group.pk)
+        self.assertEqual(json.loads(job.params)['group_id'], self.group.pk)
+        moderation.run_job(job.pk)
+        self.assertEqual(self.group.posts.count(), 3)
+
+    def test_purge_user_content(self):
+        job = self.run_action('post', 'purge_authors', self.spam[:1])
+        self.assertEqual(job.total, 7)
+        moderation.run_job(job.pk)
+        self.spammer.refresh_from_db()
+        self.assertFalse(self.spammer.is_active)
+        self.assertFalse(Comment.objects.filter(author=self.spammer).exists())
+        self.assertFalse(Follow.objects.exists())
+        self.assertEqual(list(Post.objects.all()), [self.post])
+
+    def test_delete_authors_comments(self):
+        job = self.run_action(
+            'comment', 'delete_authors_comments', Comment.objects.all())
+        moderation.run_job(job.pk)
+        self.assertFalse(Comment.objects.exists())
+
+    def test_failed_job_records_error(self):
+        job = moderation.start_job(
+            ModerationJob.DELETE_POSTS, self.admin,
+            author_ids=[self.spammer.pk])
+        with mock.patch.object(
+                moderation, '_delete_batches', side_effect=RuntimeError('x')):
+            with self.assertLogs('posts.moderation', 'ERROR'):
+                moderation.run_job(job.pk)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error), (ModerationJob.FAILED, 'x'))
+
+    def test_job_runs_once(self):
+        job = moderation.start_job(
+            ModerationJob.DELETE_POSTS, self.admin,
+            author_ids=[self.spammer.pk])
+        moderation.run_job(job.pk)
+        Post.objects.create(author=self.spammer, text='Новый спам')
+        moderation.run_job(job.pk)
+        self.assertTrue(Post.objects.filter(author=self.spammer).exists())
+
+    def abandon(self, job, seconds):
+        ModerationJob.objects.filter(pk=job.pk).update(
+            status=ModerationJob.RUNNING, processed=2,
+            updated=timezone.now() - datetime.timedelta(seconds=seconds))
+
+    def test_abandoned_job_is_resumed(self):
+        job = moderation.start_job(
+            ModerationJob.DELETE_POSTS, self.admin,
+            author_ids=[self.spammer.pk])
+        self.abandon(job, 600)
+        call_command('resume_moderation', stdout=StringIO())
+        job.refresh_from_db()
+        self.assertEqual(job.status, ModerationJob.DONE)
+        self.assertFalse(Post.objects.filter(author=self.spammer).exists())
+
+    def test_running_job_with_recent_progress_is_kept(self):
+        job = moderation.start_job(
+            ModerationJob.DELETE_POSTS, self.admin,
+            author_ids=[self.spammer.pk])
+        self.abandon(job, 10)
+        self.assertEqual(moderation.resumable_jobs(stale_after=300), [])
+        job.refresh_from_db()
+        self.assertEqual(job.status, ModerationJob.RUNNING)
+
+    def test_pending_jobs_are_resumed(self):
+        job = moderation.start_job(
+            ModerationJob.DELETE_COMMENTS, self.admin,
+            author_ids=[self.spammer.pk])
+        self.assertEqual(moderation.resumable_jobs(), [job.pk])
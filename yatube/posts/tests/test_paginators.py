@@ -0,0 +1,90 @@
+import warnings
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Post
+from ..paginators import COMMENT_ORDERING, CursorPaginator
+
+User = get_user_model()
+
+
+class CursorPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        Post.objects.bulk_create(
+            Post(author=cls.user, text=f'Тестовый текст {number}')
+            for number in range(25)
+        )
+        cls.expected = list(
+            Post.objects.order_by('-pub_date', '-pk')
+            .values_list('pk', flat=True)
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def get_page(self, query=''):
+        response = self.client.get(reverse('posts:index') + query)
+        return response.context['page_obj']
+
+    def ids(self, page):
+        return [post.pk for post in page]
+
+    def test_next_cursor_walks_all_pages(self):
+        page = self.get_page()
+        self.assertFalse(page.has_previous())
+        seen = self.ids(page)
+        while page.has_next():
+            page = self.get_page(f'?after={page.paginator.next_cursor}')
+            self.assertTrue(page.has_previous())
+            seen += self.ids(page)
+        self.assertEqual(seen, self.expected)
+
+    def test_previous_cursor_returns_previous_page(self):
+        first = self.get_page()
+        second = self.get_page(f'?after={first.paginator.next_cursor}')
+        back = self.get_page(f'?before={second.paginator.previous_cursor}')
+        self.assertEqual(self.ids(back), self.ids(first))
+        self.assertFalse(back.has_previous())
+        self.assertTrue(back.has_next())
+
+    def test_legacy_page_number(self):
+        page = self.get_page('?page=3')
+        self.assertEqual(self.ids(page), self.expected[20:])
+        self.assertTrue(page.has_previous())
+        self.assertFalse(page.has_next())
+
+    def test_page_past_the_end_gives_last_page(self):
+        page = self.get_page('?page=100')
+        self.assertEqual(self.ids(page), self.expected[20:])
+        self.assertEqual(page.number, 3)
+        self.assertFalse(page.has_next())
+
+    def test_overflowing_page_number_gives_last_page(self):
+        page = self.get_page('?page=99999999999999999999')
+        self.assertEqual(self.ids(page), self.expected[20:])
+
+    def test_invalid_cursor_falls_back_to_first_page(self):
+        page = self.get_page('?after=not-a-cursor')
+        self.assertEqual(self.ids(page), self.expected[:10])
+
+    def test_page_does_not_count_table(self):
+        first = self.get_page()
+        with CaptureQueriesContext(connection) as queries:
+            self.get_page(f'?after={first.paginator.next_cursor}')
+        for query in queries.captured_queries:
+            self.assertNotIn('COUNT(', query['sql'].upper())
+
+    def test_unordered_queryset_does_not_warn(self):
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            CursorPaginator(
+                Comment.objects.all(), 10, ordering=COMMENT_ORDERING)
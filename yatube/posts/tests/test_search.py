@@ -0,0 +1,97 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Post
+from ..search import search_posts
+from ..stemmer import stem
+
+User = get_user_model()
+
+
+class StemmerTests(TestCase):
+
+    def test_inflections_share_stem(self):
+        for words in (
+            ('кошка', 'кошки', 'кошками'),
+            ('бегать', 'бегал', 'бегали'),
+            ('красивый', 'красивая', 'красивейший'),
+        ):
+            with self.subTest(words=words):
+                self.assertEqual(len({stem(word) for word in words}), 1)
+
+    def test_latin_words_are_kept(self):
+        self.assertEqual(stem('Django'), 'django')
+
+
+class SearchTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='auth')
+        self.cats = Post.objects.create(
+            author=self.user, text='Кошки и кошка гуляли по крыше')
+        self.cat = Post.objects.create(
+            author=self.user, text='Про кошку и собаку')
+        self.dog = Post.objects.create(
+            author=self.user, text='Собаки лаяли всю ночь')
+
+    def search(self, query, **params):
+        return self.client.get(
+            reverse('posts:search'), {'q': query, **params})
+
+    def test_search_matches_word_forms_by_rank(self):
+        response = self.search('кошками')
+        self.assertEqual(
+            list(response.context['page_obj']), [self.cats, self.cat])
+
+    def test_all_words_are_required(self):
+        self.assertEqual(
+            list(search_posts('кошка собака')), [self.cat])
+
+    def test_index_follows_edits_and_deletes(self):
+        self.dog.text = 'Теперь про кошку'
+        self.dog.save()
+        self.cat.delete()
+        self.assertEqual(
+            set(search_posts('кошка')), {self.cats, self.dog})
+        self.assertFalse(search_posts('собаки').exists())
+
+    def test_query_syntax_is_not_passed_to_fts(self):
+        for query in ('"кошка', 'NEAR(кошка', 'кошка*', '', '!!!'):
+            with self.subTest(query=query):
+                self.assertEqual(self.search(query).status_code, 200)
+
+    @override_settings(PAGE=1)
+    def test_pages_keep_query(self):
+        response = self.search('кошка')
+        next_cursor = response.context['page_obj'].paginator.next_cursor
+        self.assertContains(response, f'?q=%D0%BA%D0%BE%D1%88%D0%BA%D0%B0'
+                                      f'&amp;after={next_cursor}')
+        response = self.search('кошка', after=next_cursor)
+        self.assertEqual(list(response.context['page_obj']), [self.cat])
+
+    def test_admin_search_uses_index(self):
+        admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password')
+        client = Client()
+        client.force_login(admin)
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(
+                reverse('admin:posts_post_changelist'), {'q': 'кошки'})
+        self.assertEqual(
+            set(response.context['cl'].result_list), {self.cats, self.cat})
+        sql = ' '.join(query['sql'] for query in queries.captured_queries)
+        self.assertIn('MATCH', sql)
+        self.assertNotIn('LIKE', sql)
+
+    def test_rebuild_command_restores_index(self):
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM posts_postsearch')
+        self.assertFalse(search_posts('собака').exists())
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(set(search_posts('собака')), {self.cat, self.dog})
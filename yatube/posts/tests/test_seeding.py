@@ -0,0 +1,124 @@
+import shutil
+import tempfile
+from collections import Counter
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from .. import benchmarks, caching, generators, seeding
+from ..models import (AuthorStats, Comment, FeedEntry, Follow, MediaBlob,
+                      Post)
+from ..search import search_posts
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, BACKGROUND_WORKERS=0)
+class SeedingTests(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.counts = seeding.seed(
+            300, users=30, groups=4, comments=200, image_share=0.2,
+            batch_size=50)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_volumes(self):
+        self.assertEqual(Post.objects.count(), 300)
+        self.assertEqual(User.objects.count(), 30)
+        self.assertEqual(Comment.objects.count(), 200)
+        self.assertEqual(self.counts['post'], 300)
+        self.assertTrue(Follow.objects.exists())
+
+    def test_seeding_changes_feed_version(self):
+        version = caching.get_version(caching.FEED_VERSION_KEY)
+        seeding.seed(10, users=3, groups=1, comments=5, image_share=0)
+        self.assertNotEqual(
+            caching.get_version(caching.FEED_VERSION_KEY), version)
+
+    def test_dates_follow_keys(self):
+        dates = list(Post.objects.order_by('pk').values_list(
+            'pub_date', flat=True))
+        self.assertEqual(dates, sorted(dates))
+
+    def test_comment_counts_match_comments(self):
+        counts = Counter(Comment.objects.values_list('post_id', flat=True))
+        for pk, comment_count in Post.objects.values_list(
+                'pk', 'comment_count'):
+            self.assertEqual(comment_count, counts[pk])
+
+    def test_author_stats_match_tables(self):
+        self.assertEqual(AuthorStats.objects.count(), 30)
+        self.assertEqual(AuthorStats.objects.rebuild_all(), 0)
+
+    def test_feed_entries_follow_authors(self):
+        follow = Follow.objects.first()
+        expected = set(Post.objects.filter(
+            author_id=follow.author_id).values_list('pk', flat=True))
+        entries = set(FeedEntry.objects.filter(
+            user_id=follow.user_id, author_id=follow.author_id,
+        ).values_list('post_id', flat=True))
+        self.assertEqual(entries, expected)
+
+    def test_posts_are_searchable(self):
+        self.assertTrue(search_posts('кошки').exists())
+
+    def test_image_refs_match_posts(self):
+        refs = Counter(Post.objects.exclude(image='').values_list(
+            'image', flat=True))
+        self.assertTrue(refs)
+        self.assertEqual(
+            dict(MediaBlob.objects.values_list('name', 'refs')), dict(refs))
+
+    def test_seeding_appends_to_existing_data(self):
+        seeding.seed(10, users=5, groups=1, comments=0, image_share=0)
+        self.assertEqual(Post.objects.count(), 310)
+        self.assertEqual(User.objects.count(), 35)
+
+    @mock.patch.object(generators, 'CHUNK_SIZE', 40)
+    def test_data_does_not_depend_on_processes(self):
+        texts = Post.objects.order_by('pk').values_list('text', flat=True)
+        for processes in (1, 2):
+            seeding.seed(
+                100, users=10, groups=2, comments=0, image_share=0,
+                processes=processes)
+        self.assertEqual(list(texts[300:400]), list(texts[400:]))
+
+    def test_scenarios_are_measured(self):
+        results = benchmarks.run_scenarios(requests=2)
+        self.assertEqual(set(results), {
+            'index', 'group_posts', 'profile', 'post_detail',
+            'follow_index', 'post_create', 'add_comment', 'profile_follow',
+        })
+        self.assertGreater(results['post_detail']['queries'], 0)
+
+
+class BenchmarkCompareTests(TestCase):
+
+    baseline = {'1000': {'index': {'p95': 20, 'queries': 3}}}
+
+    def result(self, p95, queries):
+        return {'1000': {'index': {'p95': p95, 'queries': queries}}}
+
+    def test_within_thresholds(self):
+        self.assertEqual(
+            benchmarks.compare(self.result(29, 3), self.baseline), [])
+
+    def test_more_queries_is_regression(self):
+        [regression] = benchmarks.compare(self.result(20, 4), self.baseline)
+        self.assertIn('1000/index', regression)
+
+    def test_slower_p95_is_regression(self):
+        [regression] = benchmarks.compare(self.result(31, 3), self.baseline)
+        self.assertIn('p95', regression)
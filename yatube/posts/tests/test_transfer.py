@@ -0,0 +1,169 @@
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+
+from .. import caching
+from ..models import (AuthorStats, Comment, FeedEntry, Follow, Group,
+                      MediaBlob, Post)
+from ..search import search_posts
+
+User = get_user_model()
+TEMP_DIR = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(BACKGROUND_WORKERS=0, MEDIA_ROOT=TEMP_DIR)
+class TransferTests(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_DIR, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.path = os.path.join(TEMP_DIR, 'dump.ndjson.gz')
+        self.addCleanup(self.remove, self.path)
+        self.addCleanup(self.remove, f'{self.path}.progress')
+        self.author = User.objects.create(username='author')
+        self.reader = User.objects.create(username='reader')
+        self.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        self.posts = [
+            Post.objects.create(
+                text=f'Пост про кошку {number}', author=self.author,
+                group=self.group if number % 2 else None)
+            for number in range(5)
+        ]
+        Post.objects.filter(pk=self.posts[0].pk).update(
+            image='posts/ab/abc.jpg')
+        Comment.objects.create(
+            post=self.posts[1], author=self.reader, text='Комментарий')
+        Follow.objects.create(user=self.reader, author=self.author)
+
+    def remove(self, path):
+        if os.path.exists(path):
+            os.remove(path)
+
+    def export(self):
+        call_command('export_posts', self.path, stdout=StringIO())
+
+    def load(self, *args):
+        call_command('import_posts', self.path, *args, stdout=StringIO())
+
+    def snapshot(self):
+        return {
+            'posts': list(Post.objects.order_by('pk').values_list(
+                'pk', 'text', 'pub_date', 'author__username', 'group_id',
+                'image', 'comment_count')),
+            'comments': list(Comment.objects.order_by('pk').values_list(
+                'pk', 'post_id', 'author__username', 'text', 'created')),
+            'follows': list(Follow.objects.values_list(
+                'user__username', 'author__username')),
+            'feed': set(FeedEntry.objects.values_list(
+                'user__username', 'post_id', 'pub_date')),
+            'stats': set(AuthorStats.objects.values_list(
+                'author__username', 'posts_count', 'followers_count',
+                'following_count')),
+        }
+
+    def test_export_writes_compressed_ndjson(self):
+        self.export()
+        with gzip.open(self.path, 'rt', encoding='utf-8') as source:
+            rows = [json.loads(line) for line in source]
+        self.assertEqual(rows[0], {'type': 'meta', 'version': 1})
+        kinds = [row['type'] for row in rows[1:]]
+        self.assertEqual(
+            kinds, ['group'] + ['post'] * 5 + ['comment', 'follow'])
+
+    def test_import_restores_data_and_derived_tables(self):
+        expected = self.snapshot()
+        self.export()
+        Post.objects.all().delete()
+        Follow.objects.all().delete()
+        Group.objects.all().delete()
+        self.reader.delete()
+        self.load()
+        self.assertEqual(self.snapshot(), expected)
+        self.assertEqual(
+            MediaBlob.objects.get(name='posts/ab/abc.jpg').refs, 1)
+        self.assertEqual(search_posts('кошки').count(), 5)
+        self.assertFalse(os.path.exists(f'{self.path}.progress'))
+
+    def test_import_changes_cached_page_versions(self):
+        self.export()
+        Comment.objects.all().delete()
+        Follow.objects.all().delete()
+        keys = (
+            caching.FEED_VERSION_KEY,
+            caching.COMMENTS_VERSION_KEY.format(self.posts[1].pk),
+            caching.FOLLOW_VERSION_KEY.format(self.reader.pk),
+            caching.FOLLOW_VERSION_KEY.format(self.author.pk),
+        )
+        versions = [caching.get_version(key) for key in keys]
+        self.load('--merge')
+        for key, version in zip(keys, versions):
+            with self.subTest(key=key):
+                self.assertNotEqual(caching.get_version(key), version)
+
+    def test_import_resumes_after_saved_line(self):
+        self.export()
+        Comment.objects.all().delete()
+        pk = self.posts[2].pk
+        self.posts[2].delete()
+        with open(f'{self.path}.progress', 'w') as progress:
+            progress.write('7')
+        self.load()
+        self.assertTrue(Comment.objects.exists())
+        self.assertFalse(Post.objects.filter(pk=pk).exists())
+
+    def test_restart_ignores_progress(self):
+        self.export()
+        pk = self.posts[2].pk
+        self.posts[2].delete()
+        with open(f'{self.path}.progress', 'w') as progress:
+            progress.write('7')
+        self.load('--restart', '--merge')
+        self.assertTrue(Post.objects.filter(pk=pk).exists())
+
+    def clear_target(self):
+        Post.objects.all().delete()
+        Follow.objects.all().delete()
+        Group.objects.all().delete()
+
+    def test_import_into_non_empty_target_needs_merge(self):
+        self.export()
+        with self.assertRaises(CommandError):
+            self.load()
+        self.assertEqual(Post.objects.count(), 5)
+
+    def test_merge_skips_rows_with_taken_keys_and_their_dependents(self):
+        self.export()
+        self.clear_target()
+        taken = Post.objects.create(
+            pk=self.posts[1].pk, text='Чужой пост', author=self.reader)
+        self.load('--merge')
+        taken.refresh_from_db()
+        self.assertEqual(taken.text, 'Чужой пост')
+        self.assertFalse(Comment.objects.exists())
+        self.assertEqual(Post.objects.count(), 5)
+        self.assertTrue(Post.objects.filter(pk=self.posts[3].pk).exists())
+
+    def test_merge_skips_posts_of_skipped_group(self):
+        self.export()
+        self.clear_target()
+        Group.objects.create(title='Чужая', slug='group', description='')
+        self.load('--merge')
+        self.assertFalse(Group.objects.filter(pk=self.group.pk).exists())
+        self.assertEqual(
+            set(Post.objects.values_list('pk', flat=True)),
+            {self.posts[number].pk for number in (0, 2, 4)})
+        self.assertFalse(Comment.objects.exists())
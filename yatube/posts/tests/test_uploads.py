@@ -0,0 +1,82 @@
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from ..models import Post
+from ..uploads import HEADER_LIMIT, BoundedImageUploadHandler
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def make_image(name, size, image_format='PNG'):
+    buffer = BytesIO()
+    Image.new('RGB', size, 'navy').save(buffer, image_format)
+    return SimpleUploadedFile(name, buffer.getvalue(), 'image/png')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class BoundedUploadTests(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='auth')
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def create(self, image):
+        return self.client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Пост с картинкой', 'image': image},
+        )
+
+    @override_settings(POST_IMAGE_MAX_BYTES=100)
+    def test_too_many_bytes_are_rejected(self):
+        response = self.create(make_image('big.png', (200, 200)))
+        self.assertFormError(
+            response, 'form', 'image', 'Размер файла больше 100\xa0байт.')
+        self.assertFalse(Post.objects.exists())
+
+    @override_settings(POST_IMAGE_MAX_PIXELS=100)
+    def test_too_many_pixels_are_rejected(self):
+        response = self.create(make_image('wide.png', (20, 10)))
+        self.assertFormError(
+            response, 'form', 'image',
+            'Изображение 20x10 больше 100 пикселей.')
+        self.assertFalse(Post.objects.exists())
+
+    def test_not_an_image_is_rejected(self):
+        response = self.create(
+            SimpleUploadedFile('fake.png', b'not an image', 'image/png'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['form'].errors['image'])
+        self.assertFalse(Post.objects.exists())
+
+    @override_settings(POST_IMAGE_MAX_SIDE=150)
+    def test_large_image_is_downsampled(self):
+        self.create(make_image('large.jpg', (300, 100), 'JPEG'))
+        post = Post.objects.get()
+        with Image.open(post.image.path) as image:
+            self.assertEqual(image.size, (150, 50))
+
+    def test_header_buffer_is_bounded(self):
+        handler = BoundedImageUploadHandler()
+        handler.new_file('image', 'junk.png', 'image/png', None)
+        chunk = b'\0' * (64 * 1024)
+        for start in range(0, HEADER_LIMIT + len(chunk), len(chunk)):
+            handler.receive_data_chunk(chunk, start)
+        self.assertTrue(handler.error)
+        self.assertEqual(handler.header, b'')
+        upload = handler.file_complete(handler.received)
+        self.assertEqual(upload.upload_error, handler.error)
@@ -100,7 +100,7 @@ class PostPagesTests(TestCase):
             post_text_0: self.text,
             post_author_0: self.username,
             post_group_0: self.title,
-            post_image_0: f'posts/{self.uploaded.name}',
+            post_image_0: self.post.image.name,
         }
         self.assert_equal_method(assert_dictionary)
 
@@ -123,7 +123,7 @@ class PostPagesTests(TestCase):
             group_title: self.title,
             group_description: self.description,
             group_slug: self.slug,
-            post_image_0: f'posts/{self.uploaded.name}',
+            post_image_0: self.post.image.name,
         }
         self.assert_equal_method(assert_dictionary)
 
@@ -144,7 +144,7 @@ class PostPagesTests(TestCase):
             post_group_0: self.title,
             author_username_0: self.username,
             third_object: self.post_sum,
-            post_image_0: f'posts/{self.uploaded.name}',
+            post_image_0: self.post.image.name,
         }
         self.assert_equal_method(assert_dictionary)
 
@@ -163,7 +163,7 @@ class PostPagesTests(TestCase):
             second_object: self.text,
             post_text: self.text,
             fourth_object: self.post_sum,
-            post_image_0: f'posts/{self.uploaded.name}',
+            post_image_0: self.post.image.name,
         }
         self.assert_equal_method(assert_dictionary)
 
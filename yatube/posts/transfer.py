@@ -0,0 +1,370 @@
+"""
+Выгрузка и загрузка постов, комментариев, подписок и сообществ
+в формате NDJSON: одна строка JSON на запись, файл .gz сжимается.
+
+Выгрузка читает таблицы итератором порциями, загрузка пишет
+пачками через bulk_create, поэтому память не растёт с объёмом.
+Первичные ключи сохраняются, повторная загрузка тех же строк их
+пропускает; пройденные строки файла отмечаются в файле прогресса,
+и прерванную загрузку можно продолжить.
+
+В непустую базу загрузка идёт только с merge=True: строка, чей
+ключ уже занят другой записью, пропускается вместе с зависимыми
+от неё строками (постами сообщества, комментариями поста), иначе
+они оказались бы привязаны к чужим записям. Авторы указываются по
+имени пользователя и заводятся без пароля, если их нет.
+Изображения переносятся путями в хранилище, сами файлы — отдельно.
+
+Производные данные (счётчики, ленты, поисковый индекс, ссылки
+на файлы изображений) после загрузки пересчитываются. Строки пишутся
+в обход сигналов, поэтому версии кеша страниц (ленты, подписок
+затронутых пользователей, комментариев затронутых постов) меняются
+явно, иначе кеш и ETag ещё долго отдавали бы прежнее содержимое.
+"""
+import gzip
+import json
+import os
+import sys
+from collections import defaultdict
+from contextlib import contextmanager
+from itertools import groupby
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils.dateparse import parse_datetime
+
+from . import feeds, search
+from .caching import (COMMENTS_VERSION_KEY, FOLLOW_VERSION_KEY,
+                      bump_feed_version, bump_version)
+from .models import AuthorStats, Comment, Follow, Group, MediaBlob, Post
+from .seeding import explicit_dates
+
+User = get_user_model()
+
+FORMAT_VERSION = 1
+
+
+@contextmanager
+def open_stream(path, mode):
+    """
+    Файл NDJSON для чтения ('r') или записи ('w'); '-' —
+    стандартный ввод или вывод, файлы .gz сжаты gzip.
+    """
+    if path == '-':
+        yield sys.stdin if mode == 'r' else sys.stdout
+    elif path.endswith('.gz'):
+        with gzip.open(path, f'{mode}t', encoding='utf-8') as stream:
+            yield stream
+    else:
+        with open(path, mode, encoding='utf-8') as stream:
+            yield stream
+
+
+def _date(value):
+    return value.isoformat()
+
+
+def export_rows(chunk_size=2000):
+    """
+    Записи для выгрузки: заголовок, сообщества, посты,
+    комментарии и подписки в порядке ключей.
+    """
+    yield {'type': 'meta', 'version': FORMAT_VERSION}
+    groups = Group.objects.order_by('pk').values(
+        'pk', 'title', 'slug', 'description')
+    for row in groups.iterator(chunk_size=chunk_size):
+        yield {'type': 'group', **row}
+    posts = Post.objects.order_by('pk').values_list(
+        'pk', 'text', 'pub_date', 'author__username', 'group_id', 'image')
+    for pk, text, pub_date, author, group, image in posts.iterator(
+            chunk_size=chunk_size):
+        yield {
+            'type': 'post', 'pk': pk, 'text': text,
+            'pub_date': _date(pub_date), 'author': author, 'group': group,
+            'image': image,
+        }
+    comments = Comment.objects.order_by('pk').values_list(
+        'pk', 'post_id', 'author__username', 'text', 'created')
+    for pk, post, author, text, created in comments.iterator(
+            chunk_size=chunk_size):
+        yield {
+            'type': 'comment', 'pk': pk, 'post': post, 'author': author,
+            'text': text, 'created': _date(created),
+        }
+    follows = Follow.objects.order_by('pk').values_list(
+        'pk', 'user__username', 'author__username')
+    for pk, user, author in follows.iterator(chunk_size=chunk_size):
+        yield {'type': 'follow', 'pk': pk, 'user': user, 'author': author}
+
+
+def export(stream, chunk_size=2000):
+    """
+    Выгружает данные в поток; возвращает число записей.
+    """
+    total = 0
+    for row in export_rows(chunk_size):
+        stream.write(json.dumps(row, ensure_ascii=False))
+        stream.write('\n')
+        total += 1
+    return total
+
+
+def user_ids(usernames):
+    """
+    Ключи пользователей по именам; недостающие заводятся
+    с непригодным паролем.
+    """
+    usernames = set(usernames)
+    found = dict(User.objects.filter(
+        username__in=usernames).values_list('username', 'pk'))
+    missing = usernames - found.keys()
+    if missing:
+        User.objects.bulk_create(
+            [User(username=name, password=make_password(None))
+             for name in missing],
+            ignore_conflicts=True)
+        found.update(User.objects.filter(
+            username__in=missing).values_list('username', 'pk'))
+    return found
+
+
+class TargetNotEmpty(Exception):
+    """
+    В базе уже есть записи, а загрузка запущена без merge.
+    """
+
+
+def _groups(rows, skipped):
+    return [
+        Group(pk=row['pk'], title=row['title'], slug=row['slug'],
+              description=row['description'])
+        for row in rows
+    ]
+
+
+def _posts(rows, skipped):
+    rows = _without_parents(rows, 'group', skipped['group'], skipped['post'])
+    authors = user_ids(row['author'] for row in rows)
+    return [
+        Post(pk=row['pk'], text=row['text'],
+             pub_date=parse_datetime(row['pub_date']),
+             author_id=authors[row['author']], group_id=row['group'],
+             image=row['image'])
+        for row in rows
+    ]
+
+
+def _comments(rows, skipped):
+    rows = _without_parents(rows, 'post', skipped['post'], skipped['comment'])
+    authors = user_ids(row['author'] for row in rows)
+    return [
+        Comment(pk=row['pk'], post_id=row['post'],
+                author_id=authors[row['author']], text=row['text'],
+                created=parse_datetime(row['created']))
+        for row in rows
+    ]
+
+
+def _follows(rows, skipped):
+    users = user_ids(
+        name for row in rows for name in (row['user'], row['author']))
+    return [
+        Follow(pk=row['pk'], user_id=users[row['user']],
+               author_id=users[row['author']])
+        for row in rows
+    ]
+
+
+def _without_parents(rows, parent, skipped_parents, skipped):
+    """
+    Строки, родитель которых не загружен; их ключи
+    добавляются в skipped.
+    """
+    kept = []
+    for row in rows:
+        if row[parent] in skipped_parents:
+            skipped.add(row['pk'])
+        else:
+            kept.append(row)
+    return kept
+
+
+# Модель, построитель объектов и поля, по которым загруженная
+# строка отличается от чужой записи с тем же ключом.
+BUILDERS = {
+    'group': (Group, _groups, ('slug',)),
+    'post': (Post, _posts, ('author_id', 'pub_date')),
+    'comment': (Comment, _comments, ('post_id', 'author_id', 'created')),
+    'follow': (Follow, _follows, ('user_id', 'author_id')),
+}
+
+
+def _foreign(model, fields, objects):
+    """
+    Ключи объектов, которые не попали в базу: ключ занят другой
+    записью или строка нарушила уникальность.
+    """
+    stored = {
+        pk: values for pk, *values in model.objects.filter(
+            pk__in=[obj.pk for obj in objects]).values_list('pk', *fields)
+    }
+    return {
+        obj.pk for obj in objects
+        if stored.get(obj.pk) != [getattr(obj, name) for name in fields]
+    }
+
+
+def _version_keys(kind, objects):
+    """
+    Ключи версий страниц, которые показывают загруженные строки,
+    кроме общей версии ленты.
+    """
+    if kind == 'comment':
+        return {COMMENTS_VERSION_KEY.format(obj.post_id) for obj in objects}
+    if kind == 'follow':
+        return {
+            FOLLOW_VERSION_KEY.format(user_id)
+            for obj in objects for user_id in (obj.user_id, obj.author_id)
+        }
+    return set()
+
+
+def _has_data():
+    return any(
+        model.objects.exists() for model, _, _ in BUILDERS.values())
+
+
+class Checkpoint:
+    """
+    Число загруженных строк файла и ключи пропущенных записей
+    по типам в файле прогресса.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.skipped = defaultdict(set)
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return 0
+        with open(self.path) as source:
+            content = source.read().strip()
+        if not content.startswith('{'):
+            return int(content or 0)
+        state = json.loads(content)
+        for kind, pks in state['skipped'].items():
+            self.skipped[kind] = set(pks)
+        return state['lines']
+
+    def save(self, lines):
+        if self.path:
+            skipped = {
+                kind: sorted(pks) for kind, pks in self.skipped.items()}
+            with open(self.path, 'w') as output:
+                json.dump({'lines': lines, 'skipped': skipped}, output)
+
+    def clear(self):
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def _parsed(stream, skip):
+    for number, line in enumerate(stream, 1):
+        if number > skip and line.strip():
+            yield number, json.loads(line)
+
+
+def _batches(rows, batch_size):
+    """
+    Пачки подряд идущих записей одного типа не длиннее batch_size.
+    """
+    for kind, items in groupby(rows, key=lambda item: item[1]['type']):
+        batch = []
+        for item in items:
+            batch.append(item)
+            if len(batch) == batch_size:
+                yield kind, batch
+                batch = []
+        if batch:
+            yield kind, batch
+
+
+def load(stream, checkpoint=None, batch_size=2000, log=None, merge=False):
+    """
+    Загружает записи из потока, продолжая с отмеченной строки.
+    Возвращает число загруженных записей по типам; ключи
+    пропущенных записей остаются в checkpoint.skipped.
+    """
+    checkpoint = checkpoint or Checkpoint(None)
+    log = log or (lambda message: None)
+    counts = dict.fromkeys(BUILDERS, 0)
+    skip = checkpoint.load()
+    if not skip and not merge and _has_data():
+        raise TargetNotEmpty(
+            'В базе уже есть сообщества, посты, комментарии или подписки.')
+    skipped = checkpoint.skipped
+    dates = (
+        Post._meta.get_field('pub_date'),
+        Comment._meta.get_field('created'),
+    )
+    with explicit_dates(*dates):
+        for kind, batch in _batches(_parsed(stream, skip), batch_size):
+            if kind == 'meta':
+                if batch[0][1]['version'] != FORMAT_VERSION:
+                    raise ValueError(
+                        f'Неизвестная версия формата {batch[0][1]}')
+            else:
+                model, build, fields = BUILDERS[kind]
+                with transaction.atomic():
+                    objects = build([row for _, row in batch], skipped)
+                    model.objects.bulk_create(objects, ignore_conflicts=True)
+                    foreign = _foreign(model, fields, objects)
+                skipped[kind] |= foreign
+                counts[kind] += len(objects) - len(foreign)
+                for key in _version_keys(kind, [
+                        obj for obj in objects if obj.pk not in foreign]):
+                    bump_version(key)
+            checkpoint.save(batch[-1][0])
+            log(f'{kind}: {counts.get(kind, 0)}')
+    return counts
+
+
+def count_comments(batch_size=10000):
+    """
+    Пересчитывает comment_count постов пачками по ключу.
+    """
+    comments = Comment.objects.filter(post=OuterRef('pk')).order_by()
+    total = comments.values('post').annotate(
+        total=Count('pk')).values('total')
+    last = Post.objects.order_by('-pk').values_list('pk', flat=True).first()
+    for start in range(0, (last or 0) + 1, batch_size):
+        Post.objects.filter(pk__gte=start, pk__lt=start + batch_size).update(
+            comment_count=Coalesce(Subquery(total), 0))
+
+
+def count_image_refs():
+    """
+    Пересчитывает число ссылок постов на файлы изображений.
+    """
+    images = Post.objects.exclude(image='').order_by().values(
+        'image').annotate(refs=Count('pk'))
+    for row in images.iterator():
+        updated = MediaBlob.objects.filter(name=row['image']).update(
+            refs=row['refs'])
+        if not updated:
+            MediaBlob.objects.create(name=row['image'], refs=row['refs'])
+
+
+def rebuild_derived(batch_size=2000):
+    """
+    Пересчитывает всё, что при обычной записи поддерживают сигналы.
+    """
+    count_comments()
+    count_image_refs()
+    feeds.backfill_follows(batch_size=batch_size)
+    search.rebuild_index(batch_size)
+    AuthorStats.objects.rebuild_all(batch_size)
+    bump_feed_version()
@@ -0,0 +1,131 @@
+"""
+Потоковый приём изображений с ограничениями по размеру.
+
+Обработчик загрузки пишет файл на диск частями и по первым
+килобайтам читает заголовок изображения: файл слишком большой
+по байтам или пикселям отклоняется, не дочитываясь до конца
+и не декодируясь. Принятые изображения больше POST_IMAGE_MAX_SIDE
+уменьшаются при проверке PostForm.
+"""
+import hashlib
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.template.defaultfilters import filesizeformat
+from PIL import Image, ImageOps
+
+HEADER_LIMIT = 256 * 1024
+INVALID_IMAGE = (
+    'Загрузите правильное изображение. Файл, который вы загрузили, '
+    'поврежден или не является изображением.'
+)
+SAVE_OPTIONS = {
+    'JPEG': {'quality': 90, 'optimize': True},
+    'WEBP': {'quality': 90},
+}
+
+
+class RejectedUpload(SimpleUploadedFile):
+    """
+    Пустой файл на месте отклонённой загрузки: причина отказа
+    хранится в upload_error и выводится PostForm как ошибка поля.
+    """
+
+    def __init__(self, name, content_type, error):
+        super().__init__(name, b'', content_type)
+        self.upload_error = error
+
+
+class BoundedImageUploadHandler(TemporaryFileUploadHandler):
+    """
+    Обработчик загрузки с ограничениями POST_IMAGE_MAX_BYTES
+    и POST_IMAGE_MAX_PIXELS. Память на запрос ограничена размером
+    заголовка HEADER_LIMIT, остальное пишется во временный файл.
+    Попутно считается SHA-256 содержимого для хранилища по хешу.
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+        self.header = b''
+        self.checked = False
+        self.error = None
+        self.digest = hashlib.sha256()
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.error:
+            return None
+        self.received += len(raw_data)
+        if self.received > settings.POST_IMAGE_MAX_BYTES:
+            limit = filesizeformat(settings.POST_IMAGE_MAX_BYTES)
+            return self._reject(f'Размер файла больше {limit}.')
+        if not self.checked:
+            self.header += raw_data
+            self._check_header(complete=False)
+            if self.error:
+                return None
+        self.digest.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        if not self.error and not self.checked and self.received:
+            self._check_header(complete=True)
+        if self.error:
+            self.file.close()
+            return RejectedUpload(
+                self.file_name, self.content_type, self.error)
+        upload = super().file_complete(file_size)
+        upload.content_digest = self.digest.hexdigest()
+        return upload
+
+    def _reject(self, error):
+        self.error = error
+        self.header = b''
+        return None
+
+    def _check_header(self, complete):
+        """
+        Читает размеры изображения из заголовка, не декодируя
+        пиксели. Пока заголовок не прочитан целиком, ждёт данных.
+        """
+        try:
+            with Image.open(BytesIO(self.header)) as image:
+                width, height = image.size
+        except (OSError, SyntaxError, ValueError):
+            if complete or len(self.header) >= HEADER_LIMIT:
+                self._reject(INVALID_IMAGE)
+            return
+        self.checked = True
+        self.header = b''
+        if width * height > settings.POST_IMAGE_MAX_PIXELS:
+            self._reject(
+                f'Изображение {width}x{height} больше '
+                f'{settings.POST_IMAGE_MAX_PIXELS} пикселей.'
+            )
+
+
+def downsample(upload):
+    """
+    Уменьшает изображение до POST_IMAGE_MAX_SIDE по большей стороне.
+    JPEG декодируется сразу в уменьшенном масштабе (draft), поэтому
+    исходник не разворачивается в память целиком. Анимация
+    не пересобирается: её ограничивает лимит пикселей.
+    """
+    max_side = settings.POST_IMAGE_MAX_SIDE
+    upload.seek(0)
+    image = Image.open(upload)
+    image_format = image.format
+    if max(image.size) <= max_side or getattr(image, 'is_animated', False):
+        upload.seek(0)
+        return upload
+    image.draft(image.mode, (max_side, max_side))
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((max_side, max_side), Image.LANCZOS)
+    buffer = BytesIO()
+    image.save(buffer, image_format, **SAVE_OPTIONS.get(image_format, {}))
+    resized = SimpleUploadedFile(
+        upload.name, buffer.getvalue(), upload.content_type)
+    resized.image = image
+    return resized
@@ -2,27 +2,34 @@
 View-функции создания, редактирования
 постов, комментариев, подписок и чтения сообществ.
 """
-from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
-from django.core.paginator import Paginator
+from django.conf import settings
+from django.db import transaction
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.cache import cache_page
 
+from core.replicas import read_from_replica
+
+from .caching import cache_feed_page
+from .conditional import (conditional_page, follow_state, group_state,
+                          index_state, post_state, profile_state)
+from .feeds import FEED_ENTRY_ORDERING, follow_feed
 from .forms import CommentForm, PostForm
-from .models import Group, Post, Follow
+from .models import AuthorStats, Group, Post, Follow
+from .paginators import COMMENT_ORDERING, paginate
+from .search import SEARCH_ORDERING, search_posts
 
 
-@cache_page(20, key_prefix='index_page')
+@conditional_page(index_state)
+@cache_feed_page(settings.FEED_CACHE_TIMEOUT, key_prefix='index_page')
+@read_from_replica
 def index(request):
     """
     Метод главной страницы, куда выводятся
     последние добавленные посты.
     """
-    post_list = Post.objects.all()
-    paginator = Paginator(post_list, settings.PAGE)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    post_list = Post.objects.for_feed()
+    page_obj = paginate(request, post_list)
     context = {
         'page_obj': page_obj,
         'index': True,
@@ -31,16 +38,16 @@ def index(request):
     return render(request, 'posts/index.html', context)
 
 
+@conditional_page(group_state)
+@read_from_replica
 def group_posts(request, slug):
     """
     Метод страницы сообщества, куда выводятся
     все посты сообщества.
     """
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
-    paginator = Paginator(posts, settings.PAGE)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    posts = group.posts.for_feed()
+    page_obj = paginate(request, posts)
     context = {
         'group': group,
         'page_obj': page_obj,
@@ -48,6 +55,23 @@ def group_posts(request, slug):
     return render(request, 'posts/group_list.html', context)
 
 
+@read_from_replica
+def search(request):
+    """
+    Метод страницы поиска постов по тексту.
+    """
+    query = request.GET.get('q', '').strip()
+    posts = search_posts(query, Post.objects.for_feed())
+    page_obj = paginate(request, posts, ordering=SEARCH_ORDERING)
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/search.html', context)
+
+
+@conditional_page(profile_state)
+@read_from_replica
 def profile(request, username):
     """
     Метод страницы профиля автора, куда выводятся
@@ -58,20 +82,20 @@ def profile(request, username):
     if request.user.is_authenticated:
         follow_list = Follow.objects.filter(user=request.user, author=author)
         following = follow_list.exists()
-    post_list = author.posts.all()
-    post_sum = post_list.count()
-    paginator = Paginator(post_list, settings.PAGE)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    stats = AuthorStats.objects.for_author(author)
+    page_obj = paginate(request, author.posts.for_feed())
     context = {
         'author': author,
-        'post_sum': post_sum,
+        'stats': stats,
+        'post_sum': stats.posts_count,
         'page_obj': page_obj,
         'following': following,
     }
     return render(request, 'posts/profile.html', context)
 
 
+@conditional_page(post_state)
+@read_from_replica
 def post_detail(request, post_id):
     """
     Метод страницы поста, куда выводятся
@@ -79,11 +103,16 @@ def post_detail(request, post_id):
     """
     post_one = get_object_or_404(Post, id=post_id)
     author_one = post_one.author
-    post_list = author_one.posts.all()
-    post_sum = post_list.count()
+    post_sum = AuthorStats.objects.for_author(author_one).posts_count
     preview = post_one.text[:30]
     form = CommentForm(request.POST or None)
-    comments = post_one.comments.all()
+    comments = paginate(
+        request,
+        post_one.comments.select_related('author').only(
+            'text', 'created', 'post', 'author__username'),
+        ordering=COMMENT_ORDERING,
+        per_page=settings.COMMENTS_PAGE,
+    )
     context = {
         'author_one': author_one,
         'preview': preview,
@@ -96,6 +125,7 @@ def post_detail(request, post_id):
 
 
 @login_required
+@transaction.atomic
 def post_create(request):
     """
     Метод страницы создания поста, куда
@@ -118,6 +148,7 @@ def post_create(request):
 
 
 @login_required
+@transaction.atomic
 def post_edit(request, post_id):
     """
     Метод страницы редактирования поста, где
@@ -141,6 +172,7 @@ def post_edit(request, post_id):
 
 
 @login_required
+@transaction.atomic
 def add_comment(request, post_id):
     """
     Метод добавления комментария для
@@ -157,14 +189,14 @@ def add_comment(request, post_id):
 
 
 @login_required
+@conditional_page(follow_state)
+@read_from_replica
 def follow_index(request):
     """
     Метод страницы постов авторов.
     """
-    posts = Post.objects.filter(author__following__user=request.user)
-    paginator = Paginator(posts, settings.PAGE)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    posts = follow_feed(request.user)
+    page_obj = paginate(request, posts, ordering=FEED_ENTRY_ORDERING)
     context = {
         'page_obj': page_obj,
         'index': False,
@@ -174,6 +206,7 @@ def follow_index(request):
 
 
 @login_required
+@transaction.atomic
 def profile_follow(request, username):
     """
     Метод подписки на автора.
@@ -187,6 +220,7 @@ def profile_follow(request, username):
 
 
 @login_required
+@transaction.atomic
 def profile_unfollow(request, username):
     """
     Метод отписки от автора.
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/2.2/ref/settings/
 """
 
 import os
+import sys
 
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -43,6 +44,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.metrics.MetricsMiddleware',
+    'core.profiling.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -50,6 +53,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.replicas.ReplicaPinMiddleware',
 
 ]
 
@@ -76,19 +80,90 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+# Уровень кеша выбирается переменной окружения YATUBE_CACHE:
+# locmem — кеш в памяти каждого процесса, sqlite — общий кеш в файле
+# SQLite с атомарными add и incr, two_level — небольшой LRU в процессе
+# перед общим кешем. Тесты по умолчанию берут locmem, чтобы не читать
+# и не стирать общий кеш на диске.
+CACHE_DIR = os.path.join(BASE_DIR, 'cache')
+SHARED_CACHE = {
+    'BACKEND': 'core.cache_backends.SQLiteCache',
+    'LOCATION': os.path.join(CACHE_DIR, 'cache.sqlite3'),
+    'OPTIONS': {
+        'MAX_ENTRIES': 10000,
+    },
 }
+CACHE_TIERS = {
+    'locmem': {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+    },
+    'sqlite': {
+        'default': SHARED_CACHE,
+    },
+    'two_level': {
+        'default': {
+            'BACKEND': 'core.cache_backends.TwoLevelCache',
+            'LOCATION': 'shared',
+            'OPTIONS': {
+                'MAX_ENTRIES': 500,
+                'LOCAL_TIMEOUT': 5,
+                'SHARED_ONLY_PREFIXES': (
+                    'feed:', 'single_flight.', 'profiles:'),
+            },
+        },
+        'shared': SHARED_CACHE,
+    },
+}
+TESTING = sys.argv[1:2] == ['test'] or 'pytest' in sys.modules
+CACHES = CACHE_TIERS[
+    os.getenv('YATUBE_CACHE', 'locmem' if TESTING else 'two_level')]
 
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'CONN_MAX_AGE': 60,
+        'OPTIONS': {
+            'timeout': 5,
+        },
     }
 }
 
+# PRAGMA для каждого нового соединения SQLite (core.sqlite).
+# busy_timeout в миллисекундах, отрицательный cache_size — в КиБ.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'busy_timeout': 5000,
+    'cache_size': -20000,
+    'mmap_size': 128 * 1024 * 1024,
+    'temp_store': 'memory',
+}
+
+# Реплики для чтения лент: пути к файлам SQLite через запятую
+# в YATUBE_REPLICAS. В тестах реплики совпадают с основной базой.
+DATABASE_REPLICAS = []
+for number, path in enumerate(
+        filter(None, os.getenv('YATUBE_REPLICAS', '').split(',')), 1):
+    alias = f'replica{number}'
+    DATABASES[alias] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': path,
+        'CONN_MAX_AGE': 60,
+        'OPTIONS': {
+            'timeout': 5,
+        },
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+DATABASE_ROUTERS = ['core.replicas.ReplicaRouter']
+
+# После записи сессия читает из основной базы столько секунд,
+# чтобы пользователь видел свои изменения до их репликации.
+REPLICA_PIN_SECONDS = 5
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -120,13 +195,6 @@ USE_TZ = True
 STATIC_URL = '/static/'
 STATICFILES_DIRS = (os.path.join(BASE_DIR, 'static'),)
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
-    }
-}
-
 INTERNAL_IPS = [
     '127.0.0.1',
 ]
@@ -134,3 +202,62 @@ LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
 
 PAGE = 10
+COMMENTS_PAGE = 50
+
+# Страницы лент сбрасываются сигналами при изменении данных,
+# поэтому срок хранения в кеше может быть долгим.
+FEED_CACHE_TIMEOUT = 60 * 60
+
+# Посты авторов, у которых подписчиков больше FEED_FANOUT_LIMIT,
+# не раскладываются по лентам, а подтягиваются при чтении.
+FEED_FANOUT_LIMIT = 10000
+FEED_FANOUT_BATCH = 1000
+FEED_BACKFILL_LIMIT = 1000
+
+# Фоновые задачи (обработка изображений, модерация) выполняются
+# в пуле потоков; при BACKGROUND_WORKERS = 0 — в том же потоке.
+BACKGROUND_WORKERS = 2
+
+# Раскладка новых постов по лентам подписчиков идёт в отдельном пуле
+# после фиксации; в тестах — в том же потоке, чтобы лента была
+# готова к следующему запросу.
+FEED_WORKERS = 0 if TESTING else 2
+
+# Адаптивные варианты изображений постов для srcset: ширины кадров,
+# пропорции кадра как у миниатюры 960x339 и качество сжатия.
+POST_IMAGE_WIDTHS = (480, 960, 1440)
+POST_IMAGE_ASPECT = (960, 339)
+POST_IMAGE_QUALITY = 80
+
+# Загрузки изображений пишутся на диск частями и отклоняются по
+# заголовку, если превышают лимиты байтов или пикселей; принятые
+# изображения уменьшаются до POST_IMAGE_MAX_SIDE по большей стороне.
+FILE_UPLOAD_HANDLERS = ['posts.uploads.BoundedImageUploadHandler']
+POST_IMAGE_MAX_BYTES = 10 * 1024 * 1024
+POST_IMAGE_MAX_PIXELS = 40 * 1000 * 1000
+POST_IMAGE_MAX_SIDE = 2560
+
+# Списки админки для таблиц больше этого числа строк показывают
+# оценку числа записей вместо COUNT(*) по всей таблице; с фильтром
+# или поиском записи считаются не дальше этого числа.
+ADMIN_EXACT_COUNT_LIMIT = 100000
+
+# Задания модерации удаляют и изменяют записи пачками, каждая в своей
+# транзакции, с паузой между пачками для остальных записей в базу.
+# Задания выполняются в своём пуле из MODERATION_WORKERS потоков; задание
+# в статусе «выполняется», не отмечавшее прогресс MODERATION_STALE_SECONDS
+# секунд, считается брошенным и продолжается командой resume_moderation.
+MODERATION_BATCH_SIZE = 500
+MODERATION_BATCH_PAUSE = 0.05
+MODERATION_WORKERS = 1
+MODERATION_STALE_SECONDS = 300
+
+# Профилирование: доля запросов под cProfile, интервал снятия стеков
+# остальных запросов и время, после которого у запроса начинают
+# снимать стеки, порог медленного запроса и число хранимых
+# самых медленных профилей каждого view.
+PROFILE_SAMPLE_RATE = 0.01
+PROFILE_SAMPLE_INTERVAL = 0.01
+PROFILE_STACK_DELAY_MS = 200
+PROFILE_SLOW_MS = 1000
+PROFILE_KEEP = 5